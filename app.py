@@ -41,19 +41,24 @@ import subprocess
 import tempfile
 
 # Import from restructured modules
-from src.config.constants import RATE_LIMIT_DELAY_SECONDS
+from src.config.constants import RATE_LIMIT_DELAY_SECONDS, FLASK_SECRET_KEY_ENV
 from src.utils.env_utils import load_env_vars, get_openrouter_api_key
 from src.generation.generation_flow import generate_application, process_urls
 from src.utils.prompt_utils import extract_urls_from_prompt, prompt_mentions_design
 from src.mcp.tool_utils import get_default_tools
 from src.api.openrouter_api import generate_code_with_openrouter
+from src.api.model_catalogue import get_model_catalogue
 from src.generation.routes import bp_generation
 from src.preview.routes import bp_preview
 from src.ui.routes import bp_ui
 
+# Load environment variables at startup (before reading FLASK_SECRET_KEY)
+load_env_vars()
+
 # Create Flask app
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)  # Generate a secure secret key
+# Every worker process must share the same key to read the session cookie (random if unset)
+app.secret_key = os.environ.get(FLASK_SECRET_KEY_ENV) or secrets.token_hex(16)
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['is_vercel_project'] = False  # Par défaut, pas un projet temporaire Vercel
 
@@ -62,12 +67,12 @@ app.register_blueprint(bp_generation)
 app.register_blueprint(bp_preview)
 app.register_blueprint(bp_ui)
 
+# Load the model catalogue from disk and refresh it in the background if it is stale
+get_model_catalogue().prefetch()
+
 # Dictionnaire global pour stocker l'état de progression des tâches de génération
 generation_tasks = {}
 
-# Load environment variables at startup
-load_env_vars()
-
 # Enregistrer la fonction de nettoyage des processus à l'arrêt de l'application
 @atexit.register
 def cleanup_on_exit():
@@ -79,6 +84,11 @@ def cleanup_on_exit():
         app.logger.info("Nettoyage des processus terminé")
     except Exception as e:
         app.logger.error(f"Erreur lors du nettoyage des processus: {str(e)}")
+    try:
+        from src.api.http_client import close_http_sessions
+        close_http_sessions()
+    except Exception as e:
+        app.logger.error(f"Erreur lors de la fermeture des connexions HTTP: {str(e)}")
 
 # Modifier le contexte Jinja2 pour ajouter des fonctions utiles
 @app.context_processor
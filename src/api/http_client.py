@@ -0,0 +1,202 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Client HTTP partagé pour tous les appels vers OpenRouter.
+Chaque thread de travail possède sa propre session requests avec un pool de
+connexions keep-alive, ce qui évite de rouvrir une connexion TCP+TLS à chaque appel.
+Le code asynchrone dispose d'un client httpx.AsyncClient par boucle d'événements.
+"""
+
+import asyncio
+import threading
+import weakref
+import logging
+from typing import Any, Awaitable, Dict, Optional, Tuple, TypeVar
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config.constants import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+_settings = {
+    'pool_connections': HTTP_POOL_CONNECTIONS,
+    'pool_maxsize': HTTP_POOL_MAXSIZE,
+    'connect_timeout': HTTP_CONNECT_TIMEOUT,
+    'read_timeout': HTTP_READ_TIMEOUT,
+}
+
+_local = threading.local()
+_sessions = weakref.WeakSet()
+_sessions_lock = threading.Lock()
+_generation = 0  # Incremented when sessions are reset so that every thread rebuilds its own
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+
+def configure_http_client(pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                          connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None) -> None:
+    """
+    Override the default pool size and timeouts of the shared HTTP client.
+    Existing sessions are closed so that new settings apply to the next call.
+
+    Args:
+        pool_connections (int, optional): Number of hosts kept in the pool
+        pool_maxsize (int, optional): Maximum keep-alive connections per host
+        connect_timeout (float, optional): Connection phase timeout in seconds
+        read_timeout (float, optional): Read phase timeout in seconds
+    """
+    if pool_connections is not None:
+        _settings['pool_connections'] = pool_connections
+    if pool_maxsize is not None:
+        _settings['pool_maxsize'] = pool_maxsize
+    if connect_timeout is not None:
+        _settings['connect_timeout'] = connect_timeout
+    if read_timeout is not None:
+        _settings['read_timeout'] = read_timeout
+    close_http_sessions()
+
+
+def _create_session() -> requests.Session:
+    """Create a requests session with a keep-alive connection pool."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=_settings['pool_connections'],
+        pool_maxsize=_settings['pool_maxsize'],
+        max_retries=0  # Retries are handled by the callers (429 handling, backoff)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the pooled session of the current thread, creating it on first use.
+
+    Returns:
+        requests.Session: Session reused for every call made from this thread
+    """
+    session = getattr(_local, 'session', None)
+    if session is None or getattr(_local, 'generation', None) != _generation:
+        session = _create_session()
+        _local.session = session
+        _local.generation = _generation
+        with _sessions_lock:
+            _sessions.add(session)
+    return session
+
+
+def get_timeout(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    """
+    Build a (connect, read) timeout tuple for requests.
+
+    Args:
+        read_timeout (float, optional): Read phase timeout overriding the default
+
+    Returns:
+        tuple: (connect_timeout, read_timeout)
+    """
+    return (_settings['connect_timeout'], read_timeout if read_timeout is not None else _settings['read_timeout'])
+
+
+def http_post(url: str, headers: Optional[Dict[str, str]] = None, json_payload: Optional[Dict[str, Any]] = None,
+              read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    """POST through the pooled session of the current thread."""
+    return get_http_session().post(url, headers=headers, json=json_payload, timeout=get_timeout(read_timeout), **kwargs)
+
+
+def http_get(url: str, headers: Optional[Dict[str, str]] = None, read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    """GET through the pooled session of the current thread."""
+    return get_http_session().get(url, headers=headers, timeout=get_timeout(read_timeout), **kwargs)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Return the pooled async client bound to the running event loop.
+    httpx clients cannot be shared between loops, so one is kept per loop.
+
+    Returns:
+        httpx.AsyncClient: Client reused for every coroutine of this loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=_settings['pool_maxsize'],
+                max_keepalive_connections=_settings['pool_maxsize']
+            ),
+            timeout=httpx.Timeout(_settings['read_timeout'], connect=_settings['connect_timeout'])
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def get_async_timeout(read_timeout: Optional[float] = None) -> httpx.Timeout:
+    """Build an httpx timeout with the same connect/read split as get_timeout."""
+    connect_timeout, read = get_timeout(read_timeout)
+    return httpx.Timeout(read, connect=connect_timeout)
+
+
+async def async_http_post(url: str, headers: Optional[Dict[str, str]] = None, json_payload: Optional[Dict[str, Any]] = None,
+                          read_timeout: Optional[float] = None) -> httpx.Response:
+    """POST through the pooled async client of the running event loop."""
+    client = get_async_http_client()
+    return await client.post(url, headers=headers, json=json_payload, timeout=get_async_timeout(read_timeout))
+
+
+async def close_async_http_client() -> None:
+    """Close the async client of the running event loop, if any."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+_T = TypeVar('_T')
+
+
+async def with_async_http_client(coro: Awaitable[_T]) -> _T:
+    """
+    Await coro, then close the async client of the loop.
+    Wrap every coroutine given to asyncio.run / run_until_complete with it: the loop
+    dies afterwards and its client would otherwise keep its pooled sockets open.
+    """
+    try:
+        return await coro
+    finally:
+        await close_async_http_client()
+
+
+def close_http_sessions() -> None:
+    """Close every pooled session (all threads) and release their connections."""
+    global _generation
+    with _sessions_lock:
+        sessions = list(_sessions)
+        _sessions.clear()
+        _generation += 1
+    for session in sessions:
+        try:
+            session.close()
+        except Exception as e:
+            logger.debug(f"Error closing HTTP session: {e}")
+    _local.__dict__.pop('session', None)
@@ -0,0 +1,372 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Catalogue des modèles OpenRouter partagé par toute l'application.
+La liste /models est conservée sur disque avec une durée de validité : une copie
+périmée est servie immédiatement pendant qu'un rafraîchissement tourne en arrière-plan
+(stale-while-revalidate). Les sections affichées par la page d'accueil et l'index par
+identifiant (capacités, alias, modèles de repli) sont construits une seule fois par
+rafraîchissement.
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from src.api.http_client import http_get
+from src.config.constants import (
+    OPENROUTER_MODELS_URL,
+    HTTP_MODELS_READ_TIMEOUT,
+    MODEL_CATALOGUE_PATH,
+    MODEL_CATALOGUE_TTL_SECONDS,
+    MODEL_CATALOGUE_RETRY_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Providers listed first in the model select, the others follow in API order
+PROVIDER_ORDER = [
+    "openai", "google", "anthropic", "qwen", "mistralai", "meta-llama", "deepseek", "agentica-org", "nousresearch"
+]
+
+# Tool-capable replacements preferred for a provider (cheapest first), then across providers
+PREFERRED_TOOL_FALLBACKS = {
+    "openai": ["openai/gpt-4o-mini", "openai/gpt-4o", "openai/gpt-4-turbo"],
+    "anthropic": ["anthropic/claude-3-haiku", "anthropic/claude-3-5-sonnet", "anthropic/claude-3-opus"],
+    "google": ["google/gemini-flash-1.5", "google/gemini-pro-1.5"],
+}
+RELIABLE_TOOL_FALLBACKS = ["openai/gpt-4o-mini", "anthropic/claude-3-haiku", "google/gemini-flash-1.5"]
+DEFAULT_TOOL_FALLBACK = "openai/gpt-4o-mini"
+
+
+def model_provider(model_id: str) -> str:
+    return model_id.split("/")[0] if "/" in model_id else ""
+
+
+def model_aliases(model_id: str) -> List[str]:
+    """
+    Normalized names under which a model can be referred to: the full id, the id
+    without its variant (":free", ":beta", ...) and both without the provider prefix.
+    """
+    full = model_id.strip().lower()
+    base = full.split(":", 1)[0]
+    aliases = [full, base]
+    for name in (full, base):
+        if "/" in name:
+            aliases.append(name.split("/", 1)[1])
+    return list(dict.fromkeys(alias for alias in aliases if alias))
+
+
+def _parse_prices(pricing: Any) -> Dict[str, float]:
+    """OpenRouter prices are strings ("0.0000025"): keep the numeric ones as floats."""
+    prices = {}
+    if isinstance(pricing, dict):
+        for key, value in pricing.items():
+            try:
+                prices[key] = float(value)
+            except (TypeError, ValueError):
+                continue
+    return prices
+
+
+class ModelIndex:
+    """
+    Lookup tables derived once from the catalogue: capabilities by id, tools-capable
+    set, provider -> models, normalized aliases and the tool fallback of each provider.
+    Every lookup is a dict/set access.
+    """
+
+    def __init__(self, models: List[Dict[str, Any]]):
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.supported_parameters: Dict[str, frozenset] = {}
+        self.context_lengths: Dict[str, Optional[int]] = {}
+        self.prices: Dict[str, Dict[str, float]] = {}
+        self.tools_capable = set()
+        self.by_provider: Dict[str, List[str]] = defaultdict(list)
+        self.aliases: Dict[str, str] = {}
+
+        for model in models:
+            model_id = model.get("id", "")
+            if not model_id:
+                continue
+            self.by_id[model_id] = model
+            parameters = frozenset(model.get("supported_parameters") or ())
+            self.supported_parameters[model_id] = parameters
+            self.context_lengths[model_id] = model.get("context_length") or (model.get("top_provider") or {}).get("context_length")
+            self.prices[model_id] = _parse_prices(model.get("pricing"))
+            if any("tool" in param for param in parameters):
+                self.tools_capable.add(model_id)
+            self.by_provider[model_provider(model_id)].append(model_id)
+            for alias in model_aliases(model_id):
+                self.aliases.setdefault(alias, model_id)  # First model in API order wins
+
+        self.default_tool_fallback = self._default_fallback()
+        self.tool_fallback_by_provider = {
+            provider: self._provider_fallback(provider) for provider in self.by_provider
+        }
+
+    def _provider_fallback(self, provider: str) -> str:
+        candidates = [model_id for model_id in self.by_provider[provider] if model_id in self.tools_capable]
+        if not candidates:
+            return self.default_tool_fallback
+        for model_id in PREFERRED_TOOL_FALLBACKS.get(provider.lower(), []):
+            if model_id in self.tools_capable:
+                return model_id
+        return candidates[0]
+
+    def _default_fallback(self) -> str:
+        for model_id in RELIABLE_TOOL_FALLBACKS:
+            if model_id in self.tools_capable:
+                return model_id
+        for model_ids in self.by_provider.values():
+            for model_id in model_ids:
+                if model_id in self.tools_capable:
+                    return model_id
+        return DEFAULT_TOOL_FALLBACK
+
+    def resolve(self, model_name: str) -> Optional[str]:
+        """Catalogue id of model_name, matched exactly or through its normalized aliases."""
+        if model_name in self.by_id:
+            return model_name
+        for alias in model_aliases(model_name):
+            model_id = self.aliases.get(alias)
+            if model_id is not None:
+                return model_id
+        return None
+
+    def supports_tools(self, model_id: str) -> bool:
+        return model_id in self.tools_capable
+
+    def tool_fallback(self, model_name: str) -> str:
+        """Tool-capable model to use instead of model_name, preferably from the same provider."""
+        provider = model_provider(model_name)
+        return self.tool_fallback_by_provider.get(provider, self.default_tool_fallback)
+
+    def context_length(self, model_id: str) -> Optional[int]:
+        return self.context_lengths.get(model_id)
+
+    def pricing(self, model_id: str) -> Optional[Dict[str, float]]:
+        """Prices per token as floats (prompt, completion, ...), None if unknown."""
+        return self.prices.get(model_id)
+
+
+def build_model_sections(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Ajoute les tags (Free), (No Tools), etc. aux modèles, les trie par provider
+    (openai, gemini, etc.) puis par Free/No Tools.
+    Retourne une liste de sections (label, models) pour affichage groupé dans le select.
+    """
+    providers = defaultdict(list)
+    for model in data:
+        name = model.get("name", "")
+        model_id = model.get("id", "")
+        supported_parameters = model.get("supported_parameters", [])
+        # Détection Free
+        is_free = ":free" in model_id or "(free)" in name.lower()
+        # Détection Tools
+        has_tools = any("tool" in param for param in supported_parameters)
+        # Construction du nom
+        display_name = name
+        if is_free:
+            if not has_tools:
+                display_name += " (Free No Tools)"
+            else:
+                display_name += " (Free)"
+        else:
+            if not has_tools:
+                display_name += " (No Tools)"
+        # Provider = 1er segment de l'id (avant le /)
+        provider = model_id.split("/")[0] if "/" in model_id else "Other"
+        providers[provider].append({
+            "id": model_id,
+            "name": display_name,
+            "is_free": is_free,
+            "has_tools": has_tools
+        })
+    provider_order = PROVIDER_ORDER + [p for p in providers if p not in PROVIDER_ORDER]
+    # Construction des sections triées
+    sections = []
+    for provider in provider_order:
+        if provider not in providers:
+            continue
+        # Sous-groupes : Free, No Tools, Autres
+        free = [m for m in providers[provider] if m["is_free"] and m["has_tools"]]
+        free_no_tools = [m for m in providers[provider] if m["is_free"] and not m["has_tools"]]
+        no_tools = [m for m in providers[provider] if not m["is_free"] and not m["has_tools"]]
+        normal = [m for m in providers[provider] if not m["is_free"] and m["has_tools"]]
+        if free:
+            sections.append({"label": f"{provider.capitalize()} (Free)", "models": sorted(free, key=lambda x: x["name"])})
+        if free_no_tools:
+            sections.append({"label": f"{provider.capitalize()} (Free No Tools)", "models": sorted(free_no_tools, key=lambda x: x["name"])})
+        if no_tools:
+            sections.append({"label": f"{provider.capitalize()} (No Tools)", "models": sorted(no_tools, key=lambda x: x["name"])})
+        if normal:
+            sections.append({"label": f"{provider.capitalize()}", "models": sorted(normal, key=lambda x: x["name"])})
+    return sections
+
+
+class CatalogueSnapshot:
+    """Immutable view of one fetch of the /models list and the structures derived from it."""
+
+    def __init__(self, models: List[Dict[str, Any]], fetched_at: float):
+        self.models = models
+        self.fetched_at = fetched_at
+        self.index = ModelIndex(models)
+        self.by_id = self.index.by_id
+        self.sections = build_model_sections(models)
+
+
+class ModelCatalogue:
+    """
+    Stale-while-revalidate cache of the OpenRouter model catalogue.
+
+    Readers always get the current snapshot without waiting for the network (except
+    when no catalogue was ever fetched and they ask to wait). A stale or missing snapshot
+    triggers a single background refresh; failed refreshes are retried after
+    retry_delay seconds and keep serving the previous snapshot.
+    """
+
+    def __init__(self, cache_path: str = MODEL_CATALOGUE_PATH, ttl: float = MODEL_CATALOGUE_TTL_SECONDS,
+                 retry_delay: float = MODEL_CATALOGUE_RETRY_SECONDS):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self._snapshot: Optional[CatalogueSnapshot] = None
+        self._disk_loaded = False
+        self._next_attempt = 0.0
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._first_attempt_done = threading.Event()
+
+    def _load_from_disk(self) -> None:
+        """Load the persisted catalogue, whatever its age. Caller holds the lock."""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            snapshot = CatalogueSnapshot(payload["data"], float(payload["fetched_at"]))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable model catalogue cache {self.cache_path}: {e}")
+            return
+        self._snapshot = snapshot
+        self._first_attempt_done.set()
+        logger.info(f"Loaded {len(snapshot.models)} models from the catalogue cache ({int(time.time() - snapshot.fetched_at)}s old)")
+
+    def _save_to_disk(self, models: List[Dict[str, Any]], fetched_at: float) -> None:
+        try:
+            directory = os.path.dirname(self.cache_path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": fetched_at, "data": models}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not persist the model catalogue: {e}")
+
+    def is_stale(self, snapshot: Optional[CatalogueSnapshot]) -> bool:
+        return snapshot is None or time.time() - snapshot.fetched_at >= self.ttl
+
+    def get_snapshot(self, wait: Optional[float] = None) -> Optional[CatalogueSnapshot]:
+        """
+        Return the current catalogue, refreshing it in the background if it is stale.
+
+        Args:
+            wait (float, optional): Seconds to wait for the first fetch when no catalogue
+                is available at all (neither in memory nor on disk)
+
+        Returns:
+            CatalogueSnapshot or None if no catalogue could be obtained
+        """
+        with self._lock:
+            if self._snapshot is None and not self._disk_loaded:
+                self._disk_loaded = True
+                self._load_from_disk()
+            snapshot = self._snapshot
+        if self.is_stale(snapshot):
+            self.refresh_async()
+        if snapshot is None and wait:
+            self._first_attempt_done.wait(wait)
+            snapshot = self._snapshot
+        return snapshot
+
+    def refresh_async(self) -> None:
+        """Start a background refresh unless one is running or a failed one is cooling down."""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            if time.time() < self._next_attempt:
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, name="model-catalogue-refresh", daemon=True)
+            self._refresh_thread.start()
+
+    def refresh(self) -> bool:
+        """
+        Fetch the /models list now and replace the current snapshot.
+
+        Returns:
+            bool: True if the catalogue was updated
+        """
+        try:
+            response = http_get(OPENROUTER_MODELS_URL, read_timeout=HTTP_MODELS_READ_TIMEOUT)
+            response.raise_for_status()
+            models = response.json().get("data", [])
+            if not isinstance(models, list) or not models:
+                raise ValueError("empty model list")
+        except Exception as e:
+            logger.warning(f"Failed to fetch model data from OpenRouter API: {e}")
+            with self._lock:
+                self._next_attempt = time.time() + self.retry_delay
+            self._first_attempt_done.set()
+            return False
+
+        fetched_at = time.time()
+        snapshot = CatalogueSnapshot(models, fetched_at)
+        with self._lock:
+            self._snapshot = snapshot
+            self._next_attempt = 0.0
+        self._first_attempt_done.set()
+        self._save_to_disk(models, fetched_at)
+        logger.info(f"Fetched {len(models)} models from OpenRouter API")
+        return True
+
+    def prefetch(self) -> None:
+        """Load the persisted catalogue and start a refresh if needed (called at startup)."""
+        self.get_snapshot()
+
+    def get_sections(self, wait: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Model select sections (label, models), empty if no catalogue is available."""
+        snapshot = self.get_snapshot(wait)
+        return snapshot.sections if snapshot is not None else []
+
+
+_model_catalogue: Optional[ModelCatalogue] = None
+_model_catalogue_lock = threading.Lock()
+
+
+def get_model_catalogue() -> ModelCatalogue:
+    """Return the process-wide model catalogue."""
+    global _model_catalogue
+    if _model_catalogue is None:
+        with _model_catalogue_lock:
+            if _model_catalogue is None:
+                _model_catalogue = ModelCatalogue()
+    return _model_catalogue
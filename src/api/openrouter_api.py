@@ -22,32 +22,27 @@ import os
 import re
 import json
 import time
+import asyncio
+import httpx
 import requests
 import logging
 from typing import Dict, List, Any, Optional
 from src.config.constants import OPENROUTER_API_URL
 from src.utils.model_utils import is_free_model
+from src.api.http_client import http_post, async_http_post
+from src.api.response_cache import get_response_cache, make_cache_key
+from src.api.rate_limiter import rate_limiter
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def call_openrouter_api(api_key, model, messages, temperature=0.7, stream=False, max_retries=1, tools=None, response_format=None):
+def _build_chat_request(api_key, model, messages, temperature=0.7, stream=False, tools=None, response_format=None):
     """
-    Call the OpenRouter API and handle basic errors.
+    Build the headers and JSON payload of a chat completion request.
     
-    Args:
-        api_key (str): OpenRouter API key
-        model (str): Model name to use
-        messages (list): List of message objects
-        temperature (float): Temperature parameter for generation
-        stream (bool): Whether to stream the response
-        max_retries (int): Maximum number of retries on failure
-        tools (list, optional): List of tool definitions to include in the request
-        response_format (str, optional): Desired response format for structured output
-        
     Returns:
-        dict: JSON response or None on error
+        tuple: (headers, payload)
     """
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -65,13 +60,59 @@ def call_openrouter_api(api_key, model, messages, temperature=0.7, stream=False,
         payload["tools"] = tools
     if response_format:
         payload["response_format"] = response_format
+    return headers, payload
+
+def _cache_lookup(use_cache, model, messages, temperature, tools, response_format):
+    """
+    Look the request up in the LLM response cache.
+    
+    Returns:
+        tuple: (cache or None, key or None, cached response or None)
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return None, None, None
+    key = make_cache_key(model, messages, temperature, tools, response_format)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"LLM cache hit for model {model} ({key[:12]}...)")
+    return cache, key, cached
+
+def call_openrouter_api(api_key, model, messages, temperature=0.7, stream=False, max_retries=1, tools=None, response_format=None, read_timeout=None, use_cache=True):
+    """
+    Call the OpenRouter API and handle basic errors.
+    
+    Args:
+        api_key (str): OpenRouter API key
+        model (str): Model name to use
+        messages (list): List of message objects
+        temperature (float): Temperature parameter for generation
+        stream (bool): Whether to stream the response
+        max_retries (int): Maximum number of retries on failure
+        tools (list, optional): List of tool definitions to include in the request
+        response_format (str, optional): Desired response format for structured output
+        read_timeout (float, optional): Read timeout in seconds (defaults to HTTP_READ_TIMEOUT)
+        use_cache (bool): Set to False to bypass the (opt-in) LLM response cache
+        
+    Returns:
+        dict: JSON response or None on error
+    """
+    cache, cache_key, cached = _cache_lookup(use_cache and not stream, model, messages, temperature, tools, response_format)
+    if cached is not None:
+        return cached
+
+    headers, payload = _build_chat_request(api_key, model, messages, temperature, stream, tools, response_format)
 
     attempt = 0
     while attempt <= max_retries:
+        rate_limiter.acquire(model, api_key)
         try:
-            response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload)
+            response = http_post(OPENROUTER_API_URL, headers=headers, json_payload=payload, read_timeout=read_timeout)
             response.raise_for_status()  # Raise HTTPError for bad responses (4XX or 5XX)
-            return response.json()
+            response_data = response.json()
+            if cache is not None and response_data.get("choices"):
+                cache.set(cache_key, response_data)
+            return response_data
         except requests.exceptions.HTTPError as e:
             logger.error(f"Error during OpenRouter API call: {e}")
             error_response_text = e.response.text if e.response else "No response text"
@@ -90,7 +131,8 @@ def call_openrouter_api(api_key, model, messages, temperature=0.7, stream=False,
             if e.response is not None and e.response.status_code == 429: # Rate limit or quota exceeded
                 retry_delay = extract_retry_delay(e.response, model)
                 logger.warning(f"Rate limit hit for model {model}. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
+                # The limiter makes the retry (and every other caller of this model) wait
+                rate_limiter.record_rate_limited(model, api_key, retry_delay)
                 attempt += 1
             elif attempt < max_retries:
                 logger.warning(f"API call failed (attempt {attempt + 1}/{max_retries + 1}). Retrying in {5 * (attempt + 1)} seconds...")
@@ -108,6 +150,243 @@ def call_openrouter_api(api_key, model, messages, temperature=0.7, stream=False,
                 return {"error": {"message": str(e), "code": "REQUEST_EXCEPTION"}, "status_code": None}
     return {"error": {"message": "Max retries exceeded after all attempts."}, "status_code": None}
 
+async def async_call_openrouter_api(api_key, model, messages, temperature=0.7, max_retries=1, tools=None, response_format=None, read_timeout=None, use_cache=True):
+    """
+    Native asyncio version of call_openrouter_api (httpx), with the same retry and 429 semantics.
+    Waiting for the model never blocks the event loop, so several calls can run concurrently.
+    
+    Args:
+        api_key (str): OpenRouter API key
+        model (str): Model name to use
+        messages (list): List of message objects
+        temperature (float): Temperature parameter for generation
+        max_retries (int): Maximum number of retries on failure
+        tools (list, optional): List of tool definitions to include in the request
+        response_format (str, optional): Desired response format for structured output
+        read_timeout (float, optional): Read timeout in seconds (defaults to HTTP_READ_TIMEOUT)
+        use_cache (bool): Set to False to bypass the (opt-in) LLM response cache
+        
+    Returns:
+        dict: JSON response or error dict
+    """
+    cache, cache_key, cached = _cache_lookup(use_cache, model, messages, temperature, tools, response_format)
+    if cached is not None:
+        return cached
+
+    headers, payload = _build_chat_request(api_key, model, messages, temperature, False, tools, response_format)
+
+    attempt = 0
+    while attempt <= max_retries:
+        await rate_limiter.acquire_async(model, api_key)
+        try:
+            response = await async_http_post(OPENROUTER_API_URL, headers=headers, json_payload=payload, read_timeout=read_timeout)
+            response.raise_for_status()
+            response_data = response.json()
+            if cache is not None and response_data.get("choices"):
+                cache.set(cache_key, response_data)
+            return response_data
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Error during async OpenRouter API call: {e}")
+            logger.error(f"API response (status {e.response.status_code}): {e.response.text}")
+
+            error_detail = {"message": str(e), "raw_response": e.response.text}
+            try:
+                error_detail = e.response.json().get("error", error_detail)
+            except ValueError:
+                pass
+
+            if e.response.status_code == 429:
+                retry_delay = extract_retry_delay(e.response, model)
+                logger.warning(f"Rate limit hit for model {model}. Retrying in {retry_delay} seconds...")
+                rate_limiter.record_rate_limited(model, api_key, retry_delay)
+                attempt += 1
+            elif attempt < max_retries:
+                logger.warning(f"API call failed (attempt {attempt + 1}/{max_retries + 1}). Retrying in {5 * (attempt + 1)} seconds...")
+                await asyncio.sleep(5 * (attempt + 1))
+                attempt += 1
+            else:
+                return {"error": error_detail, "status_code": e.response.status_code}
+        except httpx.HTTPError as e:  # Other network errors
+            logger.error(f"Async request failed: {e}")
+            if attempt < max_retries:
+                logger.warning(f"Request failed (attempt {attempt + 1}/{max_retries + 1}). Retrying in {5 * (attempt + 1)} seconds...")
+                await asyncio.sleep(5 * (attempt + 1))
+                attempt += 1
+            else:
+                return {"error": {"message": str(e), "code": "REQUEST_EXCEPTION"}, "status_code": None}
+    return {"error": {"message": "Max retries exceeded after all attempts."}, "status_code": None}
+
+class OpenRouterStream:
+    """
+    Iterate over the content tokens of a streamed (SSE) chat completion.
+    
+    Retries (including 429 handling) only happen before the first token is received.
+    Once iteration is over, error, finish_reason and tool_calls describe how the stream ended.
+    When the LLM response cache is enabled, the request is keyed like call_openrouter_api's:
+    a cached response is replayed as a single token, and a stream that ends without error
+    is stored once assembled.
+    """
+    
+    def __init__(self, api_key, model, messages, temperature=0.7, max_retries=1, tools=None, read_timeout=None, use_cache=True):
+        """
+        Prepare a streamed chat completion; the request is sent when iteration starts.
+        
+        Args:
+            api_key (str): OpenRouter API key
+            model (str): Model name to use
+            messages (list): List of message objects
+            temperature (float): Temperature parameter for generation
+            max_retries (int): Maximum number of retries before the stream starts
+            tools (list, optional): List of tool definitions to include in the request
+            read_timeout (float, optional): Maximum delay in seconds between two chunks
+            use_cache (bool): Set to False to bypass the (opt-in) LLM response cache
+        """
+        self.model = model
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.read_timeout = read_timeout
+        self.headers, self.payload = _build_chat_request(api_key, model, messages, temperature, True, tools)
+        self.error = None
+        self.finish_reason = None
+        self.response_model = model
+        self._tool_calls = {}
+        self._cache, self._cache_key, self._cached = _cache_lookup(use_cache, model, messages, temperature, tools, None)
+    
+    @property
+    def tool_calls(self) -> List[Dict[str, Any]]:
+        """Tool calls assembled from the streamed deltas, in index order."""
+        return [self._tool_calls[index] for index in sorted(self._tool_calls)]
+    
+    def _open(self):
+        """Send the request, retrying like call_openrouter_api. Returns the response or None."""
+        attempt = 0
+        while attempt <= self.max_retries:
+            rate_limiter.acquire(self.model, self.api_key)
+            try:
+                response = http_post(OPENROUTER_API_URL, headers=self.headers, json_payload=self.payload,
+                                     read_timeout=self.read_timeout, stream=True)
+                if response.status_code == 429:
+                    retry_delay = extract_retry_delay(response, self.model)
+                    response.close()
+                    logger.warning(f"Rate limit hit for model {self.model}. Retrying in {retry_delay} seconds...")
+                    rate_limiter.record_rate_limited(self.model, self.api_key, retry_delay)
+                    attempt += 1
+                    continue
+                response.raise_for_status()
+                # SSE bodies rarely declare a charset; requests would otherwise fall back to ISO-8859-1
+                response.encoding = 'utf-8'
+                return response
+            except requests.exceptions.HTTPError as e:
+                error_response_text = e.response.text if e.response is not None else "No response text"
+                logger.error(f"Error during streamed OpenRouter API call: {e} - {error_response_text}")
+                if attempt < self.max_retries:
+                    logger.warning(f"API call failed (attempt {attempt + 1}/{self.max_retries + 1}). Retrying in {5 * (attempt + 1)} seconds...")
+                    time.sleep(5 * (attempt + 1))
+                    attempt += 1
+                else:
+                    self.error = {"message": str(e), "raw_response": error_response_text}
+                    return None
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Request failed: {e}")
+                if attempt < self.max_retries:
+                    logger.warning(f"Request failed (attempt {attempt + 1}/{self.max_retries + 1}). Retrying in {5 * (attempt + 1)} seconds...")
+                    time.sleep(5 * (attempt + 1))
+                    attempt += 1
+                else:
+                    self.error = {"message": str(e), "code": "REQUEST_EXCEPTION"}
+                    return None
+        self.error = {"message": "Max retries exceeded after all attempts."}
+        return None
+    
+    def _merge_tool_call_deltas(self, deltas):
+        """Accumulate partial tool call deltas (name and arguments arrive in pieces)."""
+        for delta in deltas:
+            index = delta.get("index", len(self._tool_calls))
+            call = self._tool_calls.setdefault(index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            if delta.get("id"):
+                call["id"] = delta["id"]
+            function_delta = delta.get("function") or {}
+            if function_delta.get("name"):
+                call["function"]["name"] += function_delta["name"]
+            if function_delta.get("arguments"):
+                call["function"]["arguments"] += function_delta["arguments"]
+    
+    def _replay_cached(self):
+        """Yield the content of the cached response and restore how it ended."""
+        choice = (self._cached.get("choices") or [{}])[0]
+        message = choice.get("message") or {}
+        self.response_model = self._cached.get("model", self.response_model)
+        self.finish_reason = choice.get("finish_reason")
+        self._tool_calls = dict(enumerate(message.get("tool_calls") or []))
+        if message.get("content"):
+            yield message["content"]
+
+    def __iter__(self):
+        if self._cached is not None:
+            yield from self._replay_cached()
+            return
+        response = self._open()
+        if response is None:
+            return
+        # The full text is only kept when it is going to be cached
+        parts = [] if self._cache is not None else None
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                # Blank lines separate events and ':' lines are keep-alive comments
+                if not line or line.startswith(':') or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring malformed SSE chunk: {data[:200]}")
+                    continue
+                if "error" in chunk:
+                    self.error = chunk["error"]
+                    logger.error(f"OpenRouter stream error: {self.error}")
+                    break
+                self.response_model = chunk.get("model", self.response_model)
+                for choice in chunk.get("choices", []):
+                    delta = choice.get("delta") or {}
+                    if delta.get("tool_calls"):
+                        self._merge_tool_call_deltas(delta["tool_calls"])
+                    if choice.get("finish_reason"):
+                        self.finish_reason = choice["finish_reason"]
+                    content = delta.get("content")
+                    if content:
+                        if parts is not None:
+                            parts.append(content)
+                        yield content
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Stream interrupted: {e}")
+            self.error = {"message": str(e), "code": "STREAM_INTERRUPTED"}
+        finally:
+            response.close()
+        if parts is not None and self.error is None and (parts or self._tool_calls):
+            self._cache.set(self._cache_key, self.to_response("".join(parts)))
+    
+    def to_response(self, content=""):
+        """
+        Build a response dict shaped like a non-streamed completion.
+        
+        Args:
+            content (str): Message content to expose (streamed text is not retained)
+            
+        Returns:
+            dict: {"choices": [...], "model": ...} or {"error": ...}
+        """
+        if self.error and not content and not self._tool_calls:
+            return {"error": self.error, "status_code": None}
+        message = {"role": "assistant", "content": content}
+        if self._tool_calls:
+            message["tool_calls"] = self.tool_calls
+        return {
+            "model": self.response_model,
+            "choices": [{"message": message, "finish_reason": self.finish_reason}]
+        }
+
 def extract_retry_delay(response, model):
     """
     Extract the retryDelay from a 429 error response.
@@ -228,9 +507,6 @@ def generate_code_with_openrouter(
     """
     logger.info(f"Generating code with model: {model}")
     
-    # URL de l'API OpenRouter
-    api_url = "https://openrouter.ai/api/v1/chat/completions"
-    
     # Construire les messages pour l'API
     messages = [
         {"role": "system", "content": system_prompt},
@@ -263,11 +539,12 @@ def generate_code_with_openrouter(
         try:
             logger.info(f"API call attempt {attempt + 1}/{max_retries}")
             
-            response = requests.post(
-                api_url,
+            rate_limiter.acquire(model, api_key)
+            response = http_post(
+                OPENROUTER_API_URL,
                 headers=headers,
-                json=request_data,
-                timeout=180  # 3 minutes timeout for code generation
+                json_payload=request_data,
+                read_timeout=180  # 3 minutes timeout for code generation
             )
             
             # Vérifier la réponse HTTP
@@ -301,9 +578,10 @@ def generate_code_with_openrouter(
                     logger.error("Invalid API response format")
                     return {"error": "Format de réponse API invalide"}
             elif response.status_code == 429:
-                # Rate limit - attendre et réessayer
-                logger.warning(f"Rate limit hit. Waiting {retry_delay} seconds before retry.")
-                time.sleep(retry_delay)
+                # Rate limit - le limiteur fait attendre la prochaine tentative
+                rate_limit_delay = extract_retry_delay(response, model)
+                logger.warning(f"Rate limit hit. Waiting {rate_limit_delay} seconds before retry.")
+                rate_limiter.record_rate_limited(model, api_key, rate_limit_delay)
                 continue
             else:
                 # Autres erreurs HTTP
@@ -321,10 +599,10 @@ def generate_code_with_openrouter(
     return {"error": "Toutes les tentatives d'appel à l'API ont échoué"}
 
 
-async def get_openrouter_completion(prompt: str, model_name: str, api_key: Optional[str] = None, temperature: float = 0.7, max_retries: int = 1) -> Optional[str]:
+async def get_openrouter_completion(prompt: str, model_name: str, api_key: Optional[str] = None, temperature: float = 0.7, max_retries: int = 1, use_cache: bool = True) -> Optional[str]:
     """
     Simplified function to get a completion from OpenRouter.
-    This is an async wrapper for call_openrouter_api.
+    Uses async_call_openrouter_api so the event loop keeps running while waiting for the model.
     """
     if api_key is None:
         api_key = os.getenv("OPENROUTER_API_KEY")
@@ -333,23 +611,14 @@ async def get_openrouter_completion(prompt: str, model_name: str, api_key: Optio
         return None
 
     messages = [{"role": "user", "content": prompt}]
-    
-    # call_openrouter_api is synchronous, so we'd need to run it in an executor
-    # For now, let's assume we want to keep it simple and make it a direct call
-    # if this were a truly async application, we'd use httpx.AsyncClient
-    
-    # This is a placeholder for how you might call it.
-    # In a real async app, you'd use an async HTTP client or run sync in executor.
-    # For the purpose of this fix, we'll make call_openrouter_api directly,
-    # but be aware this will block if get_openrouter_completion is called from an async event loop.
-    # A better approach would be to make call_openrouter_api async or use asyncio.to_thread.
 
-    response_data = call_openrouter_api(
+    response_data = await async_call_openrouter_api(
         api_key=api_key,
         model=model_name,
         messages=messages,
         temperature=temperature,
-        max_retries=max_retries
+        max_retries=max_retries,
+        use_cache=use_cache
     )
 
     if response_data and "choices" in response_data and response_data["choices"]:
@@ -0,0 +1,181 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Limiteur de débit partagé par tout le processus pour les appels OpenRouter.
+Un seau à jetons (token bucket) par couple (modèle, clé API) : les générations
+concurrentes se coordonnent au lieu de dormir chacune un délai fixe, et les
+délais renvoyés par les réponses 429 (retryDelay) bloquent le seau concerné.
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from src.config.constants import (
+    FREE_MODEL_REQUESTS_PER_MINUTE,
+    FREE_MODEL_BURST,
+    MODEL_RATE_LIMITS
+)
+from src.utils.model_utils import is_free_model
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket where callers reserve a token and are told how long to wait for it.
+    Reservations may drive the balance negative so that waiting callers queue up.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float], burst: int):
+        """
+        Args:
+            requests_per_minute (float, optional): Sustained rate, None for no limit (back-off only)
+            burst (int): Requests allowed back-to-back when the bucket is full
+        """
+        self.capacity = max(1, burst)
+        self.refill_rate = requests_per_minute / 60.0 if requests_per_minute else None  # tokens per second
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.refill_rate is None:
+            self.tokens = float(self.capacity)
+            self.updated = now
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def estimate_wait(self, now: float) -> float:
+        """Seconds before a token would be available, without reserving it."""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.refill_rate)
+        return wait
+
+    def reserve(self, now: float) -> float:
+        """Take a token and return the delay the caller must wait before using it."""
+        wait = self.estimate_wait(now)
+        self.tokens -= 1
+        return wait
+
+    def block(self, now: float, delay: float) -> None:
+        """Stop handing out tokens for delay seconds (server asked us to back off)."""
+        self._refill(now)
+        self.blocked_until = max(self.blocked_until, now + delay)
+        if self.refill_rate is not None:
+            self.tokens = min(self.tokens, 0.0)
+
+
+class ModelRateLimiter:
+    """
+    Process-wide registry of token buckets keyed by (model, API key).
+    Models without a configured limit are never throttled until they return a 429.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, int]]] = None):
+        """
+        Args:
+            limits (dict, optional): {"model/id": (requests_per_minute, burst)} overrides
+        """
+        self._limits = dict(limits or {})
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, model: str, requests_per_minute: float, burst: int = 1) -> None:
+        """
+        Set the limit of a model (e.g. from OpenRouter's published limits).
+        Existing buckets of this model are rebuilt with the new limit.
+        """
+        with self._lock:
+            self._limits[model] = (requests_per_minute, burst)
+            for key in [k for k in self._buckets if k[0] == model]:
+                del self._buckets[key]
+
+    def _get_limit(self, model: str) -> Optional[Tuple[float, int]]:
+        if model in self._limits:
+            return self._limits[model]
+        if is_free_model(model):
+            return (FREE_MODEL_REQUESTS_PER_MINUTE, FREE_MODEL_BURST)
+        return None
+
+    def get_burst(self, model: str) -> Optional[int]:
+        """Requests this model accepts back-to-back, or None if it is not throttled."""
+        with self._lock:
+            limit = self._get_limit(model)
+        return max(1, limit[1]) if limit else None
+
+    def _get_bucket(self, model: str, api_key: Optional[str], create_unlimited: bool = False) -> Optional[TokenBucket]:
+        # Never keep raw API keys in memory structures
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        bucket_key = (model or "", key_hash)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            limit = self._get_limit(model)
+            if limit is None:
+                if not create_unlimited:
+                    return None
+                # Paid model that returned a 429: only the back-off matters
+                limit = (None, 1)
+            bucket = TokenBucket(*limit)
+            self._buckets[bucket_key] = bucket
+        return bucket
+
+    def reserve(self, model: str, api_key: Optional[str]) -> float:
+        """Reserve capacity for one request and return the delay to wait (seconds)."""
+        with self._lock:
+            bucket = self._get_bucket(model, api_key)
+            if bucket is None:
+                return 0.0
+            return bucket.reserve(time.monotonic())
+
+    def estimate_wait(self, model: str, api_key: Optional[str]) -> float:
+        """Seconds the next request for this model/key would wait (nothing reserved)."""
+        with self._lock:
+            bucket = self._get_bucket(model, api_key)
+            if bucket is None:
+                return 0.0
+            return bucket.estimate_wait(time.monotonic())
+
+    def acquire(self, model: str, api_key: Optional[str]) -> float:
+        """Block the calling thread until capacity is available. Returns the time waited."""
+        wait = self.reserve(model, api_key)
+        if wait > 0:
+            logger.info(f"Rate limiter: waiting {wait:.1f}s before calling {model}")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, model: str, api_key: Optional[str]) -> float:
+        """Await capacity without blocking the event loop. Returns the time waited."""
+        wait = self.reserve(model, api_key)
+        if wait > 0:
+            logger.info(f"Rate limiter: waiting {wait:.1f}s before calling {model}")
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_rate_limited(self, model: str, api_key: Optional[str], retry_delay: float) -> None:
+        """Learn from a 429: block this model/key for the retryDelay sent by the provider."""
+        with self._lock:
+            bucket = self._get_bucket(model, api_key, create_unlimited=True)
+            bucket.block(time.monotonic(), retry_delay)
+
+
+rate_limiter = ModelRateLimiter(MODEL_RATE_LIMITS)
@@ -0,0 +1,216 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Cache disque des réponses LLM, adressé par le contenu de la requête.
+La clé est un hash de (model, messages, temperature, tools, response_format) ;
+les entrées expirent après un TTL et les moins récemment utilisées sont évincées
+lorsque la taille totale dépasse le budget configuré.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from src.config.constants import (
+    CACHE_DIR,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_ENV,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_TTL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model, messages, temperature=None, tools=None, response_format=None) -> str:
+    """
+    Build the content-addressed key of a chat completion request.
+
+    Returns:
+        str: SHA-256 hex digest of the canonical JSON of the request
+    """
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "tools": tools,
+            "response_format": response_format
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with per-entry TTL and LRU eviction by total bytes.
+    Safe to share between threads; several processes may use the same database file.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = LLM_CACHE_MAX_BYTES, default_ttl: float = LLM_CACHE_TTL_SECONDS):
+        """
+        Args:
+            db_path (str): SQLite database file
+            max_bytes (int): Total size budget of the stored responses
+            default_ttl (float): Lifetime in seconds of entries stored without explicit TTL
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_expires_at ON responses(expires_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response for key, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            logger.warning(f"Corrupted LLM cache entry {key[:12]}..., ignoring it")
+            return None
+
+    def set(self, key: str, response: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """
+        Store a response and evict least recently used entries if over budget.
+        """
+        value = json.dumps(response, ensure_ascii=False)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now)
+            )
+            self.stores += 1
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the least recently used ones until under budget."""
+        expired = self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        self.evictions += max(expired, 0)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC")
+        to_delete = []
+        for key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters (this process) and current size (whole database).
+        """
+        with self._lock:
+            entries, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': entries,
+            'total_bytes': total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def is_response_cache_enabled() -> bool:
+    """The cache is opt-in: LLM_CACHE_ENABLED constant or the LLM_CACHE_ENV env var."""
+    return LLM_CACHE_ENABLED or os.environ.get(LLM_CACHE_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the process-wide response cache, or None if caching is disabled.
+    """
+    global _response_cache
+    if not is_response_cache_enabled():
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                try:
+                    _response_cache = ResponseCache(os.path.join(CACHE_DIR, "llm_responses.sqlite3"))
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"LLM response cache unavailable: {e}")
+                    return None
+    return _response_cache
+
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Return the cache statistics, or {'enabled': False} when caching is off."""
+    cache = get_response_cache()
+    if cache is None:
+        return {'enabled': False}
+    return {'enabled': True, **cache.get_stats()}
@@ -17,14 +17,65 @@
 Constants configuration module for the application.
 Contains all global constants used across the application.
 """
+import os
 
 # API Configuration
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_MODELS_URL = "https://openrouter.ai/api/v1/models"
 DEFAULT_MODEL = "google/gemini-2.5-pro-exp-03-25:free"  # Free tier model
 RATE_LIMIT_DELAY_SECONDS = 30  # Delay for free models
 
+# Per-model token buckets (process-wide, keyed by model and API key)
+FREE_MODEL_REQUESTS_PER_MINUTE = 20  # OpenRouter published limit for ":free" models
+FREE_MODEL_BURST = 5  # Requests allowed back-to-back before throttling
+MODEL_RATE_LIMITS = {}  # Optional overrides: {"model/id": (requests_per_minute, burst)}
+
+# HTTP client configuration (shared keep-alive connection pool)
+HTTP_POOL_CONNECTIONS = 4  # Number of distinct hosts kept in the pool
+HTTP_POOL_MAXSIZE = 16  # Maximum keep-alive connections per host
+HTTP_CONNECT_TIMEOUT = 10  # Seconds to establish the TCP+TLS connection
+HTTP_READ_TIMEOUT = 300  # Seconds to wait for the model response
+HTTP_MODELS_READ_TIMEOUT = 10  # Seconds to wait for the /models catalogue
+
 # Environment variable names
 OPENROUTER_API_KEY_ENV = "OPENROUTER_API_KEY"  # Name of the env var for the API key
+LLM_CACHE_ENV = "ALPERAI_LLM_CACHE"  # Set to 1/true to enable the LLM response cache
+TASK_STORE_BACKEND_ENV = "ALPERAI_TASK_STORE"  # "sqlite" (default) or "memory"
+FLASK_SECRET_KEY_ENV = "FLASK_SECRET_KEY"  # Shared secret, required to run several workers
+
+# Local cache directory (LLM responses, model catalogue, ...)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".alperai", "cache")
+
+# OpenRouter model catalogue (stale-while-revalidate, persisted in CACHE_DIR)
+MODEL_CATALOGUE_PATH = os.path.join(CACHE_DIR, "openrouter_models.json")
+MODEL_CATALOGUE_TTL_SECONDS = 6 * 3600  # Age after which the catalogue is refreshed in the background
+MODEL_CATALOGUE_RETRY_SECONDS = 60  # Delay before retrying a failed refresh
+MODEL_CATALOGUE_COLD_START_WAIT = 5  # Seconds the index page waits when no catalogue was ever fetched
+
+# URLs quoted in the prompt (fetched concurrently, reduced to text, cached in CACHE_DIR)
+URL_FETCH_MAX_URLS = 3  # URLs of the prompt taken into account
+URL_FETCH_TIMEOUT = 10  # Seconds per URL
+URL_FETCH_PER_HOST_LIMIT = 2  # Concurrent connections to the same host
+URL_FETCH_MAX_BYTES = 2 * 1024 * 1024  # Bytes read from a response body
+URL_CONTEXT_MAX_CHARS = 5000  # Characters of text kept per URL in the prompt context
+URL_CACHE_DIR = os.path.join(CACHE_DIR, "urls")
+URL_CACHE_FRESH_SECONDS = 600  # Cached pages younger than this are reused without revalidation
+
+# Task and result store shared by every worker process (generation_tasks, server_storage)
+TASK_STORE_BACKEND = "sqlite"  # "sqlite" or "memory" (single process only)
+TASK_STORE_PATH = os.path.join(os.path.expanduser("~"), ".alperai", "tasks.sqlite3")
+TASK_STORE_FLUSH_INTERVAL = 0.5  # Seconds between two batched writes of task progress
+SERVER_STORAGE_MAX_BYTES = 256 * 1024 * 1024  # Budget of the stored generation data, least recently used evicted first
+
+# LLM response cache (opt-in, content-addressed, stored in SQLite)
+LLM_CACHE_ENABLED = False  # Can also be enabled with the LLM_CACHE_ENV env var
+LLM_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Total size budget before LRU eviction
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Default lifetime of a cached response
+
+# MCP tool result cache (shared by every client, thread and process, stored in SQLite)
+TOOL_CACHE_ENABLED = True
+TOOL_CACHE_MAX_BYTES = 50 * 1024 * 1024  # Total size budget before LRU eviction
+TOOL_CACHE_TTL_SECONDS = 3 * 24 * 3600  # Lifetime of a cached tool result
 
 # OpenAI fallback configuration (if needed)
 USE_OPENROUTER = True  # Toggle between OpenRouter and OpenAI
@@ -33,6 +84,65 @@ API_MODEL = "gpt-4o-mini"  # Default OpenAI model if OpenRouter not used
 # Model-specific configurations
 OPENROUTER_MODEL = DEFAULT_MODEL
 
+# Code generation streaming: files are written to disk as soon as their block is complete
+STREAM_CODE_GENERATION = True
+GENERATION_STEP_CONCURRENCY = 4  # Frontend/backend/tests/docs steps generated in parallel
+MCP_QUERY_TIMEOUT = 90  # Seconds allowed to each MCP context query (web search, docs, tool calls)
+MCP_TOOL_CONCURRENCY = 4  # Tool calls of one assistant turn executed at the same time
+
+# Generation job queue: fixed worker pool shared by /generate, /iterate and /continue_iteration
+GENERATION_WORKERS = 2  # Generations running at the same time
+GENERATION_QUEUE_MAX_DEPTH = 20  # Jobs waiting for a worker before new ones are refused
+GENERATION_QUEUE_MAX_PER_KEY = 3  # Queued + running jobs allowed per API key
+GENERATION_TASK_TTL_SECONDS = 3600  # Finished tasks are forgotten after this delay
+
+# Project ZIP export (streamed, see src/utils/zip_utils.py)
+ZIP_EXCLUDED_DIRS = {
+    "node_modules", "venv", "env", "__pycache__", "bower_components",
+    "build", "dist", "coverage", "htmlcov", "target"
+}  # Dot-directories (.git, .venv, .next, .cache, ...) are always excluded
+ZIP_EXCLUDED_FILE_SUFFIXES = (".pyc", ".pyo", ".log")
+ZIP_STORED_EXTENSIONS = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".jar", ".whl",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".mp3", ".mp4", ".webm", ".ogg", ".woff", ".woff2", ".pdf"
+}  # Already compressed: stored as is instead of being deflated again
+ZIP_CHUNK_SIZE = 64 * 1024
+ZIP_ARTIFACT_CACHE_DIR = os.path.join(CACHE_DIR, "zip_artifacts")  # Prebuilt archives keyed by manifest hash
+ZIP_ARTIFACT_CACHE_MAX_ENTRIES = 20  # Projects kept; the least recently downloaded are removed first
+
+# Project file index shared by the tree walkers (see src/utils/project_index.py)
+PROJECT_INDEX_MAX_AGE_SECONDS = 5  # Changes made outside the pipeline are picked up by a rescan after this delay
+PROJECT_INDEX_MAX_PROJECTS = 32  # Indexes kept in memory; the least recently used are dropped
+PROJECT_INDEX_IGNORED_DIRS = {
+    ".git", "node_modules", "__pycache__", "venv", ".venv"
+}  # Only dependencies and VCS data: the export exclusions (ZIP_EXCLUDED_*) are applied by zip_utils
+
+# Filesystem watcher of the previewed projects (see src/utils/project_watcher.py)
+PROJECT_WATCH_DEBOUNCE_SECONDS = 0.5  # Events are applied once the project has been quiet for this long
+PROJECT_WATCH_POLL_INTERVAL = 2.0  # Rescan interval of the polling fallback (no inotify)
+PREVIEW_RESTART_ON_CHANGE = False  # Restart a running preview when its files change
+PREVIEW_RESTART_MIN_INTERVAL = 10  # Seconds between two automatic restarts of the same preview
+
+# Iteration context: files and chunks ranked by BM25 against the feedback (see src/utils/context_retrieval.py)
+ITERATION_CONTEXT_TOKEN_BUDGET = 6000  # Estimated tokens (4 characters each) of code sent with the feedback
+ITERATION_CONTEXT_MAX_FILES = 8  # Most relevant files considered
+ITERATION_CONTEXT_CHUNK_LINES = 40  # Lines per indexed chunk: large files are sent as their best chunks
+ITERATION_CONTEXT_MAX_FILE_SIZE = 512 * 1024  # Larger files (bundles, data dumps) are not indexed
+
+# SEARCH/REPLACE edits returned instead of complete files (see src/utils/edit_blocks.py)
+EDIT_FUZZY_MATCH_THRESHOLD = 0.85  # Minimum similarity of an approximate SEARCH match
+
+# Markdown artifact cleanup of generated files (see src/utils/markdown_cleaner.py)
+MARKDOWN_CLEANER_MAX_FILE_SIZE = 10 * 1024 * 1024  # Larger files are assumed to be binary
+MARKDOWN_CLEANER_POOL_MIN_FILES = 64  # Batches at least this large are cleaned in a process pool
+MARKDOWN_CLEANER_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+# Per-file fan-out: large structures are generated as concurrent groups of files
+FILE_FANOUT_GENERATION = True
+FILE_FANOUT_MIN_FILES = 20  # Structures with at least this many files use the fan-out mode
+FILE_FANOUT_MAX_FILES_PER_GROUP = 6
+
 # Temperature settings
 STRUCTURE_TEMPERATURE = 0.6  # More structured output
 CODE_TEMPERATURE = 0.4  # Less creative, more precise code generation
@@ -25,9 +25,16 @@ import re
 from pathlib import Path
 from flask import session
 
-from src.config.constants import RATE_LIMIT_DELAY_SECONDS
-from src.utils.model_utils import is_free_model
+from src.config.constants import (
+    STREAM_CODE_GENERATION,
+    GENERATION_STEP_CONCURRENCY,
+    FILE_FANOUT_GENERATION,
+    FILE_FANOUT_MIN_FILES,
+    URL_CONTEXT_MAX_CHARS
+)
 from src.api.openrouter_api import call_openrouter_api
+from src.api.rate_limiter import rate_limiter
+from src.generation.step_scheduler import StepScheduler, get_step_concurrency
 from src.utils.file_utils import (
     parse_structure_and_prompt, 
     create_project_structure,
@@ -47,10 +54,42 @@ from src.generation.steps.define_project_structure import define_project_structu
 from src.generation.steps.generate_code_step import generate_code_step
 from src.generation.steps.add_used_tool import add_used_tool
 from src.generation.steps.update_progress import update_progress
-from src.generation.steps.run_mcp_query import run_mcp_query
+from src.generation.steps.run_mcp_query import run_mcp_query, run_mcp_queries, run_mcp_queries_async
 from src.generation.steps.check_and_enhance_readme import check_and_enhance_readme
 from src.generation.steps.analyze_user_needs import analyze_user_needs
 
+# Most specific blocks first: a file matched by several blocks is generated by the first one
+_BLOCK_PRIORITY = ("tests", "documentation", "frontend", "backend")
+
+
+def split_block_structures(structure_lines, block_keywords):
+    """
+    Give every file of the structure to a single block, so that blocks generated in
+    parallel never write the same file.
+
+    Args:
+        structure_lines (list): Files and folders of the project (folders end with /)
+        block_keywords (dict): {block name: keywords} of the requested blocks
+
+    Returns:
+        dict: {block name: structure lines of the block}, only for blocks with at least one file
+    """
+    ordered = [name for name in _BLOCK_PRIORITY if name in block_keywords]
+    ordered += [name for name in block_keywords if name not in ordered]
+    folders, block_files = [], {name: [] for name in ordered}
+    for line in structure_lines:
+        if not line.strip():
+            continue
+        if line.strip().endswith('/'):
+            folders.append(line)
+            continue
+        owner = next((name for name in ordered if any(k in line.lower() for k in block_keywords[name])), None)
+        if owner is not None:
+            block_files[owner].append(line)
+    # Folders are kept as context; the block steps apply their own keyword filter again
+    return {name: folders + files for name, files in block_files.items() if files}
+
+
 def generate_application(api_key, selected_model, user_prompt, target_directory, use_mcp_tools=True, frontend_framework="Auto-detect", include_animations=True, progress_callback=None):
     """
     Generate a complete application based on the user's description.
@@ -85,42 +124,56 @@ def generate_application(api_key, selected_model, user_prompt, target_directory,
     # Initialiser le client MCP si les outils sont activés
     mcp_client = None
     mcp_context = ""
+    mcp_queries = {}
     if use_mcp_tools:
         update_progress(0, "Using MCP tools to gather context and documentation...", 2, progress_callback)
         from src.mcp.clients import SimpleMCPClient
         mcp_client = SimpleMCPClient(api_key, selected_model)
         update_progress(0, "🔌 MCP tools enabled: Web search, documentation, and frontend components available.", 4, progress_callback)
 
-        import asyncio
-        from src.generation.steps.run_mcp_query import run_mcp_query
-        web_query = f"Find the most relevant and up-to-date information, best practices, and documentation for building this type of project: {user_prompt}"
-        web_result = asyncio.run(run_mcp_query(mcp_client, web_query))
-        if web_result and web_result.get("text"):
-            mcp_context += "\n# Web Search Results\n" + web_result["text"]
-            update_progress(0, "Web search results integrated into context.", 5, progress_callback)
-
+        mcp_queries["web"] = f"Find the most relevant and up-to-date information, best practices, and documentation for building this type of project: {user_prompt}"
         if frontend_framework and frontend_framework.lower() not in ["auto-detect", "none", ""]:
-            doc_query = f"Find the official documentation and best practices for using the frontend framework: {frontend_framework}"
-            doc_result = asyncio.run(run_mcp_query(mcp_client, doc_query))
-            if doc_result and doc_result.get("text"):
-                mcp_context += f"\n# Documentation for {frontend_framework}\n" + doc_result["text"]
-                update_progress(0, f"Documentation for {frontend_framework} integrated into context.", 7, progress_callback)
+            mcp_queries["docs"] = f"Find the official documentation and best practices for using the frontend framework: {frontend_framework}"
 
     # == STEP 0: Extract and process URLs from prompt ==
     update_progress(0, "Extracting URLs from prompt...", 8, progress_callback)
     urls = extract_urls_from_prompt(user_prompt)
     url_context = ""
-    
     if urls:
         update_progress(0, f"🔗 URLs detected in your request: {len(urls)} URL(s)", 10, progress_callback)
+
+    # MCP queries and URL downloads run concurrently on a single event loop
+    async def gather_context():
+        tasks = [run_mcp_queries_async(mcp_client, mcp_queries) if mcp_queries else asyncio.sleep(0, {})]
+        tasks.append(process_urls(urls) if urls else asyncio.sleep(0, {}))
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    from src.api.http_client import with_async_http_client
+    mcp_results, url_contents = asyncio.run(with_async_http_client(gather_context()))
+
+    if isinstance(mcp_results, Exception):
+        logging.warning(f"[MCP] Context queries failed: {mcp_results}")
+        mcp_results = {}
+    web_result = mcp_results.get("web")
+    if web_result and web_result.get("text"):
+        mcp_context += "\n# Web Search Results\n" + web_result["text"]
+        update_progress(0, "Web search results integrated into context.", 5, progress_callback)
+    doc_result = mcp_results.get("docs")
+    if doc_result and doc_result.get("text"):
+        mcp_context += f"\n# Documentation for {frontend_framework}\n" + doc_result["text"]
+        update_progress(0, f"Documentation for {frontend_framework} integrated into context.", 7, progress_callback)
+
+    if urls:
         try:
-            url_contents = asyncio.run(process_urls(urls))
+            if isinstance(url_contents, Exception):
+                raise url_contents
             process_state['url_contents'] = url_contents
             
             # Prepare context from URLs
             url_context = "\n\n### CONTENT OF PROVIDED URLS ###\n"
             for url, content in url_contents.items():
-                truncated_content = content[:5000] + "..." if len(content) > 5000 else content
+                # Pages are already reduced to their text (URL_CONTEXT_MAX_CHARS) by the fetcher
+                truncated_content = content[:URL_CONTEXT_MAX_CHARS] + "..." if len(content) > URL_CONTEXT_MAX_CHARS else content
                 url_context += f"\nURL: {url}\n```\n{truncated_content}\n```\n"
             
             update_progress(0, f"✅ Content retrieved for {len(url_contents)} URL(s)", 12, progress_callback)
@@ -128,16 +181,10 @@ def generate_application(api_key, selected_model, user_prompt, target_directory,
             update_progress(0, f"❌ Error while retrieving URLs: {e}", 12, progress_callback)
             # Continue even if error
 
-    # Ajoute le contexte MCP à la reformulation du prompt si présent
-    if mcp_context:
-        if 'reformulated_prompt' in process_state:
-            process_state['reformulated_prompt'] += "\n" + mcp_context
-        else:
-            process_state['reformulated_prompt'] = mcp_context
-
     # == STEP 1: Reformulate prompt ==
     update_progress(1, "Reformulating prompt...", 15, progress_callback)
-    additional_context = ""
+    # Le contexte MCP (recherche web, documentation) guide la reformulation
+    additional_context = mcp_context
     tool_results_text = ""
     url_reference = ""
     animation_instruction = ""
@@ -188,96 +235,95 @@ def generate_application(api_key, selected_model, user_prompt, target_directory,
             return False
 
         # Génération par bloc selon les étapes demandées
-        code_responses = {}
-        from src.generation.steps.generate_frontend_step import generate_frontend_step
-        from src.generation.steps.generate_backend_step import generate_backend_step
-        from src.generation.steps.generate_tests_step import generate_tests_step
-        from src.generation.steps.generate_documentation_step import generate_documentation_step
-        
-        if "frontend" in steps_to_run:
-            update_progress(4, "Generating frontend...", 45, progress_callback)
-            code_responses["frontend"] = generate_frontend_step(
-                api_key,
-                selected_model,
-                reformulated_prompt,
-                structure_lines,
-                url_context,
-                tool_results_text,
-                url_reference,
-                animation_instruction,
-                use_mcp_tools,
-                mcp_client,
-                user_prompt,
-                progress_callback=progress_callback,
-                process_state=process_state
-            )
+        # Les blocs ne dépendent que de la structure et du prompt reformulé : ils sont générés en parallèle
+        # En mode streaming, chaque fichier est écrit sur disque dès que son bloc est complet
+        stream_target_directory = target_directory if STREAM_CODE_GENERATION else None
+        from src.generation.steps.generate_frontend_step import generate_frontend_step, FRONTEND_KEYWORDS
+        from src.generation.steps.generate_backend_step import generate_backend_step, BACKEND_KEYWORDS
+        from src.generation.steps.generate_tests_step import generate_tests_step, TEST_KEYWORDS
+        from src.generation.steps.generate_documentation_step import generate_documentation_step, DOC_KEYWORDS
         
-        if "backend" in steps_to_run:
-            update_progress(4, "Generating backend...", 50, progress_callback)
-            code_responses["backend"] = generate_backend_step(
-                api_key,
-                selected_model,
-                reformulated_prompt,
-                structure_lines,
-                url_context,
-                tool_results_text,
-                url_reference,
-                animation_instruction,
-                use_mcp_tools,
-                mcp_client,
-                user_prompt,
-                progress_callback=progress_callback,
-                process_state=process_state
-            )
-        if "tests" in steps_to_run:
-            update_progress(4, "Generating tests...", 53, progress_callback)
-            code_responses["tests"] = generate_tests_step(
+        structure_file_count = len([line for line in structure_lines if line.strip() and not line.strip().endswith('/')])
+        if FILE_FANOUT_GENERATION and structure_file_count >= FILE_FANOUT_MIN_FILES:
+            # Grande structure : une requête par groupe de fichiers, pour ne pas dépasser la limite de tokens de sortie
+            from src.generation.steps.generate_file_groups_step import generate_file_groups_step
+            update_progress(4, f"Large structure ({structure_file_count} files): generating files in parallel groups...", 45, progress_callback)
+            code_responses = {"file_groups": generate_file_groups_step(
                 api_key,
                 selected_model,
                 reformulated_prompt,
                 structure_lines,
                 url_context,
-                tool_results_text,
-                url_reference,
                 animation_instruction,
-                use_mcp_tools,
-                mcp_client,
-                user_prompt,
+                target_directory,
                 progress_callback=progress_callback,
                 process_state=process_state
-            )
-        if "documentation" in steps_to_run or "readme" in steps_to_run:
-            update_progress(4, "Generating documentation...", 55, progress_callback)
-            code_responses["documentation"] = generate_documentation_step(
-                api_key,
-                selected_model,
-                reformulated_prompt,
+            )}
+        else:
+            block_steps = [
+                ("frontend", generate_frontend_step, FRONTEND_KEYWORDS, "frontend" in steps_to_run),
+                ("backend", generate_backend_step, BACKEND_KEYWORDS, "backend" in steps_to_run),
+                ("tests", generate_tests_step, TEST_KEYWORDS, "tests" in steps_to_run),
+                ("documentation", generate_documentation_step, DOC_KEYWORDS, "documentation" in steps_to_run or "readme" in steps_to_run)
+            ]
+            # Disjoint file sets: two blocks running in parallel must not both write a file
+            block_structures = split_block_structures(
                 structure_lines,
-                url_context,
-                tool_results_text,
-                url_reference,
-                animation_instruction,
-                use_mcp_tools,
-                mcp_client,
-                user_prompt,
-                progress_callback=progress_callback,
-                process_state=process_state
+                {block_name: keywords for block_name, _, keywords, requested in block_steps if requested}
             )
-        # Fusionner les réponses pour la suite du flow (écriture des fichiers, etc.)
-        # Pour l'instant, on ne traite que le frontend comme code principal si présent, sinon backend, sinon tests, sinon doc
-        main_code_response = code_responses.get("frontend") or code_responses.get("backend") or code_responses.get("tests") or code_responses.get("documentation")
-        response_code_gen = main_code_response
+            scheduler = StepScheduler(get_step_concurrency(selected_model, GENERATION_STEP_CONCURRENCY))
+            for block_name, block_step, _, requested in block_steps:
+                if not requested or block_name not in block_structures:
+                    continue
+                scheduler.add_step(
+                    block_name,
+                    block_step,
+                    api_key,
+                    selected_model,
+                    reformulated_prompt,
+                    block_structures[block_name],
+                    url_context,
+                    tool_results_text,
+                    url_reference,
+                    animation_instruction,
+                    use_mcp_tools,
+                    mcp_client,
+                    user_prompt,
+                    progress_callback=progress_callback,
+                    process_state=process_state,
+                    stream_target_directory=stream_target_directory
+                )
+            block_names = [name for name, _, _, requested in block_steps if requested and name in block_structures]
+            update_progress(4, f"Generating {', '.join(block_names)} ({scheduler.max_workers} in parallel)...", 45, progress_callback)
+            code_responses = scheduler.run()
         process_state['last_api_call_time'] = time.time()
 
-        if response_code_gen and response_code_gen.get("choices"):
-            code_response_text = response_code_gen["choices"][0]["message"]["content"]
+        # Toutes les réponses payées sont conservées et écrites (un bloc en échec n'annule pas les autres)
+        generated_responses = {
+            name: response for name, response in code_responses.items()
+            if response and (response.get("choices") or response.get("streamed_files"))
+        }
+        for name, response in code_responses.items():
+            if name not in generated_responses:
+                logging.warning(f"[GENERATION] No usable response for the {name} block: {response.get('error') if response else 'skipped'}")
+
+        if generated_responses:
+            response_messages = {
+                name: (response.get("choices") or [{}])[0].get("message", {})
+                for name, response in generated_responses.items()
+            }
+            code_response_text = "\n\n".join(
+                message.get("content") for message in response_messages.values() if message.get("content")
+            )
             
             # Tool calls
-            if use_mcp_tools and response_code_gen["choices"][0]["message"].get("tool_calls") and mcp_client:
+            tool_calls = [call for message in response_messages.values() for call in (message.get("tool_calls") or [])]
+            if use_mcp_tools and tool_calls and mcp_client:
                 update_progress(4, "🔍 AI is using tools to improve code generation...", 60, progress_callback)
                 
-                tool_calls = response_code_gen["choices"][0]["message"]["tool_calls"]
-                for tool_call in tool_calls:
+                # Every tool call is executed concurrently on one event loop
+                tool_queries, tool_requests = {}, {}
+                for index, tool_call in enumerate(tool_calls):
                     function_info = tool_call.get("function", {})
                     tool_name = function_info.get("name")
                     tool_args_str = function_info.get("arguments", "{}")
@@ -286,11 +332,18 @@ def generate_application(api_key, selected_model, user_prompt, target_directory,
 
                     try:
                         tool_args = json.loads(tool_args_str)
+                    except Exception as e:
+                        logging.warning(f"Error processing tool {tool_name}: {e}")
+                        continue
+                    # Execute the tool via the MCP client
+                    tool_queries[index] = f"Execute {tool_name} with {tool_args}"
+                    tool_requests[index] = (tool_name, tool_args)
 
-                        # Execute the tool via the MCP client
-                        tool_query = f"Execute {tool_name} with {tool_args}"
-                        tool_result = asyncio.run(run_mcp_query(mcp_client, tool_query))
+                tool_results = run_mcp_queries(mcp_client, tool_queries) if tool_queries else {}
 
+                for index, tool_result in tool_results.items():
+                    tool_name, tool_args = tool_requests[index]
+                    try:
                         if tool_result:
                             tool_result_text = tool_result.get("text", "")
                             extracted_details = None
@@ -321,19 +374,33 @@ def generate_application(api_key, selected_model, user_prompt, target_directory,
                         add_used_tool(process_state, tool_name, {'error': str(e)})  # Record the tool even in case of error
 
             process_state['last_code_generation_response'] = code_response_text
-            update_progress(4, "✅ Code generation response received.", 65, progress_callback)            # == STEP 5: Write code to files ==
+            update_progress(4, f"✅ Code generation responses received ({len(generated_responses)}/{len(code_responses)} blocks).", 65, progress_callback)
+            # == STEP 5: Write code to files ==
             update_progress(5, "Writing code to files...", 70, progress_callback)
             files_written = []
             errors = []
             generation_incomplete = False
-            files_written, errors, generation_incomplete = parse_and_write_code(target_directory, code_response_text)
+            for name, response in generated_responses.items():
+                if response.get("streamed_files"):
+                    # Les fichiers de ce bloc ont déjà été écrits pendant le streaming
+                    streamed_files = response["streamed_files"]
+                    block_files, block_errors, block_incomplete = (
+                        streamed_files["files_written"], streamed_files["errors"], streamed_files["generation_incomplete"]
+                    )
+                else:
+                    block_files, block_errors, block_incomplete = parse_and_write_code(
+                        target_directory, response_messages[name].get("content") or ""
+                    )
+                files_written.extend(f for f in block_files if f not in files_written)
+                errors.extend(block_errors)
+                generation_incomplete = generation_incomplete or block_incomplete
 
             # == ÉTAPE CRITIQUE: Nettoyage universel des marqueurs Markdown ==
             if files_written:
                 update_progress(5, "🧹 Cleaning markdown artifacts from generated files...", 72, progress_callback)
                 from src.mcp.simple_validation_system import clean_markdown_artifacts
                 
-                cleanup_count = clean_markdown_artifacts(target_directory)
+                cleanup_count = clean_markdown_artifacts(target_directory, files_written)
                 if cleanup_count > 0:
                     update_progress(5, f"✅ Cleaned {cleanup_count} files of markdown artifacts.", 74, progress_callback)
                     logging.info(f"🧹 Cleaned markdown artifacts from {cleanup_count} files")
@@ -356,14 +423,10 @@ def generate_application(api_key, selected_model, user_prompt, target_directory,
                     if empty_files:
                         update_progress(6, f"Found {len(empty_files)} empty files that need code generation.", 79, progress_callback)
                         
-                        # Check rate limit before calling the API again
-                        if is_free_model(selected_model):
-                            current_time = time.time()
-                            time_since_last_call = time.time() - process_state.get('last_api_call_time', 0)
-                            if time_since_last_call < RATE_LIMIT_DELAY_SECONDS:
-                                wait_time = RATE_LIMIT_DELAY_SECONDS - time_since_last_call
-                                update_progress(6, f"⏳ Free model detected. Waiting {wait_time:.1f} seconds before generating missing code...", 81, progress_callback)
-                                time.sleep(wait_time)
+                        # The shared rate limiter delays the call; only tell the user about it
+                        wait_time = rate_limiter.estimate_wait(selected_model, api_key)
+                        if wait_time > 0:
+                            update_progress(6, f"⏳ Rate limit: waiting {wait_time:.1f} s before generating missing code...", 81, progress_callback)
                         
                         update_progress(6, "Generating code for empty files...", 83, progress_callback)
                         additional_files, additional_errors = generate_missing_code(
@@ -382,7 +445,7 @@ def generate_application(api_key, selected_model, user_prompt, target_directory,
                             # Nettoyage des nouveaux fichiers générés
                             update_progress(6, "🧹 Cleaning new files...", 87, progress_callback)
                             from src.mcp.simple_validation_system import clean_markdown_artifacts
-                            additional_cleanup = clean_markdown_artifacts(target_directory)
+                            additional_cleanup = clean_markdown_artifacts(target_directory, additional_files)
                             if additional_cleanup > 0:
                                 logging.info(f"🧹 Cleaned {additional_cleanup} additional files")
                         
@@ -0,0 +1,239 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+File d'attente des générations.
+Un pool fixe de workers exécute les générations et itérations ; l'admission est
+limitée (profondeur de file, travaux par clé API), les clés API sont servies à
+tour de rôle, les tâches peuvent être annulées et les tâches terminées expirent.
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque, Counter
+from typing import Any, Callable, Dict, Optional
+
+from src.config.constants import (
+    GENERATION_WORKERS,
+    GENERATION_QUEUE_MAX_DEPTH,
+    GENERATION_QUEUE_MAX_PER_KEY
+)
+from src.utils.task_store import TaskStore
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class QueueFullError(Exception):
+    """Raised when a job is refused by admission control."""
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a running job once its task has been cancelled."""
+
+
+def _key_hash(api_key: Optional[str]) -> str:
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+class GenerationJobQueue:
+    """
+    Bounded job queue with a fixed pool of worker threads.
+
+    Jobs are grouped per API key and the keys are served round-robin, so one user
+    submitting several generations cannot starve the others. Task state lives in the
+    task store shared with the routes (status, progress, current_step, ...); each
+    worker process runs its own queue, and finished tasks expire in the store.
+    """
+
+    def __init__(self, tasks: TaskStore, max_workers: int = GENERATION_WORKERS,
+                 max_depth: int = GENERATION_QUEUE_MAX_DEPTH, max_per_key: int = GENERATION_QUEUE_MAX_PER_KEY,
+                 on_task_update: Optional[Callable[[str], None]] = None,
+                 on_task_expired: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            tasks (TaskStore): Task states by task_id, updated by the queue and the jobs
+            max_workers (int): Number of jobs running at the same time
+            max_depth (int): Maximum number of jobs waiting for a worker
+            max_per_key (int): Maximum number of queued + running jobs per API key
+            on_task_update (callable, optional): Called with the task_id when the queue changes its status
+            on_task_expired (callable, optional): Called with the task_id when a finished task is forgotten
+        """
+        self.tasks = tasks
+        self.max_workers = max(1, max_workers)
+        self.max_depth = max_depth
+        self.max_per_key = max_per_key
+        self.on_task_update = on_task_update
+        self.on_task_expired = on_task_expired
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._jobs_per_key: Counter = Counter()
+        self._cancelled = set()
+        self._cond = threading.Condition()
+        self._workers = []
+
+    def _notify_update(self, task_id: str) -> None:
+        if self.on_task_update is not None:
+            try:
+                self.on_task_update(task_id)
+            except Exception as e:
+                logger.warning(f"[Queue] Task update listener failed for {task_id}: {e}")
+
+    def _ensure_workers(self) -> None:
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, name=f"generation-worker-{len(self._workers) + 1}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _queued_count(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, task_id: str, api_key: Optional[str], func: Callable, *args, **kwargs) -> int:
+        """
+        Queue func(*args, **kwargs) for the already registered task task_id.
+
+        Returns:
+            int: Position of the job in the queue (1 = next to run)
+
+        Raises:
+            QueueFullError: If the queue or the API key's quota is full
+        """
+        key = _key_hash(api_key)
+        with self._cond:
+            self._prune_expired()
+            if self._queued_count() >= self.max_depth:
+                raise QueueFullError("The server is busy: too many generations are waiting. Please retry in a few minutes.")
+            if self._jobs_per_key[key] >= self.max_per_key:
+                raise QueueFullError(f"You already have {self._jobs_per_key[key]} generations in progress. Please wait for one to finish.")
+            self._queues.setdefault(key, deque()).append((task_id, func, args, kwargs))
+            self._jobs_per_key[key] += 1
+            position = self._queued_count()
+            task = self.tasks[task_id]
+            task['status'] = 'queued'
+            task['current_step'] = f"Waiting in queue (position {position})..."
+            self._notify_update(task_id)
+            self._ensure_workers()
+            self._cond.notify()
+        logger.info(f"[Queue] Task {task_id} queued at position {position}")
+        return position
+
+    def _next_job(self):
+        """Pop the next job, rotating over API keys. Caller holds the lock."""
+        key, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        del self._queues[key]
+        if queue:
+            self._queues[key] = queue  # Re-inserted last: next job goes to another key
+        return key, job
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queues:
+                    if not self._cond.wait(timeout=60):
+                        self._prune_expired()
+                key, (task_id, func, args, kwargs) = self._next_job()
+                task = self.tasks.get(task_id)
+                if task is not None:
+                    task['status'] = 'in_progress'
+                    task['started_at'] = time.time()
+                    self._notify_update(task_id)
+            try:
+                func(*args, **kwargs)
+            except GenerationCancelled:
+                logger.info(f"[Queue] Task {task_id} stopped after cancellation")
+            except Exception as e:
+                logger.error(f"[Queue] Task {task_id} crashed: {e}", exc_info=True)
+                if task is not None and task.get('status') not in FINISHED_STATUSES:
+                    task['status'] = 'failed'
+                    task['error'] = str(e)
+            finally:
+                with self._cond:
+                    self._jobs_per_key[key] -= 1
+                    if self._jobs_per_key[key] <= 0:
+                        del self._jobs_per_key[key]
+                    if task is not None:
+                        if task_id in self._cancelled:
+                            task['status'] = 'cancelled'
+                            task['error'] = "Generation cancelled"
+                        elif task.get('status') not in FINISHED_STATUSES:
+                            task['status'] = 'failed'
+                            task['error'] = task.get('error') or "Generation stopped unexpectedly"
+                        task['finished_at'] = time.time()
+                        self._notify_update(task_id)
+                    self._cancelled.discard(task_id)
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        Cancel a task: a queued job is dropped, a running job stops at its next checkpoint.
+        Only the jobs of this process can be cancelled.
+
+        Returns:
+            bool: True if the task was queued or running here
+        """
+        with self._cond:
+            for key, queue in list(self._queues.items()):
+                for job in queue:
+                    if job[0] == task_id:
+                        queue.remove(job)
+                        if not queue:
+                            del self._queues[key]
+                        self._jobs_per_key[key] -= 1
+                        if self._jobs_per_key[key] <= 0:
+                            del self._jobs_per_key[key]
+                        task = self.tasks.get(task_id)
+                        if task is not None:
+                            task['status'] = 'cancelled'
+                            task['error'] = "Generation cancelled"
+                            task['finished_at'] = time.time()
+                            self._notify_update(task_id)
+                        return True
+            task = self.tasks.get(task_id) if self.tasks.is_local(task_id) else None
+            if task is not None and task.get('status') == 'in_progress':
+                self._cancelled.add(task_id)
+                task['current_step'] = "Cancelling..."
+                self._notify_update(task_id)
+                return True
+        return False
+
+    def check_cancelled(self, task_id: str) -> None:
+        """Checkpoint for running jobs: raise GenerationCancelled if the task was cancelled."""
+        if task_id in self._cancelled:
+            raise GenerationCancelled(task_id)
+
+    def _prune_expired(self) -> None:
+        """Forget finished tasks past their expiry (handled by the task store). Caller holds the lock."""
+        expired = self.tasks.purge_expired()
+        for task_id in expired:
+            if self.on_task_expired is not None:
+                self.on_task_expired(task_id)
+        if expired:
+            logger.info(f"[Queue] {len(expired)} finished tasks expired")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and the limits in force."""
+        with self._cond:
+            queued = self._queued_count()
+            running = sum(self._jobs_per_key.values()) - queued
+        return {
+            'queued': queued,
+            'running': running,
+            'workers': self.max_workers,
+            'max_depth': self.max_depth,
+            'max_per_key': self.max_per_key,
+            'tasks_tracked': len(self.tasks)
+        }
@@ -0,0 +1,69 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Diffusion des événements de progression des générations (Server-Sent Events).
+Chaque tâche garde un journal borné d'événements numérotés, ce qui permet à un
+client qui se reconnecte de reprendre après le dernier identifiant reçu (Last-Event-ID).
+"""
+
+import json
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class ProgressEventBroker:
+    """
+    Thread-safe per-task event log with blocking reads.
+    Event ids increase per task, starting at 1.
+    """
+
+    def __init__(self, max_events_per_task: int = 500):
+        self.max_events_per_task = max_events_per_task
+        self._events: Dict[str, deque] = {}
+        self._last_id: Dict[str, int] = {}
+        self._cond = threading.Condition()
+
+    def publish(self, task_id: str, data: Dict[str, Any]) -> int:
+        """Append an event to the task's log and wake up its readers. Returns the event id."""
+        with self._cond:
+            event_id = self._last_id.get(task_id, 0) + 1
+            self._last_id[task_id] = event_id
+            self._events.setdefault(task_id, deque(maxlen=self.max_events_per_task)).append((event_id, data))
+            self._cond.notify_all()
+        return event_id
+
+    def get_events(self, task_id: str, last_event_id: int = 0, timeout: Optional[float] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Return the events newer than last_event_id, waiting up to timeout seconds for one.
+        Events evicted from the bounded log are skipped.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_id.get(task_id, 0) > last_event_id, timeout=timeout)
+            return [(event_id, data) for event_id, data in self._events.get(task_id, ()) if event_id > last_event_id]
+
+    def discard(self, task_id: str) -> None:
+        """Forget the events of a task (called when the task expires)."""
+        with self._cond:
+            self._events.pop(task_id, None)
+            self._last_id.pop(task_id, None)
+
+
+def format_sse(event_id: int, data: Dict[str, Any], event: str = "progress") -> str:
+    """Serialize one event in the text/event-stream format."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
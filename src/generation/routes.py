@@ -13,12 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <https://www.gnu.org/licenses/>
 
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, flash, send_file, current_app
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, flash, send_file, current_app, Response
 import os
 import uuid
-import threading
-import zipfile
-import io
+import time
 from pathlib import Path
 from datetime import datetime
 import traceback # Ensure traceback is imported
@@ -27,12 +25,42 @@ from src.utils.model_utils import is_free_model
 from src.api.openrouter_api import extract_files_from_response, generate_code_with_openrouter
 from src.utils.prompt_loader import get_agent_prompt
 from src.utils.session_utils import clean_generation_result_for_session, clean_session_after_generation, estimate_session_size
-from src.utils.server_storage import store_generation_data, get_generation_data, delete_generation_data
+from src.utils.server_storage import store_generation_data, get_generation_data, delete_generation_data, store_api_key, get_api_key
+from src.utils.task_store import get_task_store
+from src.utils.zip_utils import stream_zip, zip_artifact_cache, invalidate_zip_artifacts
+from src.utils.project_index import get_project_index, note_file_written
+from src.utils.context_retrieval import get_retrieval_index, format_snippets
+from src.utils.edit_blocks import parse_edit_blocks, strip_edit_blocks, apply_edit_blocks
+from src.generation.job_queue import GenerationJobQueue, QueueFullError, GenerationCancelled
+from src.generation.progress_events import ProgressEventBroker, format_sse, TERMINAL_STATUSES
 
 # Blueprint for generation
 bp_generation = Blueprint('generation', __name__)
 
-generation_tasks = {}
+# Task states are shared by every worker process through the task store (SQLite by default)
+generation_tasks = get_task_store()
+progress_events = ProgressEventBroker()
+
+def _task_snapshot(task):
+    return {
+        'status': task.get('status'),
+        'progress': task.get('progress', 0),
+        'current_step': task.get('current_step', ''),
+        'error': task.get('error')
+    }
+
+def publish_task_update(task_id):
+    """Push the current state of a task to its progress event stream."""
+    task = generation_tasks.get(task_id)
+    if task is not None:
+        progress_events.publish(task_id, _task_snapshot(task))
+
+def set_task_progress(task_id, progress, current_step):
+    generation_tasks[task_id]['progress'] = progress
+    generation_tasks[task_id]['current_step'] = current_step
+    publish_task_update(task_id)
+
+generation_queue = GenerationJobQueue(generation_tasks, on_task_update=publish_task_update, on_task_expired=progress_events.discard)
 
 # ...existing code for build_directory_structure if needed...
 
@@ -48,10 +76,12 @@ def generate_application_thread(task_id, api_key, model, prompt, target_dir, use
 def _generate_application_thread_body(task_id, api_key, model, prompt, target_dir, use_mcp, frontend_framework, include_animations, empty_files_check):
     try:
         def update_progress_callback(step, message, progress=None):
+            generation_queue.check_cancelled(task_id)
             if progress is not None:
                 generation_tasks[task_id]['progress'] = progress
             if message:
                 generation_tasks[task_id]['current_step'] = message
+            publish_task_update(task_id)
             current_app.logger.info(f"[Task {task_id} - Step {step}] {message}")
         success = generate_application(
             api_key=api_key,
@@ -65,22 +95,9 @@ def _generate_application_thread_body(task_id, api_key, model, prompt, target_di
         )
         used_tools = current_app.config.pop('used_tools_details', [])
         if success:
-            files_written = []
-            files_still_empty = []
-            for root, dirs, files in os.walk(target_dir):
-                if '__pycache__' in dirs:
-                    dirs.remove('__pycache__')
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
-                files[:] = [f for f in files if not f.startswith('.')]
-                for file in files:
-                    rel_path = os.path.relpath(os.path.join(root, file), target_dir)
-                    rel_path = os.path.normpath(rel_path).replace(os.sep, '/')
-                    files_written.append(rel_path)
-                    try:
-                        if os.path.getsize(os.path.join(root, file)) == 0:
-                            files_still_empty.append(rel_path)
-                    except OSError:
-                        pass
+            project_files = get_project_index(target_dir).files()
+            files_written = [entry.path for entry in project_files]
+            files_still_empty = [entry.path for entry in project_files if entry.size == 0]
             generation_tasks[task_id]['progress'] = 100
             generation_tasks[task_id]['status'] = 'completed'
             generation_tasks[task_id]['result'] = {
@@ -101,6 +118,10 @@ def _generate_application_thread_body(task_id, api_key, model, prompt, target_di
                 generation_tasks[task_id]['error'] = "Application generation failed (unknown reason)"
             generation_tasks[task_id]['result'] = {'success': False, 'used_tools': used_tools}
             current_app.logger.error(f"[Task {task_id}] Generation failed: {generation_tasks[task_id]['error']}")
+    except GenerationCancelled:
+        current_app.logger.info(f"[Task {task_id}] Generation cancelled.")
+        current_app.config.pop('used_tools_details', None)
+        raise
     except Exception as e:
         import traceback
         current_app.logger.error(f"[Task {task_id}] Error during generation: {str(e)}")
@@ -110,86 +131,69 @@ def _generate_application_thread_body(task_id, api_key, model, prompt, target_di
         used_tools_on_error = current_app.config.pop('used_tools_details', [])
         generation_tasks[task_id]['result'] = {'success': False, 'used_tools': used_tools_on_error}
 
+def _request_complete_files(api_key, model, system_prompt, target_dir, failed, edit_blocks):
+    """
+    Ask the model for the complete content of the files whose edits could not be applied.
+
+    Returns:
+        dict: Normalized path -> content, for the requested files only
+    """
+    project_index = get_project_index(target_dir)
+    current_files = "\n".join(
+        f"FILE: {path}\n```\n{project_index.read_text(path)}\n```\n" for path in failed
+    )
+    failed_edits = "\n".join(
+        f"EDIT: {block.path}\n<<<<<<< SEARCH\n{block.search}=======\n{block.replace}>>>>>>> REPLACE"
+        for block in edit_blocks if block.path in failed
+    )
+    user_prompt = get_agent_prompt(
+        'iteration_agent',
+        'iteration_fallback_prompt',
+        failed_files="\n".join(failed),
+        current_files=current_files,
+        failed_edits=failed_edits
+    )
+    response = generate_code_with_openrouter(
+        api_key=api_key,
+        model=model,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        temperature=0.3
+    )
+    if not response or 'error' in response:
+        return {}
+    wanted = {os.path.normpath(path) for path in failed}
+    return {path: content for path, content in extract_files_from_response(response).items() if path in wanted}
+
+
 def iterate_application_thread(task_id, api_key, model, reformulated_prompt, feedback, target_dir, regenerate_code=False, flask_app=None):
     app_ctx = flask_app or current_app._get_current_object()
     with app_ctx.app_context():
         try:
-            generation_tasks[task_id]['progress'] = 10
-            generation_tasks[task_id]['current_step'] = "Analyzing existing code..."
-            existing_files = {}
+            set_task_progress(task_id, 10, "Analyzing existing code...")
             try:
-                for root, dirs, files in os.walk(target_dir):
-                    for file in files:
-                        rel_path = os.path.relpath(os.path.join(root, file), target_dir)
-                        if os.path.getsize(os.path.join(root, file)) > 0:
-                            with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
-                                try:
-                                    existing_files[rel_path] = f.read()
-                                except:
-                                    pass
+                project_index = get_project_index(target_dir)
+                file_list = [entry.path for entry in project_index.files(non_empty=True)]
+                # Files and chunks ranked against the feedback (BM25), within the token budget
+                snippets = get_retrieval_index(target_dir).select_context(feedback)
             except Exception as e:
                 app_ctx.logger.error(f"Error reading existing files: {str(e)}")
                 generation_tasks[task_id]['error'] = f"Error reading files: {str(e)}"
                 generation_tasks[task_id]['status'] = 'failed'
                 return
-            generation_tasks[task_id]['progress'] = 30
-            generation_tasks[task_id]['current_step'] = "Preparing iteration..."
-            # Only send list of file paths to minimize tokens
-            file_list = sorted(existing_files.keys())
-            # Provide list of files
-            code_summary = "List of existing files:\n" + "\n".join(file_list) + "\n"            # Include brief previews of key HTML/CSS files to preserve style context
-            detailed_context = ""
-            for path in file_list:
-                if path.lower().endswith(('.html', '.css')):
-                    content = existing_files.get(path, '')
-                    preview = content[:1000] + ('...' if len(content) > 1000 else '')
-                    detailed_context += f"FILE: {path}\n```\n{preview}\n```\n\n"
-            if detailed_context:
-                code_summary += "\nDetailed file previews for style context:\n" + detailed_context
-            
+            set_task_progress(task_id, 30, "Preparing iteration...")
+
             # Load system prompt for iteration agent
             system_prompt = get_agent_prompt('iteration_agent', 'iteration_system_prompt')
 
-            # --- Détection automatique des fichiers concernés par l'itération ---
-            import re
-            feedback_lower = feedback.lower()
-            # Heuristique simple : cherche des mots-clés de fichiers ou d'éléments
-            file_keywords = []
-            if 'navbar' in feedback_lower or 'menu' in feedback_lower:
-                file_keywords += ['navbar', 'menu', 'header']
-            if 'footer' in feedback_lower:
-                file_keywords += ['footer']
-            if 'button' in feedback_lower or 'bouton' in feedback_lower:
-                file_keywords += ['button', 'btn']
-            if 'background' in feedback_lower or 'fond' in feedback_lower:
-                file_keywords += ['style', 'background', 'css']
-            if 'color' in feedback_lower or 'couleur' in feedback_lower:
-                file_keywords += ['style', 'color', 'css']
-            if 'page' in feedback_lower:
-                file_keywords += ['index', 'page', 'main']
-            # Ajoute d'autres heuristiques selon besoin...
-
-            # Recherche les fichiers concernés
-            targeted_files = []
-            for path in file_list:
-                for kw in file_keywords:
-                    if kw in path.lower():
-                        targeted_files.append(path)
-                        break
-            # Si rien trouvé, fallback sur tous les fichiers HTML/CSS
-            if not targeted_files:
-                targeted_files = [p for p in file_list if p.lower().endswith(('.html', '.css'))]
-            # Extraction des extraits pertinents
-            detailed_context = ""
-            for path in targeted_files:
-                content = existing_files.get(path, '')
-                preview = content[:2000] + ('...' if len(content) > 2000 else '')
-                detailed_context += f"FILE: {path}\n```\n{preview}\n```\n\n"
+            targeted_files = list(dict.fromkeys(snippet.path for snippet in snippets))
+            detailed_context = format_snippets(snippets)
             # Résumé du style global (extraction des variables CSS principales)
+            import re
             style_summary = ""
             for path in file_list:
                 if path.lower().endswith('.css'):
-                    css_content = existing_files.get(path, '')
+                    css_content = project_index.read_text(path)
                     # Extrait les variables CSS et couleurs principales
                     vars_found = re.findall(r'--[\w-]+:\s*[^;]+;', css_content)
                     colors_found = re.findall(r'#[0-9a-fA-F]{3,6}|rgb\([^\)]+\)', css_content)
@@ -197,7 +201,11 @@ def iterate_application_thread(task_id, api_key, model, reformulated_prompt, fee
                         style_summary += f"\nDans {path}:\nVariables CSS: {', '.join(vars_found[:10])}\nCouleurs: {', '.join(colors_found[:10])}\n"
             if style_summary:
                 detailed_context += f"\nRésumé du style global :\n{style_summary}\n"
-            code_summary = "Liste des fichiers concernés :\n" + "\n".join(targeted_files) + "\n\nExtraits pertinents :\n" + detailed_context
+            other_files = [path for path in file_list if path not in targeted_files]
+            code_summary = "Liste des fichiers concernés :\n" + "\n".join(targeted_files)
+            if other_files:
+                code_summary += "\n\nAutres fichiers du projet :\n" + "\n".join(other_files)
+            code_summary += "\n\nExtraits pertinents :\n" + detailed_context
             
             # Load user prompt template for iteration
             user_prompt = get_agent_prompt(
@@ -206,10 +214,10 @@ def iterate_application_thread(task_id, api_key, model, reformulated_prompt, fee
                 feedback=feedback,
                 code_summary=code_summary
             )
-            generation_tasks[task_id]['progress'] = 50
-            generation_tasks[task_id]['current_step'] = "Generating improvements..."
+            generation_queue.check_cancelled(task_id)
+            set_task_progress(task_id, 50, "Generating improvements...")
             # Debug: log prompt sizes to estimate token usage
-            app_ctx.logger.info(f"Iteration prompts size: system_prompt {len(system_prompt)} chars, user_prompt {len(user_prompt)} chars, file_list entries {len(file_list)}")
+            app_ctx.logger.info(f"Iteration prompts size: system_prompt {len(system_prompt)} chars, user_prompt {len(user_prompt)} chars, file_list entries {len(file_list)}, context files {len(targeted_files)}")
             response = generate_code_with_openrouter(
                 api_key=api_key,
                 model=model,
@@ -222,9 +230,23 @@ def iterate_application_thread(task_id, api_key, model, reformulated_prompt, fee
                 generation_tasks[task_id]['error'] = error_message
                 generation_tasks[task_id]['status'] = 'failed'
                 return
-            generation_tasks[task_id]['progress'] = 70
-            generation_tasks[task_id]['current_step'] = "Applying improvements..."
-            modified_files = extract_files_from_response(response)
+            generation_queue.check_cancelled(task_id)
+            set_task_progress(task_id, 70, "Applying improvements...")
+            # Targeted SEARCH/REPLACE edits, complete files for new or largely rewritten ones
+            response_text = response.get('content', '') or ''
+            edit_blocks = parse_edit_blocks(response_text)
+            modified_files = extract_files_from_response({'content': strip_edit_blocks(response_text)}) if edit_blocks \
+                else extract_files_from_response(response)
+            if edit_blocks:
+                edited, failed = apply_edit_blocks(
+                    target_dir, [block for block in edit_blocks if os.path.normpath(block.path) not in modified_files])
+                for file_path, content in edited.items():
+                    modified_files[os.path.normpath(file_path)] = content
+                if failed:
+                    app_ctx.logger.warning(f"Edits not applicable to {', '.join(failed)} ({'; '.join(failed.values())}), requesting the complete files")
+                    set_task_progress(task_id, 80, "Regenerating files whose edits did not apply...")
+                    modified_files.update(_request_complete_files(api_key, model, system_prompt, target_dir, failed, edit_blocks))
+                app_ctx.logger.info(f"Iteration edits: {len(edit_blocks)} blocks, {len(edited)} files patched, {len(failed)} files rewritten in full")
             if not modified_files:
                 app_ctx.logger.warning("No files were extracted from the API response.")
                 code_response_text = response.get('content', '')
@@ -246,10 +268,13 @@ def iterate_application_thread(task_id, api_key, model, reformulated_prompt, fee
                     os.makedirs(os.path.dirname(full_path), exist_ok=True)
                     with open(full_path, 'w', encoding='utf-8') as f:
                         f.write(content)
+                    note_file_written(full_path)
                     files_written.append(norm_path)
                     app_ctx.logger.info(f"Modified file written: {full_path}")
                 except Exception as e:
                     app_ctx.logger.error(f"Error writing file {file_path}: {str(e)}")
+            if files_written:
+                invalidate_zip_artifacts(target_dir)
             generation_tasks[task_id]['progress'] = 100
             generation_tasks[task_id]['status'] = 'completed'
             generation_tasks[task_id]['result'] = {
@@ -263,6 +288,9 @@ def iterate_application_thread(task_id, api_key, model, reformulated_prompt, fee
                 'iteration': True
             }
             app_ctx.logger.info(f"Iteration completed. {len(files_written)} files modified.")
+        except GenerationCancelled:
+            app_ctx.logger.info(f"Iteration {task_id} cancelled.")
+            raise
         except Exception as e:
             app_ctx.logger.error(f"Error during iteration: {str(e)}")
             generation_tasks[task_id]['error'] = str(e)
@@ -326,16 +354,19 @@ def generate():
             'result': None
         }
         app = current_app._get_current_object()
-        thread = threading.Thread(
-            target=generate_application_thread,
-            args=(task_id, api_key, model, prompt, target_dir, use_mcp, frontend_framework, include_animations, empty_files_check, app)
-        )
-        thread.daemon = True
-        thread.start()
+        try:
+            queue_position = generation_queue.submit(
+                task_id, api_key, generate_application_thread,
+                task_id, api_key, model, prompt, target_dir, use_mcp, frontend_framework, include_animations, empty_files_check, app
+            )
+        except QueueFullError as e:
+            generation_tasks.pop(task_id, None)
+            return jsonify({"status": "error", "errors": [str(e)]})
         return jsonify({
             "status": "success",
             "message": "Generation started",
-            "task_id": task_id
+            "task_id": task_id,
+            "queue_position": queue_position
         })
     except Exception as e:
         current_app.logger.error(f"Error during generation: {str(e)}")
@@ -362,9 +393,10 @@ def generation_progress():
         generation_id = f"{session.get('_id', 'anonymous')}_{task_id}"
         
         # Stocker les données complètes côté serveur
+        # L'API key reste en mémoire du processus : le store est persisté sur disque
+        store_api_key(generation_id, session.get('api_key'))
         store_generation_data(generation_id, {
             'full_result': full_result,
-            'api_key': session.get('api_key'),  # Stocker l'API key côté serveur
             'target_dir': session.get('target_dir'),
             'prompt': session.get('prompt'),
             'model': session.get('model'),
@@ -421,10 +453,90 @@ def generation_progress():
     }
     if task['status'] == 'completed':
         response["redirect_url"] = url_for('generation.result')
-    elif task['status'] == 'failed':
+    elif task['status'] in ('failed', 'cancelled'):
         response["error"] = task['error']
     return jsonify(response)
 
+@bp_generation.route('/generation_events', methods=['GET'])
+def generation_events():
+    """
+    Server-Sent Events stream of the progress of the session's generation task.
+    Reconnecting clients resume after the Last-Event-ID header (or last_event_id query param).
+    The stream ends after a terminal event (completed, failed or cancelled).
+    """
+    task_id = request.args.get('task_id') or session.get('generation_task_id')
+    if not task_id or task_id not in generation_tasks:
+        return jsonify({
+            "status": "error",
+            "message": "No generation task found"
+        }), 404
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+    if not generation_tasks.is_local(task_id):
+        # Task run by another worker process: follow its state through the task store
+        # (ids keep increasing from Last-Event-ID; each event carries the full state)
+        def remote_stream():
+            event_id = last_event_id
+            last_state = None
+            idle_seconds = 0
+            while True:
+                task = generation_tasks.get(task_id)
+                if task is None:
+                    return
+                state = _task_snapshot(task)
+                if state != last_state:
+                    event_id += 1
+                    last_state = state
+                    idle_seconds = 0
+                    yield format_sse(event_id, state)
+                    if state['status'] in TERMINAL_STATUSES:
+                        return
+                elif idle_seconds >= 15:
+                    idle_seconds = 0
+                    yield ": keep-alive\n\n"
+                time.sleep(1)
+                idle_seconds += 1
+
+        return Response(remote_stream(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    if last_event_id == 0:
+        # New subscriber: make sure it receives the current state even if nothing changes for a while
+        publish_task_update(task_id)
+
+    def stream():
+        event_id = last_event_id
+        while True:
+            events = progress_events.get_events(task_id, event_id, timeout=15)
+            if not events:
+                task = generation_tasks.get(task_id)
+                if task is None or task.get('status') in TERMINAL_STATUSES:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event_id, data in events:
+                yield format_sse(event_id, data)
+            if events[-1][1].get('status') in TERMINAL_STATUSES:
+                return
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@bp_generation.route('/cancel_generation', methods=['POST'])
+def cancel_generation():
+    task_id = request.form.get('task_id') or session.get('generation_task_id')
+    if not task_id or not generation_queue.cancel(task_id):
+        return jsonify({
+            "status": "error",
+            "message": "No queued or running generation task found"
+        })
+    return jsonify({"status": "success", "message": "Cancellation requested", "task_id": task_id})
+
 @bp_generation.route('/result')
 def result():
     if 'generation_result' not in session:
@@ -484,9 +596,9 @@ def iterate_generation():
             if server_data:
                 target_dir = server_data.get('target_dir', '')
                 reformulated_prompt = server_data.get('reformulated_prompt', '')
-                # Utiliser l'API key stockée côté serveur si pas fournie
+                # Utiliser l'API key gardée en mémoire si pas fournie
                 if not api_key:
-                    api_key = server_data.get('api_key', '')
+                    api_key = get_api_key(generation_id) or ''
         
         # Fallback vers les données de session si pas de stockage serveur
         if not target_dir:
@@ -517,16 +629,19 @@ def iterate_generation():
             'previous_result': session['generation_result']
         }
         app = current_app._get_current_object()
-        thread = threading.Thread(
-            target=iterate_application_thread,
-            args=(task_id, api_key, model, reformulated_prompt, feedback, target_dir, False, app)
-        )
-        thread.daemon = True
-        thread.start()
+        try:
+            queue_position = generation_queue.submit(
+                task_id, api_key, iterate_application_thread,
+                task_id, api_key, model, reformulated_prompt, feedback, target_dir, False, app
+            )
+        except QueueFullError as e:
+            generation_tasks.pop(task_id, None)
+            return jsonify({"status": "error", "message": str(e)})
         return jsonify({
             "status": "success",
             "message": "Iteration started",
-            "task_id": task_id
+            "task_id": task_id,
+            "queue_position": queue_position
         })
     except Exception as e:
         current_app.logger.error(f"Error during iteration: {str(e)}")
@@ -581,16 +696,19 @@ def continue_iteration():
             'previous_result': session['generation_result']
         }
         app = current_app._get_current_object()
-        thread = threading.Thread(
-            target=iterate_application_thread,
-            args=(task_id, api_key, model, reformulated_prompt, feedback, target_dir, regenerate_code, app)
-        )
-        thread.daemon = True
-        thread.start()
+        try:
+            queue_position = generation_queue.submit(
+                task_id, api_key, iterate_application_thread,
+                task_id, api_key, model, reformulated_prompt, feedback, target_dir, regenerate_code, app
+            )
+        except QueueFullError as e:
+            generation_tasks.pop(task_id, None)
+            return jsonify({"status": "error", "message": str(e)})
         return jsonify({
             "status": "success",
             "message": "Iteration started",
-            "task_id": task_id
+            "task_id": task_id,
+            "queue_position": queue_position
         })
     except Exception as e:
         current_app.logger.error(f"Error during iteration: {str(e)}")
@@ -613,10 +731,6 @@ def download_zip():
         current_app.logger.debug(f"session.get('target_dir') from generation_result: {session.get('generation_result', {}).get('target_directory')}")
 
 
-        from src.utils.env_utils import is_vercel_environment
-        from src.utils.file_utils import cleanup_vercel_project
-        current_app.logger.debug("Successfully imported env_utils and file_utils in download_zip.")
-
         if 'generation_result' not in session:
             current_app.logger.error("'generation_result' not found in session for download_zip.")
             flash("No generation result found. Please generate an application first.", "warning")
@@ -631,52 +745,35 @@ def download_zip():
             flash("Target directory not found", "danger")
             return redirect(url_for('generation.result'))
         
-        is_vercel = is_vercel_environment()
-        # Make sure 'is_vercel_project' is accessed safely if it might not exist
-        is_vercel_project = current_app.config.get('is_vercel_project', False)
-        current_app.logger.debug(f"Vercel check: is_vercel={is_vercel}, is_vercel_project={is_vercel_project}")
-        
-        current_app.logger.info(f"Attempting to create ZIP for directory: {target_dir}")
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(target_dir):
-                # Exclude hidden files/dirs and __pycache__
-                dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
-                files[:] = [f for f in files if not f.startswith('.')] # Corrected this line
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, target_dir)
-                    current_app.logger.debug(f"Adding to ZIP: {file_path} as {rel_path}")
-                    zipf.write(file_path, rel_path)
-        memory_file.seek(0)
-        
         dir_name = os.path.basename(os.path.normpath(target_dir))
         zip_filename = f"{dir_name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
-        current_app.logger.info(f"ZIP file '{zip_filename}' created in memory. Size: {memory_file.getbuffer().nbytes} bytes.")
 
-        def cleanup_after_send():
-            try: # Added try-except for cleanup
-                if is_vercel and is_vercel_project:
-                    current_app.logger.info(f"Vercel cleanup: Attempting to remove {target_dir}")
-                    cleanup_vercel_project(Path(target_dir))
-                    current_app.logger.info(f"Vercel cleanup: Project directory {target_dir} cleaned up.")
-            except Exception as e_cleanup:
-                 current_app.logger.error(f"Exception in Vercel cleanup: {str(e_cleanup)}\\nTraceback:\\n{traceback.format_exc()}")
+        try:
+            # Unchanged projects are served from their prebuilt archive; the manifest hash is the ETag
+            artifact_path, manifest_hash = zip_artifact_cache.lookup(target_dir)
+        except OSError as e:
+            current_app.logger.warning(f"ZIP artifact cache unavailable ({e}), streaming the archive only.")
+            artifact_path, manifest_hash = None, None
 
-        
-        response = send_file(
-            memory_file,
-            as_attachment=True, 
-            download_name=zip_filename,
-            mimetype='application/zip'
-        )
-        current_app.logger.info(f"Prepared send_file response for {zip_filename}.")
-        
-        if is_vercel and is_vercel_project:
-            current_app.logger.info("Scheduling Vercel cleanup after send.")
-            threading.Timer(5.0, cleanup_after_send).start() 
-        
+        if artifact_path:
+            current_app.logger.info(f"Sending ZIP '{zip_filename}' from artifact {manifest_hash}")
+            response = send_file(
+                artifact_path,
+                mimetype='application/zip',
+                as_attachment=True,
+                download_name=zip_filename,
+                etag=manifest_hash,
+                conditional=True
+            )
+        else:
+            # The archive is compressed while it is sent (memory use does not grow with the
+            # project) and kept as the artifact of this manifest once complete
+            chunks = zip_artifact_cache.stream_and_store(target_dir, manifest_hash) if manifest_hash else stream_zip(target_dir)
+            response = Response(
+                chunks,
+                mimetype='application/zip',
+                headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
+            )
         current_app.logger.debug("download_zip route processing complete, returning response.")
         return response
         
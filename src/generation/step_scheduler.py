@@ -0,0 +1,110 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Ordonnanceur des étapes de génération.
+Exécute en parallèle les étapes indépendantes (frontend, backend, tests, documentation)
+en respectant leurs dépendances déclarées et une limite de concurrence.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from src.api.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+def get_step_concurrency(selected_model: str, max_workers: int) -> int:
+    """
+    Concurrency limit for the steps of one generation.
+    Throttled (free) models never get more parallel steps than their bucket's burst,
+    otherwise the extra steps would only queue inside the rate limiter.
+    """
+    burst = rate_limiter.get_burst(selected_model)
+    if burst is not None:
+        max_workers = min(max_workers, burst)
+    return max(1, max_workers)
+
+
+class StepScheduler:
+    """
+    Run named steps as a DAG on a thread pool.
+    A step starts as soon as all the steps it depends on have completed successfully;
+    steps whose dependency failed are skipped and get a None result.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self.max_workers = max(1, max_workers)
+        self._steps: Dict[str, Dict[str, Any]] = {}
+
+    def add_step(self, name: str, func: Callable, *args, depends_on: Iterable[str] = (), **kwargs) -> None:
+        """
+        Register a step. func(*args, **kwargs) is called when its dependencies are done.
+        """
+        if name in self._steps:
+            raise ValueError(f"Step '{name}' is already registered")
+        self._steps[name] = {
+            'func': func,
+            'args': args,
+            'kwargs': kwargs,
+            'depends_on': set(depends_on)
+        }
+
+    def run(self) -> Dict[str, Optional[Any]]:
+        """
+        Execute every registered step and return {name: result} in registration order.
+        A step raising an exception is logged and its result is None.
+        """
+        for name, step in self._steps.items():
+            unknown = step['depends_on'] - self._steps.keys()
+            if unknown:
+                raise ValueError(f"Step '{name}' depends on unknown steps: {sorted(unknown)}")
+
+        results: Dict[str, Optional[Any]] = {}
+        failed = set()
+        pending = dict(self._steps)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="generation-step") as executor:
+            while pending or running:
+                for name in list(pending):
+                    depends_on = pending[name]['depends_on']
+                    if depends_on & failed:
+                        logger.warning(f"Skipping step '{name}': a dependency failed")
+                        results[name] = None
+                        failed.add(name)
+                        del pending[name]
+                    elif depends_on <= results.keys() and len(running) < self.max_workers:
+                        step = pending.pop(name)
+                        running[executor.submit(step['func'], *step['args'], **step['kwargs'])] = name
+
+                if not running:
+                    if pending:
+                        raise ValueError(f"Dependency cycle between steps: {sorted(pending)}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Step '{name}' failed: {e}", exc_info=True)
+                        results[name] = None
+                        failed.add(name)
+
+        return {name: results.get(name) for name in self._steps}
@@ -21,24 +21,34 @@ import time
 import json
 import logging
 from src.api.openrouter_api import call_openrouter_api
-from src.utils.model_utils import is_free_model
-from src.config.constants import RATE_LIMIT_DELAY_SECONDS
+from src.api.rate_limiter import rate_limiter
 from src.utils.prompt_loader import get_agent_prompt, get_system_prompt_with_best_practices
 
+def parse_structure_interfaces(interfaces):
+    """
+    {chemin: [éléments fournis]} à partir de la liste 'interfaces' de la réponse ;
+    les entrées mal formées sont ignorées.
+    """
+    result = {}
+    if not isinstance(interfaces, list):
+        return result
+    for item in interfaces:
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            continue
+        provides = [str(value).strip() for value in item.get("provides") or [] if str(value).strip()]
+        if provides:
+            result[item["path"].strip().lstrip("/\\")] = provides
+    return result
+
 def define_project_structure(api_key, selected_model, reformulated_prompt, url_context, progress_callback=None, process_state=None):
     def update_progress(step, message, progress=None):
         if progress_callback:
             progress_callback(step, message, progress)
 
-    # Vérifier la limite de taux pour les modèles gratuits
-    if is_free_model(selected_model):
-        current_time = time.time()
-        last_api_call_time = process_state.get('last_api_call_time', 0) if process_state else 0
-        time_since_last_call = current_time - last_api_call_time
-        if time_since_last_call < RATE_LIMIT_DELAY_SECONDS:
-            wait_time = RATE_LIMIT_DELAY_SECONDS - time_since_last_call            
-            update_progress(2, f"⏳ Modèle gratuit détecté. Attente de {wait_time:.1f} secondes (limite de taux)...", 45)
-            time.sleep(wait_time)
+    # Le limiteur de débit partagé fait attendre l'appel ; on prévient seulement l'utilisateur
+    wait_time = rate_limiter.estimate_wait(selected_model, api_key)
+    if wait_time > 0:
+        update_progress(2, f"⏳ Rate limit: waiting {wait_time:.1f} s...", 45)
     
     # Load system prompt with best practices
     system_prompt = get_system_prompt_with_best_practices('project_structure_agent')
@@ -73,9 +83,22 @@ def define_project_structure(api_key, selected_model, reformulated_prompt, url_c
                             "type": "array",
                             "description": "List of all files and folders (folders end with /)",
                             "items": {"type": "string"}
+                        },
+                        "interfaces": {
+                            "type": "array",
+                            "description": "What each source file provides to the others (exports, endpoints, ...)",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "path": {"type": "string"},
+                                    "provides": {"type": "array", "items": {"type": "string"}}
+                                },
+                                "required": ["path", "provides"],
+                                "additionalProperties": False
+                            }
                         }
                     },
-                    "required": ["structure"],
+                    "required": ["structure", "interfaces"],
                     "additionalProperties": False
                 }
             }
@@ -97,6 +120,8 @@ def define_project_structure(api_key, selected_model, reformulated_prompt, url_c
             structure_lines = json_obj.get("structure", [])
             if process_state is not None:
                 process_state['project_structure'] = structure_lines
+                # Interfaces partagées par les groupes de fichiers générés en parallèle (facultatives)
+                process_state['project_interfaces'] = parse_structure_interfaces(json_obj.get("interfaces"))
             update_progress(2, "✅ Project structure successfully parsed from JSON.", 55)
         except Exception as e:
             update_progress(2, f"⚠️ Failed to parse JSON structure: {e}", 55)
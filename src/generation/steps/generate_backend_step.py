@@ -1,10 +1,11 @@
 """
 Step: Backend code generation only, based on structure and context.
 """
-def generate_backend_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None):
+BACKEND_KEYWORDS = ["backend", "api", "server", "app.py", "main.py", "manage.py", "routes.py", "controllers", "models", "services", "flask", "django", "express", "fastapi", ".py", ".go", ".rs", ".java", ".cs", "db/", "database", "sql", "mongodb"]
+
+def generate_backend_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None, stream_target_directory=None):
     # Filtrer la structure pour ne garder que les fichiers/dossiers backend
-    backend_keywords = ["backend", "api", "server", "app.py", "main.py", "manage.py", "routes.py", "controllers", "models", "services", "flask", "django", "express", "fastapi", ".py", ".go", ".rs", ".java", ".cs", "db/", "database", "sql", "mongodb"]
-    backend_files = [f for f in structure_lines if any(k in f.lower() for k in backend_keywords)]
+    backend_files = [f for f in structure_lines if any(k in f.lower() for k in BACKEND_KEYWORDS)]
     if not backend_files:
         if progress_callback:
             progress_callback(4, "No backend files detected in structure.", 80)
@@ -23,5 +24,6 @@ def generate_backend_step(api_key, selected_model, reformulated_prompt, structur
         mcp_client,
         user_prompt,
         progress_callback=progress_callback,
-        process_state=process_state
+        process_state=process_state,
+        stream_target_directory=stream_target_directory
     )
\ No newline at end of file
@@ -20,26 +20,59 @@ import json
 import re
 import time
 from pathlib import Path
-from src.api.openrouter_api import call_openrouter_api
-from src.utils.model_utils import is_free_model
-from src.config.constants import RATE_LIMIT_DELAY_SECONDS
+from src.api.openrouter_api import call_openrouter_api, OpenRouterStream
+from src.utils.file_utils import IncrementalCodeWriter
+from src.api.rate_limiter import rate_limiter
 from src.mcp.tool_utils import get_default_tools
 from src.utils.prompt_loader import get_system_prompt_with_best_practices, get_agent_prompt
 
-def generate_code_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None):
+def stream_code_generation(api_key, selected_model, messages, target_directory, structure_lines, tools=None, progress_callback=None, file_callback=None):
+    """
+    Stream the code generation response and write each file as soon as its block is complete.
+    file_callback, if given, is called with the path of each file written (instead of the
+    progress messages, for callers that aggregate several streams).
+    
+    Returns a response dict shaped like call_openrouter_api's, whose message content is empty
+    (the streamed text is not retained) and with an extra "streamed_files" entry:
+    {"files_written": [...], "errors": [...], "generation_incomplete": bool}.
+    """
+    expected_files = max(1, len([line for line in structure_lines if not line.strip().endswith('/')]))
+
+    def on_file_written(file_path):
+        if file_callback:
+            file_callback(file_path)
+        elif progress_callback:
+            written = len(writer.files_written)
+            progress = 60 + min(10, int(10 * written / expected_files))
+            progress_callback(5, f"📄 File written ({written}/{expected_files}): {Path(file_path).name}", progress)
+
+    writer = IncrementalCodeWriter(target_directory, on_file_written=on_file_written)
+    stream = OpenRouterStream(api_key, selected_model, messages, temperature=0.4, max_retries=2, tools=tools)
+    for token in stream:
+        writer.feed(token)
+    files_written, errors, generation_incomplete = writer.finish(discard_partial=stream.error is not None)
+
+    response = stream.to_response()
+    if "error" in response and not files_written:
+        return response
+    response["streamed_files"] = {
+        "files_written": files_written,
+        "errors": errors,
+        "generation_incomplete": generation_incomplete
+    }
+    return response
+
+def generate_code_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None, stream_target_directory=None):
     def update_progress(step, message, progress=None):
         if progress_callback:
             progress_callback(step, message, progress)
 
-    # Vérifier la limite de taux pour les modèles gratuits
-    if is_free_model(selected_model):
-        current_time = time.time()
-        last_api_call_time = process_state.get('last_api_call_time', 0) if process_state else 0
-        time_since_last_call = current_time - last_api_call_time
-        if time_since_last_call < RATE_LIMIT_DELAY_SECONDS:
-            wait_time = RATE_LIMIT_DELAY_SECONDS - time_since_last_call
-            update_progress(4, f"⏳ Modèle gratuit détecté. Attente de {wait_time:.1f} secondes (limite de taux)...", 70)
-            time.sleep(wait_time)    # Load system prompt with best practices using the new utility
+    # Le limiteur de débit partagé fait attendre l'appel ; on prévient seulement l'utilisateur
+    wait_time = rate_limiter.estimate_wait(selected_model, api_key)
+    if wait_time > 0:
+        update_progress(4, f"⏳ Rate limit: waiting {wait_time:.1f} s...", 70)
+
+    # Load system prompt with best practices using the new utility
     system_prompt_code = get_system_prompt_with_best_practices('code_generation_agent')
 
     # Load main generation prompt template
@@ -60,7 +93,17 @@ def generate_code_step(api_key, selected_model, reformulated_prompt, structure_l
         {"role": "user", "content": prompt_code_gen}
     ]
 
-    if use_mcp_tools:
+    if stream_target_directory:
+        response_code_gen = stream_code_generation(
+            api_key,
+            selected_model,
+            messages_code_gen,
+            stream_target_directory,
+            structure_lines,
+            tools=get_default_tools() if use_mcp_tools else None,
+            progress_callback=progress_callback
+        )
+    elif use_mcp_tools:
         response_code_gen = call_openrouter_api(
             api_key, 
             selected_model, 
@@ -1,10 +1,11 @@
 """
 Step: Génération de la documentation (README, docs, etc.) uniquement, selon la structure et le contexte.
 """
-def generate_documentation_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None):
+DOC_KEYWORDS = ["readme", "doc", "documentation", ".md", "guide", "manuel", "docs/"]
+
+def generate_documentation_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None, stream_target_directory=None):
     # Filtrer la structure pour ne garder que les fichiers de documentation
-    doc_keywords = ["readme", "doc", "documentation", ".md", "guide", "manuel", "docs/"]
-    doc_files = [f for f in structure_lines if any(k in f.lower() for k in doc_keywords)]
+    doc_files = [f for f in structure_lines if any(k in f.lower() for k in DOC_KEYWORDS)]
     if not doc_files:
         if progress_callback:
             progress_callback(4, "Aucun fichier de documentation détecté dans la structure.", 80)
@@ -23,5 +24,6 @@ def generate_documentation_step(api_key, selected_model, reformulated_prompt, st
         mcp_client,
         user_prompt,
         progress_callback=progress_callback,
-        process_state=process_state
+        process_state=process_state,
+        stream_target_directory=stream_target_directory
     )
\ No newline at end of file
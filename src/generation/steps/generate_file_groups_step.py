@@ -0,0 +1,174 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Step: per-file fan-out code generation for large project structures.
+The structure is split into groups of files (by directory), each group is generated
+by its own concurrent request sharing the same project manifest (every file, its group
+and the interface the structure step planned for it), and files are streamed into the
+target directory as soon as they are complete.
+"""
+import logging
+import threading
+from pathlib import Path, PurePosixPath
+
+from src.config.constants import FILE_FANOUT_MAX_FILES_PER_GROUP, GENERATION_STEP_CONCURRENCY
+from src.generation.step_scheduler import StepScheduler, get_step_concurrency
+from src.generation.steps.generate_code_step import stream_code_generation
+from src.utils.prompt_loader import get_system_prompt_with_best_practices, get_agent_prompt
+
+
+def _structure_files(structure_lines):
+    """Files of the structure (folders end with /), normalized and in order."""
+    return [line.strip().lstrip("/\\") for line in structure_lines if line.strip() and not line.strip().endswith('/')]
+
+
+def group_structure_files(structure_lines, max_files_per_group=FILE_FANOUT_MAX_FILES_PER_GROUP):
+    """
+    Split the files of a structure into groups generated by separate requests.
+    Files of the same directory stay together (split when larger than max_files_per_group),
+    and small neighbouring directories are merged up to max_files_per_group.
+
+    Returns:
+        list: List of groups, each a list of file paths
+    """
+    by_directory = {}
+    for file_path in _structure_files(structure_lines):
+        directory = str(PurePosixPath(file_path.replace("\\", "/")).parent)
+        by_directory.setdefault(directory, []).append(file_path)
+
+    groups = []
+    for files in by_directory.values():
+        chunks = [files[i:i + max_files_per_group] for i in range(0, len(files), max_files_per_group)]
+        for chunk in chunks:
+            if groups and len(groups[-1]) + len(chunk) <= max_files_per_group:
+                groups[-1].extend(chunk)
+            else:
+                groups.append(list(chunk))
+    return groups
+
+
+def build_structure_manifest(structure_lines, groups, interfaces=None):
+    """
+    Compact context shared by every group: each file of the project with the group generating it
+    and, when the structure step described it, what it provides to the other files
+    (exports, endpoints, ...), so that parallel groups agree on names and signatures.
+
+    Args:
+        interfaces (dict, optional): {file path: [provided items]} from the structure step
+    """
+    interfaces = interfaces or {}
+    group_of = {file_path: index for index, group in enumerate(groups, 1) for file_path in group}
+    lines = []
+    for line in structure_lines:
+        path = line.strip().lstrip("/\\")
+        if not path:
+            continue
+        if path.endswith('/'):
+            lines.append(path)
+            continue
+        lines.append(f"{path}  [group {group_of.get(path, '?')}]")
+        if interfaces.get(path):
+            lines.append(f"    provides: {'; '.join(interfaces[path])}")
+    return "\n".join(lines)
+
+
+def generate_file_groups_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, animation_instruction, target_directory, progress_callback=None, process_state=None):
+    """
+    Generate the project as concurrent groups of files streamed into target_directory.
+
+    Returns a response dict shaped like stream_code_generation's, whose "streamed_files"
+    merges the files written by every group, or {"error": ...} if no group produced a file.
+    """
+    groups = group_structure_files(structure_lines)
+    if not groups:
+        return {"error": {"message": "No file to generate in the project structure."}, "status_code": None}
+
+    interfaces = process_state.get('project_interfaces') if process_state is not None else None
+    manifest = build_structure_manifest(structure_lines, groups, interfaces)
+    system_prompt_code = get_system_prompt_with_best_practices('code_generation_agent')
+    expected_files = sum(len(group) for group in groups)
+    written_count = [0]
+    progress_lock = threading.Lock()
+
+    def on_group_file_written(group_index, file_path):
+        # stream_code_generation counts per group; report a project-wide count instead
+        with progress_lock:
+            written_count[0] += 1
+            written = written_count[0]
+        if progress_callback:
+            progress_callback(5, f"📄 File written ({written}/{expected_files}, group {group_index}): {Path(file_path).name}", 60 + min(10, int(10 * written / expected_files)))
+
+    def generate_group(group_index, group_files):
+        prompt_group = get_agent_prompt(
+            'code_generation_agent',
+            'file_group_generation_prompt',
+            reformulated_prompt=reformulated_prompt,
+            url_context=url_context if url_context else "",
+            manifest=manifest,
+            group_index=group_index,
+            group_count=len(groups),
+            group_files=chr(10).join(group_files),
+            animation_instruction=animation_instruction if animation_instruction else ""
+        )
+        messages_group = [
+            {"role": "system", "content": system_prompt_code},
+            {"role": "user", "content": prompt_group}
+        ]
+        return stream_code_generation(
+            api_key,
+            selected_model,
+            messages_group,
+            target_directory,
+            group_files,
+            file_callback=lambda file_path: on_group_file_written(group_index, file_path)
+        )
+
+    scheduler = StepScheduler(get_step_concurrency(selected_model, GENERATION_STEP_CONCURRENCY))
+    for group_index, group_files in enumerate(groups, 1):
+        scheduler.add_step(f"group_{group_index}", generate_group, group_index, group_files)
+    if progress_callback:
+        progress_callback(4, f"Generating {expected_files} files in {len(groups)} groups ({scheduler.max_workers} in parallel)...", 45)
+    group_responses = scheduler.run()
+
+    files_written, errors = [], []
+    generation_incomplete = False
+    failed_groups = []
+    response_model = selected_model
+    for name, response in group_responses.items():
+        if not response or not response.get("streamed_files"):
+            failed_groups.append(name)
+            logging.warning(f"[FANOUT] {name} produced no file: {response.get('error') if response else 'no response'}")
+            continue
+        streamed_files = response["streamed_files"]
+        files_written.extend(streamed_files["files_written"])
+        errors.extend(streamed_files["errors"])
+        generation_incomplete = generation_incomplete or streamed_files["generation_incomplete"]
+        response_model = response.get("model", response_model)
+
+    if not files_written:
+        return {"error": {"message": f"No file generated by the {len(groups)} file groups."}, "status_code": None}
+
+    # Files of a failed group stay empty: flagging the generation as incomplete lets
+    # the missing code step regenerate them instead of failing the whole project
+    return {
+        "model": response_model,
+        "choices": [{"message": {"role": "assistant", "content": ""}, "finish_reason": "stop"}],
+        "streamed_files": {
+            "files_written": files_written,
+            "errors": errors,
+            "generation_incomplete": generation_incomplete or bool(failed_groups)
+        }
+    }
@@ -3,10 +3,11 @@ Step: Frontend code generation only, based on structure and context.
 """
 from src.utils.prompt_loader import get_agent_prompt
 
-def generate_frontend_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None):
+FRONTEND_KEYWORDS = ["frontend", "src/", "public/", "static/", ".js", ".jsx", ".ts", ".tsx", ".html", ".css", "components", "assets", "ui/"]
+
+def generate_frontend_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None, stream_target_directory=None):
     # Filtrer la structure pour ne garder que les fichiers/dossiers frontend
-    frontend_keywords = ["frontend", "src/", "public/", "static/", ".js", ".jsx", ".ts", ".tsx", ".html", ".css", "components", "assets", "ui/"]
-    frontend_files = [f for f in structure_lines if any(k in f.lower() for k in frontend_keywords)]
+    frontend_files = [f for f in structure_lines if any(k in f.lower() for k in FRONTEND_KEYWORDS)]
     if not frontend_files:
         if progress_callback:
             progress_callback(4, "No frontend files detected in structure.", 80)
@@ -33,5 +34,6 @@ def generate_frontend_step(api_key, selected_model, reformulated_prompt, structu
         mcp_client,
         user_prompt,
         progress_callback=progress_callback,
-        process_state=process_state
+        process_state=process_state,
+        stream_target_directory=stream_target_directory
     )
\ No newline at end of file
@@ -1,10 +1,11 @@
 """
 Step: Tests generation only, based on structure and context.
 """
-def generate_tests_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None):
+TEST_KEYWORDS = ["test", "tests", "__tests__", "spec", "pytest", ".test.", ".spec.", "test_", "_test.", "tests/", "__tests__/", "jest"]
+
+def generate_tests_step(api_key, selected_model, reformulated_prompt, structure_lines, url_context, tool_results_text, url_reference, animation_instruction, use_mcp_tools, mcp_client, user_prompt, progress_callback=None, process_state=None, stream_target_directory=None):
     # Filtrer la structure pour ne garder que les fichiers/dossiers de tests
-    test_keywords = ["test", "tests", "__tests__", "spec", "pytest", ".test.", ".spec.", "test_", "_test.", "tests/", "__tests__/", "jest"]
-    test_files = [f for f in structure_lines if any(k in f.lower() for k in test_keywords)]
+    test_files = [f for f in structure_lines if any(k in f.lower() for k in TEST_KEYWORDS)]
     if not test_files:
         if progress_callback:
             progress_callback(4, "No test files detected in structure.", 80)
@@ -23,5 +24,6 @@ def generate_tests_step(api_key, selected_model, reformulated_prompt, structure_
         mcp_client,
         user_prompt,
         progress_callback=progress_callback,
-        process_state=process_state
+        process_state=process_state,
+        stream_target_directory=stream_target_directory
     )
\ No newline at end of file
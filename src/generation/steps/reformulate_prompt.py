@@ -20,8 +20,7 @@ import re
 import json
 from pathlib import Path
 from src.api.openrouter_api import call_openrouter_api
-from src.utils.model_utils import is_free_model
-from src.config.constants import RATE_LIMIT_DELAY_SECONDS
+from src.api.rate_limiter import rate_limiter
 from src.utils.prompt_loader import get_system_prompt_with_best_practices, get_agent_prompt
 import time
 
@@ -35,15 +34,10 @@ def reformulate_prompt(api_key, selected_model, user_prompt, url_context, additi
         if progress_callback:
             progress_callback(step, message, progress)
 
-    # Vérifier la limite de taux pour les modèles gratuits
-    if is_free_model(selected_model):
-        current_time = time.time()
-        last_api_call_time = process_state.get('last_api_call_time', 0) if process_state else 0
-        time_since_last_call = current_time - last_api_call_time
-        if time_since_last_call < RATE_LIMIT_DELAY_SECONDS:
-            wait_time = RATE_LIMIT_DELAY_SECONDS - time_since_last_call
-            update_progress(1, f"⏳ Modèle gratuit détecté. Attente de {wait_time:.1f} secondes (limite de taux)...", 20)
-            time.sleep(wait_time)
+    # Le limiteur de débit partagé fait attendre l'appel ; on prévient seulement l'utilisateur
+    wait_time = rate_limiter.estimate_wait(selected_model, api_key)
+    if wait_time > 0:
+        update_progress(1, f"⏳ Rate limit: waiting {wait_time:.1f} s...", 20)
 
     # Load system prompt with best practices using the new utility
     system_prompt = get_system_prompt_with_best_practices('prompt_reformulation_agent')
@@ -14,8 +14,52 @@
 # along with this program. If not, see <https://www.gnu.org/licenses/>
 
 """
-Fonction utilitaire : exécution asynchrone d'une requête MCP.
+Fonctions utilitaires : exécution asynchrone des requêtes MCP.
+Plusieurs requêtes peuvent être lancées en parallèle sur une même boucle d'événements,
+chacune avec son propre délai maximal.
 """
+import asyncio
+import logging
+
+from src.config.constants import MCP_QUERY_TIMEOUT
+
+
 async def run_mcp_query(client, query, context=None):
     result = await client.process_query(query, context)
-    return result
\ No newline at end of file
+    return result
+
+
+async def run_mcp_queries_async(client, queries, timeout=MCP_QUERY_TIMEOUT):
+    """
+    Run several MCP queries concurrently on the running event loop.
+
+    Each query runs on its own fork of the client (separate conversation, shared tool
+    cache) so their messages do not interleave. A query that fails or exceeds timeout
+    seconds gives None without cancelling the others.
+
+    Args:
+        client (SimpleMCPClient): MCP client
+        queries (dict): Query name -> query text
+        timeout (float): Maximum duration of each query in seconds
+
+    Returns:
+        dict: Query name -> result dict ({"text", "tool_calls"}) or None, in the order of queries
+    """
+    async def run_one(name, query):
+        try:
+            return await asyncio.wait_for(run_mcp_query(client.fork(), query), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"[MCP] Query '{name}' timed out after {timeout}s")
+        except Exception as e:
+            logging.warning(f"[MCP] Query '{name}' failed: {e}")
+        return None
+
+    names = list(queries)
+    results = await asyncio.gather(*(run_one(name, queries[name]) for name in names))
+    return dict(zip(names, results))
+
+
+def run_mcp_queries(client, queries, timeout=MCP_QUERY_TIMEOUT):
+    """Synchronous entry point of run_mcp_queries_async: one event loop for every query."""
+    from src.api.http_client import with_async_http_client
+    return asyncio.run(with_async_http_client(run_mcp_queries_async(client, queries, timeout)))
@@ -7,10 +7,13 @@ import logging
 import asyncio
 from pathlib import Path
 from src.api.openrouter_api import call_openrouter_api
+from src.api.http_client import with_async_http_client
 from src.mcp.codebase_client import CodebaseMCPClient
 from src.mcp.setup_codebase_mcp import is_codebase_mcp_available
 from src.mcp.advanced_validation_system import validate_with_advanced_analysis
 from src.utils.prompt_loader import get_agent_prompt, get_system_prompt_with_best_practices
+from src.utils.zip_utils import invalidate_zip_artifacts
+from src.utils.project_index import get_project_index, note_file_written
 
 def validate_with_mcp_step(target_directory, api_key=None, model=None, user_prompt=None, reformulated_prompt=None, progress_callback=None):
     """Validate and auto-correct generated code using codebase-mcp for advanced analysis."""
@@ -37,13 +40,13 @@ def validate_with_mcp_step(target_directory, api_key=None, model=None, user_prom
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
-                analysis_result = loop.run_until_complete(
+                analysis_result = loop.run_until_complete(with_async_http_client(
                     codebase_client.analyze_and_validate_project(
                         target_directory, 
                         user_prompt or "", 
                         reformulated_prompt or ""
                     )
-                )
+                ))
             finally:
                 loop.close()
             
@@ -102,30 +105,21 @@ def validate_with_direct_analysis(target_directory, api_key, model, user_prompt,
         project_files = {}
         file_contents = ""
         
-        # Scan the project directory
-        target_path = Path(target_directory)
+        # Files of the project index (dependencies excluded)
+        project_index = get_project_index(target_directory)
         
         # Define file extensions to analyze
         code_extensions = {'.py', '.js', '.jsx', '.ts', '.tsx', '.html', '.css', '.json', '.md', '.txt', '.yml', '.yaml'}
         
-        for file_path in target_path.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in code_extensions:
-                # Skip large files and common ignore patterns
-                if file_path.stat().st_size > 100000:  # Skip files larger than 100KB
-                    continue
-                if any(part.startswith('.') for part in file_path.parts):  # Skip hidden dirs
-                    continue
-                if any(part in ['node_modules', '__pycache__', '.git', 'venv', 'env'] for part in file_path.parts):
-                    continue
-                
-                try:
-                    relative_path = file_path.relative_to(target_path)
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        project_files[str(relative_path)] = content
-                        file_contents += f"\n\n=== FILE: {relative_path} ===\n{content}"
-                except Exception as e:
-                    logging.warning(f"Could not read file {file_path}: {e}")
+        for entry in project_index.files(extensions=code_extensions):
+            # Skip large files and hidden files, as well as env/ virtualenvs
+            if entry.size > 100000:  # Skip files larger than 100KB
+                continue
+            if any(part.startswith('.') or part == 'env' for part in entry.path.split('/')):
+                continue
+            content = project_index.read_text(entry.path)
+            project_files[entry.path] = content
+            file_contents += f"\n\n=== FILE: {entry.path} ===\n{content}"
         
         if not project_files:
             return False, "No code files found in the project directory"
@@ -253,6 +247,7 @@ def apply_automatic_fixes(target_directory, validation_result, project_files, ap
                         
                         with open(file_path, 'w', encoding='utf-8') as f:
                             f.write(file_content)
+                        note_file_written(file_path)
                         
                         fixes_applied += 1
                         logging.info(f"Applied automatic fix to: {filename}")
@@ -263,6 +258,8 @@ def apply_automatic_fixes(target_directory, validation_result, project_files, ap
                 else:
                     logging.warning(f"File {filename} not found in project files, skipping fix")
         
+        if fixes_applied:
+            invalidate_zip_artifacts(target_directory)
         return fixes_applied
         
     except Exception as e:
@@ -324,6 +321,7 @@ def apply_codebase_fixes(target_directory, analysis_result, codebase_context, ap
                     
                     with open(file_path, 'w', encoding='utf-8') as f:
                         f.write(file_content)
+                    note_file_written(file_path)
                     
                     fixes_applied += 1
                     logging.info(f"Applied intelligent fix to: {filename}")
@@ -332,6 +330,8 @@ def apply_codebase_fixes(target_directory, analysis_result, codebase_context, ap
                     logging.error(f"Error applying fix to {filename}: {e}")
                     continue
         
+        if fixes_applied:
+            invalidate_zip_artifacts(target_directory)
         return fixes_applied
         
     except Exception as e:
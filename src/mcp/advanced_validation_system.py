@@ -7,6 +7,8 @@ from pathlib import Path
 from src.api.openrouter_api import call_openrouter_api
 from src.mcp.simple_codebase_client import create_simple_codebase_client
 from src.utils.prompt_loader import get_agent_prompt, get_system_prompt_with_best_practices
+from src.utils.zip_utils import invalidate_zip_artifacts
+from src.utils.project_index import note_file_written
 
 def validate_with_codebase_analysis(target_directory, api_key=None, model=None, user_prompt=None, reformulated_prompt=None, progress_callback=None):
     """
@@ -203,6 +205,7 @@ def apply_advanced_fixes(target_directory, validation_result, codebase_content,
                     
                     with open(file_path, 'w', encoding='utf-8') as f:
                         f.write(file_content)
+                    note_file_written(file_path)
                     
                     fixes_applied += 1
                     logging.info(f"Applied advanced fix to: {filename}")
@@ -211,6 +214,8 @@ def apply_advanced_fixes(target_directory, validation_result, codebase_content,
                     logging.error(f"Error applying fix to {filename}: {e}")
                     continue
         
+        if fixes_applied:
+            invalidate_zip_artifacts(target_directory)
         return fixes_applied
         
     except Exception as e:
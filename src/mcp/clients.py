@@ -18,7 +18,9 @@ MCP (Model Context Protocol) client implementations for interacting with AI tool
 Provides simplified clients that work with OpenRouter API without needing full MCP SDK.
 """
 
+import copy
 import json
+import time
 import asyncio
 from contextlib import AsyncExitStack
 from typing import Optional, Dict, Any, List
@@ -31,6 +33,9 @@ from src.config.frontend_resources import (
     get_templates_by_type
 )
 from src.utils.prompt_loader import get_agent_prompt
+from src.config.constants import MCP_TOOL_CONCURRENCY
+from src.mcp.resource_index import frontend_resource_index
+from src.mcp.tool_cache import get_cached_tool_result, store_tool_result
 from src.utils.openrouter_model_utils import model_supports_tools, get_fallback_model_for_tools
 
 class SimpleMCPClient:
@@ -66,6 +71,15 @@ class SimpleMCPClient:
             self.tools = get_default_tools()
             print(f"⚠️ Model {model} doesn't support tools - using {self.tool_model} for MCP operations")
         
+    def fork(self):
+        """
+        Copy of the client with its own conversation history, sharing the tool results
+        cache and the model/tools setup. Used to run several queries concurrently.
+        """
+        clone = copy.copy(self)
+        clone.messages = list(self.messages)
+        return clone
+        
     def add_message(self, role, content, tool_call_id=None, name=None):
         """
         Add a message to the conversation history.
@@ -93,14 +107,27 @@ class SimpleMCPClient:
         Returns:
             str: The result of the tool execution
         """
-        from src.api.openrouter_api import call_openrouter_api
+        from src.api.openrouter_api import async_call_openrouter_api
         
-        # Check cache first to avoid duplicate calls
+        # Check cache first to avoid duplicate calls (this client, then the shared disk cache)
         cache_key = f"{tool_name}:{json.dumps(tool_args, sort_keys=True)}"
         if cache_key in self.tool_results_cache:
             print(f"Using cached results for {tool_name}")
             return self.tool_results_cache[cache_key]
         
+        # Catalogue lookups are answered from the local resource index, without an LLM call
+        local_result = frontend_resource_index.answer(tool_name, tool_args)
+        if local_result is not None:
+            print(f"Answered {tool_name} from the local resource index")
+            self.tool_results_cache[cache_key] = local_result
+            return local_result
+        
+        cached_result = get_cached_tool_result(tool_name, tool_args)
+        if cached_result is not None:
+            print(f"Using shared cached results for {tool_name}")
+            self.tool_results_cache[cache_key] = cached_result
+            return cached_result
+        
         # Prepare resource information based on tool type
         resource_info = ""
         if tool_name == "search_frontend_components" and "component_type" in tool_args and "framework" in tool_args:
@@ -152,18 +179,51 @@ class SimpleMCPClient:
         
         # Make a separate API call to simulate the tool
         tool_messages = [{"role": "user", "content": tool_prompt}]
-        response = call_openrouter_api(self.api_key, self.model, tool_messages, temperature=0.3)
+        response = await async_call_openrouter_api(self.api_key, self.model, tool_messages, temperature=0.3)
         
         if response and response.get("choices"):
             tool_result = response["choices"][0]["message"]["content"]
             
             # Cache the result
             self.tool_results_cache[cache_key] = tool_result
+            store_tool_result(tool_name, tool_args, tool_result)
             
             return tool_result
         
         return "Error: Unable to execute tool"
     
+    async def _execute_tools_concurrently(self, calls):
+        """
+        Execute (tool_name, tool_args) calls concurrently, at most MCP_TOOL_CONCURRENCY at a time.
+        
+        Args:
+            calls (list): (tool_name, tool_args) pairs
+            
+        Returns:
+            list: (result, duration in seconds) for each call, in the same order
+        """
+        semaphore = asyncio.Semaphore(MCP_TOOL_CONCURRENCY)
+        in_flight = {}
+        
+        async def run(tool_name, tool_args):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    result = await self.execute_tool(tool_name, tool_args)
+                except Exception as e:
+                    result = f"Error: Unable to execute tool ({e})"
+                duration = round(time.perf_counter() - started, 3)
+                print(f"Tool {tool_name} executed in {duration}s")
+                return result, duration
+        
+        tasks = []
+        for tool_name, tool_args in calls:
+            key = f"{tool_name}:{json.dumps(tool_args, sort_keys=True)}"
+            if key not in in_flight:
+                in_flight[key] = asyncio.ensure_future(run(tool_name, tool_args))
+            tasks.append(in_flight[key])
+        return await asyncio.gather(*tasks)
+    
     async def process_query(self, query, additional_context=None):
         """
         Process a user query using tools.
@@ -175,7 +235,7 @@ class SimpleMCPClient:
         Returns:
             Dict: Processing results including final text and tool calls
         """
-        from src.api.openrouter_api import call_openrouter_api
+        from src.api.openrouter_api import async_call_openrouter_api
         
         # Add context if provided
         if additional_context:
@@ -194,7 +254,7 @@ class SimpleMCPClient:
         tools_to_use = self.tools if self.supports_tools else None
         
         # Create initial request with or without tools based on model support
-        response = call_openrouter_api(
+        response = await async_call_openrouter_api(
             self.api_key, 
             model_to_use, 
             self.messages, 
@@ -211,6 +271,7 @@ class SimpleMCPClient:
             
             # Handle tool calls if any and if model supports tools
             if self.supports_tools and content.get("tool_calls"):
+                parsed_calls = []
                 for tool_call in content["tool_calls"]:
                     function_info = tool_call.get("function", {})
                     tool_name = function_info.get("name")
@@ -220,19 +281,21 @@ class SimpleMCPClient:
                         tool_args = json.loads(tool_args_str) if tool_args_str else {}
                     except json.JSONDecodeError:
                         tool_args = {}
-                    
-                    tool_call_info = {
+                    parsed_calls.append((tool_call, tool_name, tool_args))
+                
+                # Execute the tools of this turn concurrently (bounded), identical calls only once
+                results = await self._execute_tools_concurrently([(name, args) for _, name, args in parsed_calls])
+                
+                for (tool_call, tool_name, tool_args), (result, duration) in zip(parsed_calls, results):
+                    tool_calls_info.append({
                         "tool": tool_name,
-                        "args": tool_args
-                    }
-                    tool_calls_info.append(tool_call_info)
-                    
-                    # Execute the tool
-                    result = await self.execute_tool(tool_name, tool_args)
+                        "args": tool_args,
+                        "duration": duration
+                    })
                     
                     final_text.append(f"[Tool Call: {tool_name} with args {tool_args}]")
                     
-                    # Add tool response to messages
+                    # Add tool responses to messages in the original order
                     self.add_message(
                         "tool", 
                         result,
@@ -241,7 +304,7 @@ class SimpleMCPClient:
                     )
                 
                 # Final response after tool execution
-                response = call_openrouter_api(
+                response = await async_call_openrouter_api(
                     self.api_key,
                     model_to_use,
                     self.messages,
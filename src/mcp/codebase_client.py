@@ -230,7 +230,7 @@ class CodebaseMCPClient:
         Returns:
             Dict: Résultats d'analyse avec corrections suggérées
         """
-        from src.api.openrouter_api import call_openrouter_api
+        from src.api.openrouter_api import async_call_openrouter_api
         
         # Obtenir l'analyse complète de la codebase
         codebase_analysis = await self.get_codebase_analysis(target_directory, "xml")
@@ -253,7 +253,7 @@ class CodebaseMCPClient:
             {"role": "user", "content": analysis_prompt}
         ]
         
-        response = call_openrouter_api(self.api_key, self.model, messages, temperature=0.2, max_retries=2)
+        response = await async_call_openrouter_api(self.api_key, self.model, messages, temperature=0.2, max_retries=2)
         
         analysis_result = {
             "success": False,
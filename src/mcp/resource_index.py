@@ -0,0 +1,192 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Index local des ressources frontend (frontend_resources.py).
+Les outils de catalogue (composants, templates, animations) sont résolus directement
+à partir de tables construites une fois au chargement : la réponse est déterministe et
+ne demande aucun appel LLM. Seules les recherches sans correspondance retombent sur
+la simulation de l'outil par le modèle.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from src.config.frontend_resources import (
+    UI_LIBRARIES,
+    COMPONENT_LIBRARIES,
+    ANIMATION_RESOURCES,
+    TEMPLATE_WEBSITES,
+    BEST_PRACTICES
+)
+
+
+def _normalize(value: Any) -> str:
+    """'Tailwind CSS', 'tailwind-css' and 'tailwindcss' all become 'tailwindcss'."""
+    return re.sub(r'[^a-z0-9]', '', str(value or '').lower())
+
+
+def _singular(value: str) -> str:
+    return value[:-1] if len(value) > 3 and value.endswith('s') and not value.endswith('ss') else value
+
+
+class FrontendResourceIndex:
+    """
+    Lookup tables over the curated frontend resources.
+
+    Every name is indexed under its normalized form (lower-case, alphanumeric only),
+    so lookups are dictionary accesses; the few fuzzy cases (a template type written
+    'landing page', an animation type such as 'hover') are resolved against the
+    short list of indexed keys.
+    """
+
+    def __init__(self):
+        self.libraries: Dict[str, Dict[str, str]] = {}
+        for key, info in UI_LIBRARIES.items():
+            for alias in (key, info['name'], info['name'].split()[0]):
+                self.libraries.setdefault(_normalize(alias), info)
+
+        self.components: Dict[str, str] = {}
+        for key in COMPONENT_LIBRARIES:
+            self.components[_normalize(key)] = key
+
+        # Sources of each component per library, matched on the library key in the URL
+        self.component_sources: Dict[tuple, List[str]] = {}
+        for component, entry in COMPONENT_LIBRARIES.items():
+            for library_key, info in UI_LIBRARIES.items():
+                sources = [src for src in entry['sources'] if library_key in src.lower()]
+                if sources:
+                    self.component_sources[(component, info['name'])] = sources
+
+        self.templates: Dict[str, str] = {_normalize(key): key for key in TEMPLATE_WEBSITES}
+
+        self.animations: Dict[str, Dict[str, str]] = {}
+        for key, info in ANIMATION_RESOURCES.items():
+            for alias in (key, key.split('.')[0], info['name']):
+                self.animations.setdefault(_normalize(alias), info)
+        # Animation types ('hover', 'scroll', ...) mentioned in a library description
+        self.animation_keywords: Dict[str, Dict[str, str]] = {}
+        for info in ANIMATION_RESOURCES.values():
+            for word in re.findall(r'[a-z]+', info['description'].lower()):
+                if len(word) > 3 and word not in ('animations', 'library', 'effects', 'animate', 'cross', 'browser'):
+                    self.animation_keywords.setdefault(word, info)
+
+    def find_library(self, name: Any) -> Optional[Dict[str, str]]:
+        return self.libraries.get(_normalize(name))
+
+    def find_component(self, component_type: Any) -> Optional[str]:
+        normalized = _normalize(component_type)
+        return self.components.get(normalized) or self.components.get(_singular(normalized))
+
+    def find_template_type(self, template_type: Any) -> Optional[str]:
+        normalized = _normalize(template_type)
+        if normalized in self.templates:
+            return self.templates[normalized]
+        for key, template in self.templates.items():  # 'landing page', 'portfolio website', ...
+            if normalized.startswith(key):
+                return template
+        return None
+
+    def find_animation(self, animation_type: Any) -> Optional[Dict[str, str]]:
+        normalized = _normalize(animation_type)
+        if normalized in self.animations:
+            return self.animations[normalized]
+        for word in re.findall(r'[a-z]+', str(animation_type or '').lower()):
+            for candidate in (word, _singular(word), word[:-3] if word.endswith('ing') else word):
+                if candidate in self.animation_keywords:
+                    return self.animation_keywords[candidate]
+        return None
+
+    def answer_components(self, tool_args: Dict[str, Any]) -> Optional[str]:
+        component = self.find_component(tool_args.get('component_type'))
+        library = self.find_library(tool_args.get('framework'))
+        if component is None or library is None:
+            return None
+        sources = self.component_sources.get((component, library['name']))
+        if not sources:
+            return None
+        lines = [
+            f"## {library['name']} {component} components",
+            COMPONENT_LIBRARIES[component]['description'] + ".",
+            "",
+            "Component documentation:"
+        ]
+        lines.extend(f"- {src}" for src in sources)
+        lines.extend([
+            "",
+            f"{library['name']} ({library['description']}):",
+            f"- Documentation: {library['docs']}",
+            f"- GitHub: {library['github']}",
+            "",
+            "Include from the CDN:",
+            "```html",
+            f'<link rel="stylesheet" href="{library["cdn"]}">',
+            "```",
+            "",
+            f"Accessibility guidelines: {BEST_PRACTICES['accessibility']}"
+        ])
+        return "\n".join(lines)
+
+    def answer_templates(self, tool_args: Dict[str, Any]) -> Optional[str]:
+        template = self.find_template_type(tool_args.get('template_type'))
+        if template is None:
+            return None
+        lines = [f"## {template.capitalize()} templates", "", "Template galleries and examples:"]
+        lines.extend(f"- {url}" for url in TEMPLATE_WEBSITES[template])
+        lines.extend([
+            "",
+            f"Responsive design guidelines: {BEST_PRACTICES['responsive']}",
+            f"Performance guidelines: {BEST_PRACTICES['performance']}"
+        ])
+        return "\n".join(lines)
+
+    def answer_animations(self, tool_args: Dict[str, Any]) -> Optional[str]:
+        info = self.find_animation(tool_args.get('animation_type'))
+        if info is None:
+            return None
+        lines = [
+            f"## {info['name']}",
+            info['description'] + ".",
+            f"- Website: {info['url']}",
+            f"- GitHub: {info['github']}",
+            "",
+            "Include from the CDN:",
+            "```html",
+            f'<link rel="stylesheet" href="{info["cdn"]}">',
+            "```"
+        ]
+        if tool_args.get('element'):
+            lines.append(f"\nApply the library classes or attributes to the {tool_args['element']} elements.")
+        return "\n".join(lines)
+
+    def answer(self, tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+        """
+        Answer a catalogue tool call from the index.
+
+        Returns:
+            str: Tool result, or None when the tool is not a catalogue tool or the lookup misses
+        """
+        if not isinstance(tool_args, dict):
+            return None
+        if tool_name == "search_frontend_components":
+            return self.answer_components(tool_args)
+        if tool_name == "search_frontend_templates":
+            return self.answer_templates(tool_args)
+        if tool_name == "search_animation_resources":
+            return self.answer_animations(tool_args)
+        return None
+
+
+frontend_resource_index = FrontendResourceIndex()
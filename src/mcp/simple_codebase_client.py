@@ -9,6 +9,7 @@ import tempfile
 import os
 import json
 from pathlib import Path
+from src.utils.project_index import get_project_index
 
 class SimpleCodebaseClient:
     """Client simplifié pour analyser les codebases avec RepoMix."""
@@ -181,39 +182,30 @@ class SimpleCodebaseClient:
             if not directory_path.exists():
                 return project_info
             
-            # Analyser les fichiers et dossiers
-            for item in directory_path.rglob('*'):
-                if item.is_file():
-                    # Ignorer les fichiers cachés et les répertoires système
-                    if any(part.startswith('.') for part in item.parts):
-                        continue
-                    if any(part in ['node_modules', '__pycache__', '.git', 'venv', 'env'] for part in item.parts):
-                        continue
-                    
-                    try:
-                        file_size = item.stat().st_size
-                        relative_path = item.relative_to(directory_path)
-                        
-                        project_info["files"].append({
-                            "path": str(relative_path),
-                            "size": file_size,
-                            "extension": item.suffix.lower()
-                        })
-                        
-                        # Compter par type de fichier
-                        ext = item.suffix.lower() or "no_extension"
-                        project_info["file_types"][ext] = project_info["file_types"].get(ext, 0) + 1
-                        
-                        project_info["total_files"] += 1
-                        project_info["total_size"] += file_size
-                        
-                    except (OSError, PermissionError):
-                        continue
-                        
-                elif item.is_dir():
-                    if not any(part.startswith('.') for part in item.parts):
-                        relative_path = item.relative_to(directory_path)
-                        project_info["directories"].append(str(relative_path))
+            # Fichiers de l'index du projet (dépendances exclues)
+            directories = set()
+            for entry in get_project_index(directory_path).files():
+                # Ignorer les fichiers cachés et les environnements virtuels env/
+                if any(part.startswith('.') or part == 'env' for part in entry.path.split('/')):
+                    continue
+                project_info["files"].append({
+                    "path": entry.path,
+                    "size": entry.size,
+                    "extension": entry.extension
+                })
+                
+                # Compter par type de fichier
+                ext = entry.extension or "no_extension"
+                project_info["file_types"][ext] = project_info["file_types"].get(ext, 0) + 1
+                
+                project_info["total_files"] += 1
+                project_info["total_size"] += entry.size
+                
+                parent = os.path.dirname(entry.path)
+                while parent and parent not in directories:
+                    directories.add(parent)
+                    parent = os.path.dirname(parent)
+            project_info["directories"] = sorted(directories)
             
             return project_info
             
@@ -8,6 +8,10 @@ from pathlib import Path
 from src.api.openrouter_api import call_openrouter_api
 from src.mcp.simple_codebase_client import create_simple_codebase_client
 from src.utils.prompt_loader import get_agent_prompt, get_system_prompt_with_best_practices
+from src.utils.zip_utils import invalidate_zip_artifacts
+from src.utils.markdown_cleaner import clean_markdown_files
+from src.utils.project_index import get_project_index, note_file_written
+from src.utils.edit_blocks import resolve_fix_content, EditError
 
 def validate_and_fix_with_repomix(target_directory, api_key=None, model=None, user_prompt=None, reformulated_prompt=None, progress_callback=None):
     """
@@ -95,14 +99,15 @@ def validate_and_fix_with_repomix(target_directory, api_key=None, model=None, us
                     message = "✅ All code validated - no issues found (safety check prevented unnecessary fixes)"
                     logging.info("RepoMix validation passed - safety check prevented fix application when no issues found")
                 else:
-                    fixes_applied = apply_simple_fixes(target_directory, ai_response)
+                    fixed_files = []
+                    fixes_applied = apply_simple_fixes(target_directory, ai_response, fixed_files)
                 
                     # CRITIQUE: Nettoyage final après toutes les corrections
                     if fixes_applied > 0:
                         if progress_callback:
                             progress_callback(9, "🧹 Final cleanup of corrected files...", 99)
                         
-                        final_cleanup_count = clean_markdown_artifacts(target_directory)
+                        final_cleanup_count = clean_markdown_artifacts(target_directory, fixed_files)
                         if final_cleanup_count > 0:
                             logging.info(f"🧹 Final cleanup: removed markdown artifacts from {final_cleanup_count} additional files after fixes")
                         
@@ -127,13 +132,14 @@ def validate_and_fix_with_repomix(target_directory, api_key=None, model=None, us
         return False, str(e)
 
 
-def apply_simple_fixes(target_directory, ai_response):
+def apply_simple_fixes(target_directory, ai_response, fixed_files=None):
     """
     Applique les corrections identifiées par l'IA.
     
     Args:
         target_directory: Répertoire du projet
         ai_response: Réponse de l'IA avec les corrections
+        fixed_files: Liste complétée avec les chemins des fichiers réécrits (optionnel)
     
     Returns:
         int: Nombre de corrections appliquées
@@ -170,14 +176,20 @@ def apply_simple_fixes(target_directory, ai_response):
         
         for filename, file_content in fixes:
             filename = filename.strip()
-            file_content = file_content.strip()
             
             try:                # Appliquer la correction
                 file_path = target_path / filename
+                try:
+                    # SEARCH/REPLACE blocks are applied to the current file, otherwise the section is the whole file
+                    file_content = resolve_fix_content(file_path, file_content)
+                except EditError as e:
+                    logging.warning(f"Could not apply the edits to {filename}, file left unchanged: {e}")
+                    continue
                 file_path.parent.mkdir(parents=True, exist_ok=True)
                 
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(file_content)
+                note_file_written(file_path)
                 
                 # CRITIQUE: Nettoyer immédiatement les marqueurs markdown après correction
                 try:
@@ -197,18 +209,23 @@ def apply_simple_fixes(target_directory, ai_response):
                     if content != original_content and content:
                         with open(file_path, 'w', encoding='utf-8') as f:
                             f.write(content)
+                        note_file_written(file_path)
                         logging.info(f"🧹 Auto-cleaned markdown artifacts from fixed file: {filename}")
                 
                 except Exception as cleanup_error:
                     logging.warning(f"Could not auto-clean markdown from {filename}: {cleanup_error}")
                 
                 fixes_applied += 1
+                if fixed_files is not None:
+                    fixed_files.append(str(file_path))
                 logging.info(f"Applied RepoMix fix to: {filename}")
                 
             except Exception as e:
                 logging.error(f"Error applying fix to {filename}: {e}")
                 continue
         
+        if fixes_applied:
+            invalidate_zip_artifacts(target_directory)
         return fixes_applied
         
     except Exception as e:
@@ -231,145 +248,26 @@ def ensure_repomix_available():
         return False
 
 
-def clean_markdown_artifacts(target_directory):
+def clean_markdown_artifacts(target_directory, files=None):
     """
-    Nettoie UNIVERSELLEMENT les marqueurs Markdown parasites dans TOUS les fichiers de code.
-    Détecte automatiquement tous les langages et supprime ```language au début et ``` à la fin.
+    Nettoie les marqueurs Markdown parasites (```language, marqueurs de fin, texte
+    explicatif) dans les fichiers de code générés.
     
     Args:
         target_directory: Répertoire du projet
+        files: Fichiers à nettoyer (ceux qui viennent d'être écrits). Si None, tous les
+            fichiers de l'index du projet (hors dépendances, environnements virtuels et builds).
     
     Returns:
         int: Nombre de fichiers nettoyés
     """
     try:
-        files_cleaned = 0
-        target_path = Path(target_directory)
-        
-        # Extensions binaires à ignorer (performance + sécurité)
-        binary_extensions = {
-            '.exe', '.dll', '.so', '.dylib', '.bin', '.dat',
-            '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg',
-            '.mp3', '.mp4', '.avi', '.mov', '.wav', '.pdf', '.zip',
-            '.tar', '.gz', '.7z', '.rar', '.pyc', '.class', '.o'
-        }
-        
-        # Parcourir TOUS les fichiers (approche universelle)
-        for file_path in target_path.rglob('*'):
-            if file_path.is_file():
-                # Ignorer les fichiers binaires connus
-                if file_path.suffix.lower() in binary_extensions:
-                    continue
-                
-                # Ignorer les fichiers trop volumineux (probablement binaires)
-                try:
-                    if file_path.stat().st_size > 10 * 1024 * 1024:  # 10MB max
-                        continue
-                except:
-                    continue                
-                try:
-                    # Tenter de lire le fichier comme du texte
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    # Ignorer les fichiers vides ou très courts
-                    if len(content.strip()) < 10:
-                        continue
-                    
-                    original_content = content
-                      # NETTOYAGE UNIVERSEL - Détection automatique de patterns Markdown
-                    import re
-                    
-                    # Supprimer les marqueurs de début ```[langage]
-                    # Pattern ultra-robuste qui détecte TOUT langage possible
-                    content = re.sub(r'^```[a-zA-Z0-9_+-]*\n?', '', content, flags=re.MULTILINE)
-                    
-                    # Supprimer les marqueurs de fin ``` (fin de fichier)
-                    content = re.sub(r'\n?```\s*$', '', content, flags=re.MULTILINE)
-                    
-                    # Supprimer aussi les marqueurs en milieu de ligne (cas rares)
-                    content = re.sub(r'^```[a-zA-Z0-9_+-]*$', '', content, flags=re.MULTILINE)
-                    content = re.sub(r'^```$', '', content, flags=re.MULTILINE)
-                    
-                    # Supprimer les marqueurs RepoMix et autres artifacts spécifiques
-                    content = re.sub(r'^---\s*END\s*OF\s*FILES?\s*---.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^--\s*END\s*FILE--.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^--\s*END--.*$', '', content, flags=re.MULTILINE)
-                    content = re.sub(r'^###\s*END.*$', '', content, flags=re.MULTILINE)
-                    content = re.sub(r'^\s*-{3,}\s*END\s*-{3,}.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    
-                    # NEW: Remove AI-generated explanatory text and instructions
-                    # Remove lines starting with **Note:** or **Setup Instructions:**
-                    content = re.sub(r'^\*\*Note:\*\*.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^\*\*Setup Instructions.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^\*\*.*Instructions.*\*\*.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^\*\*End of.*\*\*.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    
-                    # Remove markdown headers that shouldn't be in code files
-                    content = re.sub(r'^#+\s+.*$', '', content, flags=re.MULTILINE)
-                    
-                    # Remove markdown bold text patterns that are explanations
-                    content = re.sub(r'^\*\*.*\*\*\s*$', '', content, flags=re.MULTILINE)
-                    
-                    # Remove lines that look like documentation/instructions
-                    content = re.sub(r'^-\s+.*download.*clone.*repository.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^-\s+.*browser.*chrome.*firefox.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^-\s+.*open.*index\.html.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^\d+\.\s+.*$', '', content, flags=re.MULTILINE)  # Numbered lists
-                    
-                    # Remove common instruction phrases
-                    content = re.sub(r'^.*setup.*run.*instructions.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^.*features.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^.*usage.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^.*development.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    content = re.sub(r'^.*notes.*$', '', content, flags=re.MULTILINE | re.IGNORECASE)
-                    
-                    # Remove explanatory text blocks that start after code
-                    content = re.sub(r'\n\n\*\*.*?\*\*.*$', '', content, flags=re.DOTALL)
-                    content = re.sub(r'\n\n#.*$', '', content, flags=re.DOTALL)
-                    
-                    # NEW: Enhanced cleanup for AI-generated explanatory text at end of files
-                    # Remove everything after "**Note:**" or similar explanatory markers
-                    content = re.sub(r'\n\n\*\*Note:\*\*.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n\*\*Setup Instructions.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n\*\*End of code.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n## Features.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n## Setup and Run.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n## Usage.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n## Notes.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n## Development.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    
-                    # Remove specific instruction patterns that appear after code
-                    content = re.sub(r'\n\n- The code is structured.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n- Download or clone.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n1\. Download.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    content = re.sub(r'\n\n# To-Do List.*$', '', content, flags=re.DOTALL | re.IGNORECASE)
-                    
-                    # Clean up multiple empty lines
-                    content = re.sub(r'\n{3,}', '\n\n', content)
-                    
-                    # Nettoyer les espaces excessifs en début/fin
-                    content = content.strip()
-                    
-                    # Si le contenu a changé, réécrire le fichier
-                    if content != original_content:
-                        # Vérifier que le contenu nettoyé n'est pas vide
-                        if content:
-                            with open(file_path, 'w', encoding='utf-8') as f:
-                                f.write(content)
-                            
-                            files_cleaned += 1
-                            logging.info(f"🧹 Cleaned markdown artifacts from: {file_path.relative_to(target_path)}")
-                        else:
-                            logging.warning(f"⚠️ File became empty after cleaning: {file_path.relative_to(target_path)}")
-                
-                except UnicodeDecodeError:
-                    # Fichier probablement binaire, ignorer
-                    continue
-                except Exception as e:
-                    logging.warning(f"Could not clean file {file_path}: {e}")
-                    continue
-        
+        if files is None:
+            index = get_project_index(target_directory)
+            files = [index.abs_path(entry.path) for entry in index.files()]
+        files_cleaned = clean_markdown_files(files, base_dir=target_directory)
+        if files_cleaned:
+            invalidate_zip_artifacts(target_directory)
         return files_cleaned
         
     except Exception as e:
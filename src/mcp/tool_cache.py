@@ -0,0 +1,104 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Cache disque des résultats d'outils MCP (execute_tool), partagé entre les clients,
+les threads et les processus. La clé est le nom de l'outil et ses arguments sous
+forme canonique ; le stockage réutilise le cache SQLite des réponses LLM (TTL, LRU).
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from src.api.response_cache import ResponseCache
+from src.config.constants import (
+    CACHE_DIR,
+    TOOL_CACHE_ENABLED,
+    TOOL_CACHE_MAX_BYTES,
+    TOOL_CACHE_TTL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+def make_tool_cache_key(tool_name: str, tool_args: Dict[str, Any]) -> str:
+    """
+    Key of a tool call: arguments are canonicalized (sorted keys, trimmed lower-case
+    strings) so that {"framework": "React "} and {"framework": "react"} share an entry.
+    """
+    def canonical(value):
+        if isinstance(value, str):
+            return value.strip().lower()
+        if isinstance(value, dict):
+            return {str(k): canonical(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [canonical(v) for v in value]
+        return value
+
+    payload = json.dumps({"tool": tool_name, "args": canonical(tool_args or {})},
+                         sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_tool_cache: Optional[ResponseCache] = None
+_tool_cache_lock = threading.Lock()
+_tool_cache_failed = False
+
+
+def get_tool_cache() -> Optional[ResponseCache]:
+    """Return the process-wide tool result cache, or None if disabled or unavailable."""
+    global _tool_cache, _tool_cache_failed
+    if not TOOL_CACHE_ENABLED or _tool_cache_failed:
+        return None
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None and not _tool_cache_failed:
+                try:
+                    _tool_cache = ResponseCache(
+                        os.path.join(CACHE_DIR, "tool_results.sqlite3"),
+                        max_bytes=TOOL_CACHE_MAX_BYTES,
+                        default_ttl=TOOL_CACHE_TTL_SECONDS
+                    )
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Tool result cache unavailable: {e}")
+                    _tool_cache_failed = True
+    return _tool_cache
+
+
+def get_cached_tool_result(tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+    cache = get_tool_cache()
+    if cache is None:
+        return None
+    entry = cache.get(make_tool_cache_key(tool_name, tool_args))
+    return entry.get("result") if isinstance(entry, dict) else None
+
+
+def store_tool_result(tool_name: str, tool_args: Dict[str, Any], result: str) -> None:
+    cache = get_tool_cache()
+    if cache is not None:
+        cache.set(make_tool_cache_key(tool_name, tool_args), {"tool": tool_name, "result": result})
+
+
+def get_tool_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of this process and size of the shared cache, or {'enabled': False}."""
+    cache = get_tool_cache()
+    if cache is None:
+        return {'enabled': False}
+    return {'enabled': True, **cache.get_stats()}
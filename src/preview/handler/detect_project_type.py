@@ -20,6 +20,7 @@ import os
 import json
 from pathlib import Path
 import logging
+from src.utils.project_index import get_project_index
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,8 @@ def detect_project_type(project_dir):
         dict: Dictionnaire avec les types détectés et infos associées
     """
     project_dir = Path(project_dir)
+    project_index = get_project_index(project_dir)
+    top_level_py_files = [project_dir / entry.path for entry in project_index.files(extensions={'.py'}) if '/' not in entry.path]
     types = []
     info = {}
     pkg_path = project_dir / 'package.json'
@@ -54,7 +57,7 @@ def detect_project_type(project_dir):
         except Exception:
             types.append('node')
 
-    if (project_dir / 'composer.json').exists() or any(f.suffix == '.php' for f in project_dir.rglob('*.php')):
+    if (project_dir / 'composer.json').exists() or project_index.files(extensions={'.php'}):
         types.append('php')
     if any((project_dir / d / 'index.html').exists() for d in ('', 'public', 'src')):
         types.append('static')
@@ -71,7 +74,7 @@ def detect_project_type(project_dir):
         except Exception:
             pass
     if not flask_detected:
-        for py_file in project_dir.glob('*.py'):
+        for py_file in top_level_py_files:
             try:
                 with open(py_file, 'r', encoding='utf-8') as f:
                     py_content = f.read().lower()
@@ -93,7 +96,7 @@ def detect_project_type(project_dir):
         except:
             pass
     if not streamlit_detected:
-        for py_file in project_dir.glob('*.py'):
+        for py_file in top_level_py_files:
             try:
                 with open(py_file, 'r', encoding='utf-8') as f:
                     content = f.read().lower()
@@ -108,7 +111,7 @@ def detect_project_type(project_dir):
     # After explicit detections (Flask, Streamlit, PHP, Node, React, Vue, Angular, Static)
     # Fallback Python detection: pure Python if nothing else
     req_file = project_dir / 'requirements.txt'
-    if not types and req_file.exists() and any(project_dir.glob('*.py')):
+    if not types and req_file.exists() and top_level_py_files:
         types.append('python')
 
     # Multi-projet: front/back détectés
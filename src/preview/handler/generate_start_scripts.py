@@ -21,6 +21,7 @@ import json
 import logging
 from pathlib import Path
 from src.api.openrouter_api import get_openrouter_completion
+from src.api.http_client import with_async_http_client
 from src.utils.prompt_loader import get_agent_prompt
 import asyncio
 
@@ -196,7 +197,7 @@ def generate_start_scripts(project_dir, api_key=None, model_name="openrouter/ant
     
     config = None
     try:
-        config = loop.run_until_complete(generate_launch_config_from_ai(project_dir, logger.info, api_key=api_key, model_name=model_name))
+        config = loop.run_until_complete(with_async_http_client(generate_launch_config_from_ai(project_dir, logger.info, api_key=api_key, model_name=model_name)))
     finally:
         pass
 
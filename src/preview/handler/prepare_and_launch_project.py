@@ -23,6 +23,7 @@ import asyncio
 
 # Import des nouvelles fonctions et des gestionnaires nécessaires
 from .generate_start_scripts import generate_launch_config_from_ai
+from src.api.http_client import with_async_http_client
 from src.preview.steps.run_application import run_application_async_wrapper
 # from src.preview.preview_manager import get_preview_manager # This was causing the circular import
 
@@ -54,6 +55,15 @@ async def prepare_and_launch_project_async(project_name: str, project_dir_str: s
     log_callback(f"Starting preparation and launch for project '{project_name}' at {project_dir}")
     preview_manager.update_project_status(project_name, "initializing", "Preparing project...")
 
+    # Watch the project files from now on: the AI auto-patches applied during the launch
+    # and later edits reach the project index without rescans
+    def restart_on_change():
+        if preview_manager.get_project_status_info(project_name).get("status") != "running":
+            return  # Still launching (the launch itself patches files) or stopped
+        preview_manager.stop_managed_project(project_name)
+        asyncio.run(with_async_http_client(prepare_and_launch_project_async(project_name, project_dir_str, ai_model=ai_model, api_key=api_key)))
+    preview_manager.watch_project_files(project_name, project_dir_str, restart=restart_on_change)
+
     # 1. Try to load launch_commands.json if it exists and is valid
     launch_config_path = project_dir / "launch_commands.json"
     launch_config = None
@@ -79,6 +89,7 @@ async def prepare_and_launch_project_async(project_name: str, project_dir_str: s
         message = "Failed to generate or retrieve valid launch commands from AI."
         log_callback(message)
         preview_manager.update_project_status(project_name, "error", message)
+        preview_manager.unwatch_project_files(project_name)
         return False, message, None
 
     log_callback(f"Launch configuration to be used: {json.dumps(launch_config)}")
@@ -146,6 +157,7 @@ async def prepare_and_launch_project_async(project_name: str, project_dir_str: s
             log_callback(f"STDERR from failed execution:\n{run_result.get('stderr')}")
         
         preview_manager.update_project_status(project_name, "error", message)
+        preview_manager.unwatch_project_files(project_name)
         return False, message, None
 
 # For backward compatibility, you may want to keep the old function name:
@@ -45,6 +45,7 @@ from src.preview.steps.stop_preview import stop_preview
 from src.preview.steps.get_preview_status import get_preview_status
 from src.preview.steps.restart_preview import restart_preview
 from src.preview.steps.improve_readme import improve_readme_for_preview
+from src.preview.steps.watch_preview import watch_preview_files, unwatch_preview_files
 
 # New PreviewManager class and getter function
 class PreviewManager:
@@ -53,6 +54,7 @@ class PreviewManager:
         self.running_processes = {}  # project_name: process_object
         # Note: self.session_ports is distinct from the global session_ports for now
         self.managed_session_ports = {} 
+        self.watched_dirs = {}  # project_name: project directory watched while the preview runs
 
     def update_project_status(self, project_name: str, status: str, message: str = None, process_info=None, app_url: str = None, port: int = None):
         if project_name not in self.projects_status:
@@ -105,7 +107,19 @@ class PreviewManager:
             "logs": []
         })
 
+    def watch_project_files(self, project_name: str, project_dir, restart=None):
+        """Keep the project index live while the preview runs; restart is called on changes if enabled."""
+        self.unwatch_project_files(project_name)
+        self.watched_dirs[project_name] = str(project_dir)
+        watch_preview_files(project_dir, f"project:{project_name}", restart=restart, logger=logger)
+
+    def unwatch_project_files(self, project_name: str):
+        project_dir = self.watched_dirs.pop(project_name, None)
+        if project_dir is not None:
+            unwatch_preview_files(project_dir, f"project:{project_name}")
+
     def stop_managed_project(self, project_name: str): # Renamed to avoid conflict
+        self.unwatch_project_files(project_name)
         process = self.running_processes.pop(project_name, None)
         log_msg = ""
         stopped_successfully = False
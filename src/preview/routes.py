@@ -18,6 +18,8 @@ import uuid
 from pathlib import Path
 from src.preview.preview_manager import cleanup_unused_ports, stop_preview, get_preview_status, restart_preview
 from src.preview.handler.prepare_and_launch_project import prepare_and_launch_project_async
+from src.api.http_client import with_async_http_client
+from src.utils.project_index import get_project_index
 import asyncio
 
 bp_preview = Blueprint('preview', __name__)
@@ -68,7 +70,7 @@ def start_preview_route():
         current_app.logger.info(f"{ports_cleaned} ports freed before starting")
 
     # Pass ai_model to prepare_and_launch_project_async
-    result = asyncio.run(prepare_and_launch_project_async(project_name, target_dir, ai_model=ai_model))
+    result = asyncio.run(with_async_http_client(prepare_and_launch_project_async(project_name, target_dir, ai_model=ai_model)))
 
     if result and result[0]:
         # result = (success, message, url/port)
@@ -180,15 +182,10 @@ def stop_preview_on_exit():
 def list_files_route():
     """List all files in the given directory, relative paths."""
     from flask import request
-    import os
     dir_path = request.args.get('directory')
     if not dir_path or not Path(dir_path).is_dir():
         return jsonify(status="error", message="Invalid directory"), 400
-    file_list = []
-    for root, dirs, files in os.walk(dir_path):
-        for fname in files:
-            rel = os.path.relpath(os.path.join(root, fname), dir_path)
-            file_list.append(rel.replace('\\', '/'))
+    file_list = [entry.path for entry in get_project_index(dir_path).files()]
     return jsonify(status="success", files=file_list)
 
 @bp_preview.route('/preview/stop_all', methods=['POST'])
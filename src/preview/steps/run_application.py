@@ -18,6 +18,8 @@ if platform.system() == "Windows":
 
 from src.api.openrouter_api import get_openrouter_completion # Added import
 from src.utils.prompt_loader import get_agent_prompt
+from src.utils.project_index import note_file_written
+from src.utils.edit_blocks import resolve_file_patch
 
 logger = logging.getLogger(__name__)
 
@@ -266,7 +268,7 @@ async def monitor_process_output_for_url_and_port(
 async def get_ai_fix_for_launch_failure(project_dir: str, commands_data: dict, failed_command_index: int, stdout: str, stderr: str, log_callback=print, ai_model: str = None, api_key: str = None):
     """
     Asks AI for help with a failed launch command.
-    Returns: {"fixed": bool, "new_commands_data": dict_or_none, "message_to_user": str, "file_patch": {"filename": ..., "content": ...} or None}
+    Returns: {"fixed": bool, "new_commands_data": dict_or_none, "message_to_user": str, "file_patch": {"filename": ..., "content" or "edits": ...} or None}
     """
     import re
     from pathlib import Path
@@ -344,7 +346,8 @@ async def get_ai_fix_for_launch_failure(project_dir: str, commands_data: dict, f
         log_callback("Attempting to call AI for a fix...")
         # Use the provided ai_model, fallback to a default if None
         model_to_use = ai_model if ai_model else "openai/gpt-4.1-nano"
-        ai_response_str = await get_openrouter_completion(prompt, model_name=model_to_use, api_key=api_key)
+        # A fix that just failed must not be replayed from the response cache
+        ai_response_str = await get_openrouter_completion(prompt, model_name=model_to_use, api_key=api_key, use_cache=False)
         log_callback("AI call completed.")
     except Exception as e:
         log_callback(f"Error calling AI API: {e}")
@@ -546,7 +549,8 @@ async def run_application_commands_internal_async(
                                 patch = ai_result.get("file_patch")
                                 try:
                                     patched_file_path = project_dir / patch["filename"]
-                                    patched_file_path.write_text(patch["content"], encoding="utf-8")
+                                    patched_file_path.write_text(resolve_file_patch(patched_file_path, patch), encoding="utf-8")
+                                    note_file_written(patched_file_path)
                                     log_callback(f"AI_PATCH_APPLIED: File '{patch['filename']}' patched by AI.")
                                 except Exception as e_patch:
                                     log_callback(f"Error applying AI file patch: {e_patch}")
@@ -588,7 +592,8 @@ async def run_application_commands_internal_async(
                                 patch = ai_result.get("file_patch")
                                 try:
                                     patched_file_path = project_dir / patch["filename"]
-                                    patched_file_path.write_text(patch["content"], encoding="utf-8")
+                                    patched_file_path.write_text(resolve_file_patch(patched_file_path, patch), encoding="utf-8")
+                                    note_file_written(patched_file_path)
                                     log_callback(f"AI_PATCH_APPLIED: File '{patch['filename']}' patched by AI.")
                                 except Exception as e_patch:
                                     log_callback(f"Error applying AI file patch: {e_patch}")
@@ -622,7 +627,8 @@ async def run_application_commands_internal_async(
                         patch = ai_result.get("file_patch")
                         try:
                             patched_file_path = project_dir / patch["filename"]
-                            patched_file_path.write_text(patch["content"], encoding="utf-8")
+                            patched_file_path.write_text(resolve_file_patch(patched_file_path, patch), encoding="utf-8")
+                            note_file_written(patched_file_path)
                             log_callback(f"AI_PATCH_APPLIED: File '{patch['filename']}' patched by AI.")
                         except Exception as e_patch:
                             log_callback(f"Error applying AI file patch: {e_patch}")
@@ -660,7 +666,8 @@ async def run_application_commands_internal_async(
                         patch = ai_result.get("file_patch")
                         try:
                             patched_file_path = project_dir / patch["filename"]
-                            patched_file_path.write_text(patch["content"], encoding="utf-8")
+                            patched_file_path.write_text(resolve_file_patch(patched_file_path, patch), encoding="utf-8")
+                            note_file_written(patched_file_path)
                             log_callback(f"AI_PATCH_APPLIED: File '{patch['filename']}' patched by AI.")
                         except Exception as e_patch:
                             log_callback(f"Error applying AI file patch: {e_patch}")
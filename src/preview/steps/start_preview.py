@@ -11,7 +11,10 @@ from src.preview.steps.get_start_command import get_start_command
 from src.preview.steps.get_app_url import get_app_url
 from src.preview.steps.log_entry import log_entry
 from src.preview.steps.improve_readme import improve_readme_for_preview
+from src.preview.steps.watch_preview import watch_preview_files, unwatch_preview_files
 from src.utils.prompt_loader import get_agent_prompt
+from src.utils.project_index import note_file_written
+from src.utils.edit_blocks import parse_search_replace, apply_edits, EditError
 
 def start_preview(project_dir: str, session_id: str, running_processes=None, process_logs=None, session_ports=None, already_patched=False, ai_model=None, api_key=None):
     if running_processes is None or process_logs is None or session_ports is None:
@@ -38,6 +41,7 @@ def start_preview(project_dir: str, session_id: str, running_processes=None, pro
             import re, json
             from pathlib import Path
             from src.api.openrouter_api import get_openrouter_completion
+            from src.api.http_client import with_async_http_client
             # Try to extract a filename from the error message
             file_match = re.search(r"([\w\-.]+\.(js|ts|py|json|jsx|tsx|css|html|conf|cfg|ini|sh|bat))", message)
             file_content = None
@@ -91,24 +95,32 @@ def start_preview(project_dir: str, session_id: str, running_processes=None, pro
             # Call the AI
             try:
                 import asyncio
-                ai_response = asyncio.run(get_openrouter_completion(ai_prompt, model_name=model_name))
+                ai_response = asyncio.run(with_async_http_client(get_openrouter_completion(ai_prompt, model_name=model_name, use_cache=False)))
                 if ai_response:
                     log_entry(session_id, "AI", f"AI patch suggestion for error: {message}\n---\n{ai_response}")
                     # --- AUTO PATCH LOGIC ---
                     patched = False
                     new_content = None
-                    # Always expect a code block (```) with the full file content
+                    # SEARCH/REPLACE blocks for a small fix, otherwise a code block (```) with the full file content
+                    edits = parse_search_replace(ai_response)
                     code_block = re.search(r"```[a-zA-Z0-9]*\n([\s\S]+?)```", ai_response)
-                    if code_block and file_path:
+                    if edits and file_path and file_content is not None:
+                        try:
+                            new_content = apply_edits(file_content, edits)
+                        except EditError as e:
+                            log_entry(session_id, "ERROR", f"AI patch edits could not be applied to {file_path.name}: {e}")
+                    elif code_block and file_path:
                         new_content = code_block.group(1).strip()
+                    if new_content is not None:
                         try:
                             file_path.write_text(new_content, encoding="utf-8")
+                            note_file_written(file_path)
                             # Log structuré spécial pour le frontend
                             log_entry(session_id, "AI_PATCH_APPLIED", json.dumps({
                                 "file": file_path.name,
                                 "patch_excerpt": new_content[:500] + ("..." if len(new_content) > 500 else "")
                             }))
-                            log_entry(session_id, "AI", f"Auto-patch applied to {file_path.name} (full rewrite). Relance de la prévisualisation...")
+                            log_entry(session_id, "AI", f"Auto-patch applied to {file_path.name} ({'edits' if edits else 'full rewrite'}). Relance de la prévisualisation...")
                             patched = True
                         except Exception as e:
                             log_entry(session_id, "ERROR", f"Failed to apply AI patch to {file_path.name}: {e}")
@@ -171,6 +183,10 @@ def start_preview(project_dir: str, session_id: str, running_processes=None, pro
             "command": command,
             "start_time": time.time()
         }
+        # Keep the project index live while the preview runs (and restart on change if enabled)
+        from src.preview.steps.restart_preview import restart_preview
+        from src.preview.preview_manager import logger
+        watch_preview_files(project_dir, session_id, restart=lambda: restart_preview(session_id), logger=logger)
         def read_output(stream, log_type):
             try:
                 while True:
@@ -229,6 +245,7 @@ def start_preview(project_dir: str, session_id: str, running_processes=None, pro
             
             if session_id in running_processes:
                 del running_processes[session_id]
+            unwatch_preview_files(project_dir, session_id)
             
             return False, f"Échec du démarrage du processus (code {return_code})", {
                 "project_type": None,
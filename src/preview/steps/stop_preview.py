@@ -5,6 +5,7 @@ import time
 import platform
 import subprocess
 from src.preview.steps.log_entry import log_entry
+from src.preview.steps.watch_preview import unwatch_preview_files
 
 def stop_preview(session_id: str, running_processes=None, process_logs=None, session_ports=None, logger=None):
     if running_processes is None or process_logs is None or session_ports is None or logger is None:
@@ -22,6 +23,7 @@ def stop_preview(session_id: str, running_processes=None, process_logs=None, ses
     try:
         process_info = running_processes[session_id]
         process = process_info["process"]
+        unwatch_preview_files(process_info["project_dir"], session_id)
         log_entry(session_id, "INFO", "Arrêt de l'application...")
         
         # Close the process streams before termination to avoid I/O errors
@@ -0,0 +1,37 @@
+"""
+Surveille les fichiers d'une prévisualisation en cours : l'index du projet reste à jour
+et, si PREVIEW_RESTART_ON_CHANGE est activé, la prévisualisation est relancée quand
+des fichiers changent.
+"""
+import time
+import threading
+from src.config.constants import PREVIEW_RESTART_ON_CHANGE, PREVIEW_RESTART_MIN_INTERVAL
+from src.utils.project_watcher import watch_project, unwatch_project
+
+def watch_preview_files(project_dir, key: str, restart=None, logger=None):
+    """
+    Args:
+        project_dir: Dossier du projet prévisualisé
+        key (str): Identifiant de la prévisualisation (session ou nom de projet)
+        restart (callable, optional): Relance la prévisualisation ; appelé dans un thread dédié
+    """
+    on_change = None
+    if restart is not None and PREVIEW_RESTART_ON_CHANGE:
+        last_restart = [time.monotonic()]
+
+        def on_change(changed_paths):
+            # The watcher thread must not block, and a restart also writes files (README, ...)
+            if time.monotonic() - last_restart[0] < PREVIEW_RESTART_MIN_INTERVAL:
+                return
+            last_restart[0] = time.monotonic()
+            if logger is not None:
+                logger.info(f"Fichiers modifiés ({', '.join(changed_paths[:5])}), relance de la prévisualisation {key}")
+            threading.Thread(target=restart, daemon=True).start()
+    try:
+        watch_project(project_dir, key, on_change)
+    except Exception as e:  # The preview works without the watcher, the index just rescans
+        if logger is not None:
+            logger.warning(f"Surveillance des fichiers impossible pour {project_dir}: {e}")
+
+def unwatch_preview_files(project_dir, key: str):
+    unwatch_project(project_dir, key)
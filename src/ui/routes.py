@@ -210,6 +210,16 @@ def get_project_structure():
         current_app.logger.error(f"Erreur lors de la récupération de la structure: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@bp_ui.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    from src.api.response_cache import get_response_cache_stats
+    from src.mcp.tool_cache import get_tool_cache_stats
+    return jsonify({
+        "status": "success",
+        "llm_response_cache": get_response_cache_stats(),
+        "tool_result_cache": get_tool_cache_stats()
+    })
+
 @bp_ui.route('/ping')
 def ping():
     return jsonify({"status": "ok", "message": "Le serveur fonctionne correctement!"})
\ No newline at end of file
@@ -0,0 +1,373 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Sélection du code envoyé au modèle lors d'une itération.
+Les fichiers du projet sont découpés en blocs de lignes et indexés (BM25) sur leurs mots,
+leurs identifiants (camelCase, snake_case, kebab-case découpés), leurs symboles définis
+et leur chemin. L'index est construit une fois par projet puis mis à jour fichier par
+fichier à partir de l'index du projet. Les fichiers les plus pertinents pour le retour
+de l'utilisateur sont envoyés en entier s'ils tiennent dans le budget de tokens, sinon
+seuls leurs meilleurs blocs le sont.
+"""
+
+import re
+import math
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, NamedTuple, Tuple
+
+from src.config.constants import (
+    ITERATION_CONTEXT_TOKEN_BUDGET,
+    ITERATION_CONTEXT_MAX_FILES,
+    ITERATION_CONTEXT_CHUNK_LINES,
+    ITERATION_CONTEXT_MAX_FILE_SIZE,
+    PROJECT_INDEX_MAX_PROJECTS
+)
+from src.utils.project_index import ProjectIndex, get_project_index
+from src.utils.zip_utils import is_exported
+
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+_PATH_WEIGHT = 3    # Path terms are repeated in every chunk of the file
+_SYMBOL_WEIGHT = 2  # Terms of the symbols defined in a chunk count double
+_EXPANSION_WEIGHT = 0.5
+_CHARS_PER_TOKEN = 4
+
+# Lock files and similar: large, generated, never what the feedback is about
+_SKIPPED_NAMES = {'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'composer.lock', 'poetry.lock',
+                  'Pipfile.lock', 'generated_code.txt'}
+# Files sent first when the feedback matches nothing (previously: every HTML/CSS file)
+_FALLBACK_LANGUAGES = ('html', 'css', 'scss', 'javascript', 'typescript', 'vue', 'svelte', 'python', 'php')
+
+_STOP_WORDS = {
+    # English
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'into', 'are', 'was', 'will', 'can', 'should',
+    'make', 'please', 'add', 'more', 'less', 'use', 'all', 'but', 'not', 'its', 'it', 'to', 'of', 'in',
+    'on', 'an', 'be', 'is', 'as', 'at', 'by', 'or', 'my', 'me', 'we', 'so', 'if', 'do',
+    # French
+    'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'et', 'ou', 'en', 'au', 'aux', 'sur', 'dans',
+    'pour', 'par', 'avec', 'sans', 'que', 'qui', 'est', 'sont', 'plus', 'moins', 'mon', 'ma', 'mes',
+    'ce', 'cette', 'ces', 'il', 'elle', 'je', 'tu', 'nous', 'vous', 'faire', 'mettre', 'ajouter',
+    'ajoute', 'mets', 'fais', 'peux', 'stp', 'svp', 'merci', 'pas', 'ne', 'se', 'sa', 'son', 'ses',
+}
+
+# Feedback words (often French) and the terms that name them in code
+_QUERY_EXPANSIONS = {
+    'navbar': ['nav', 'navbar', 'menu', 'header'],
+    'menu': ['nav', 'navbar', 'menu', 'header'],
+    'navigation': ['nav', 'navbar', 'menu'],
+    'bouton': ['button', 'btn'],
+    'button': ['button', 'btn'],
+    'couleur': ['color', 'colour'],
+    'fond': ['background', 'bg'],
+    'arriere': ['background'],
+    'police': ['font', 'typography'],
+    'taille': ['size', 'width', 'height'],
+    'titre': ['title', 'heading', 'h1', 'h2'],
+    'lien': ['link', 'href'],
+    'image': ['img', 'image', 'src'],
+    'formulaire': ['form', 'input'],
+    'champ': ['input', 'field'],
+    'tableau': ['table'],
+    'liste': ['list', 'ul', 'li'],
+    'pied': ['footer'],
+    'entete': ['header'],
+    'bas': ['footer', 'bottom'],
+    'haut': ['header', 'top'],
+    'carte': ['card', 'map'],
+    'connexion': ['login', 'auth', 'signin'],
+    'inscription': ['signup', 'register'],
+    'recherche': ['search'],
+    'page': ['index', 'page', 'main'],
+    'accueil': ['index', 'home', 'hero'],
+    'animation': ['animation', 'transition', 'keyframes'],
+    'style': ['style', 'css'],
+    'sombre': ['dark', 'theme'],
+    'clair': ['light', 'theme'],
+}
+
+_WORD = re.compile(r'[A-Za-zÀ-ſ0-9_$-]+')
+_CAMEL = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_SYMBOL_DEFINITIONS = re.compile(
+    r'(?:\b(?:def|class|function|const|let|var|interface|type)\s+([A-Za-z_$][\w$]*))'  # Python, JS/TS
+    r'|(?:^\s*[.#]([A-Za-z_][\w-]*)[^{;\n]*\{)'                                          # CSS selectors
+    r'|(?:\b(?:id|name)\s*=\s*["\']([^"\']+)["\'])'                                       # HTML ids, form fields
+    r'|(?:@app\.route\(\s*["\']([^"\']+)["\'])',                                          # Flask routes
+    re.MULTILINE
+)
+
+
+def _strip_accents(text: str) -> str:
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-case terms of a text or of code: identifiers are split (navBar, nav_bar and
+    nav-bar give nav, bar and navbar), accents and stop words are removed and plurals
+    are folded.
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        parts = [part for part in re.split(r'[_$-]+', _CAMEL.sub('_', word)) if part]
+        candidates = parts if len(parts) == 1 else parts + [''.join(parts)]
+        for term in candidates:
+            term = _strip_accents(term.lower())
+            if len(term) < 2 or term.isdigit() or term in _STOP_WORDS:
+                continue
+            if len(term) > 3 and term.endswith('s') and not term.endswith('ss'):
+                term = term[:-1]
+            terms.append(term)
+    return terms
+
+
+def query_terms(query: str) -> Dict[str, float]:
+    """
+    Terms of the feedback and their weights: the code vocabulary of the usual UI words
+    is added at half weight, so that it helps without outranking the words actually used.
+    """
+    terms = dict.fromkeys(tokenize(query), 1.0)
+    for term in list(terms):
+        for expansion in _QUERY_EXPANSIONS.get(term, ()):
+            terms.setdefault(expansion, _EXPANSION_WEIGHT)
+    return terms
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+class _Chunk(NamedTuple):
+    start: int  # First line, 0-based
+    end: int    # Line after the last one
+    terms: Counter
+    length: int
+
+
+class _IndexedFile(NamedTuple):
+    size: int
+    mtime_ns: int
+    language: str
+    lines: List[str]
+    chunks: List[_Chunk]
+
+
+class ContextSnippet(NamedTuple):
+    """Code sent to the model: a whole file, or a range of its lines."""
+    path: str
+    text: str
+    start_line: int   # 1-based, inclusive
+    end_line: int
+    total_lines: int
+    score: float
+
+    @property
+    def partial(self) -> bool:
+        return self.start_line > 1 or self.end_line < self.total_lines
+
+
+class RetrievalIndex:
+    """
+    BM25 index over the chunks of the files of one project.
+
+    update() follows the project index: only files whose size or modification time
+    changed are read and tokenized again, and the document frequencies are adjusted
+    chunk by chunk.
+    """
+
+    def __init__(self, project_index: ProjectIndex, chunk_lines: int = ITERATION_CONTEXT_CHUNK_LINES):
+        self.project_index = project_index
+        self.chunk_lines = chunk_lines
+        self._files: Dict[str, _IndexedFile] = {}
+        self._document_frequency: Counter = Counter()
+        self._chunk_count = 0
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def update(self) -> None:
+        with self._lock:
+            # Project sources only (export rules): no .env secrets, logs nor build outputs in the prompt
+            entries = {entry.path: entry for entry in self.project_index.files(non_empty=True)
+                       if entry.size <= ITERATION_CONTEXT_MAX_FILE_SIZE and is_exported(entry.path)
+                       and entry.path.rsplit('/', 1)[-1] not in _SKIPPED_NAMES}
+            for path in [path for path in self._files if path not in entries]:
+                self._remove(path)
+            for path, entry in entries.items():
+                indexed = self._files.get(path)
+                if indexed is not None and indexed.size == entry.size and indexed.mtime_ns == entry.mtime_ns:
+                    continue
+                if indexed is not None:
+                    self._remove(path)
+                text = self.project_index.read_text(path)
+                if '\0' in text[:1024]:  # Binary file
+                    continue
+                self._add(path, entry.size, entry.mtime_ns, entry.language, text)
+
+    def _add(self, path: str, size: int, mtime_ns: int, language: str, text: str) -> None:
+        lines = text.splitlines()
+        path_terms = tokenize(path.replace('/', ' ').replace('.', ' ')) * _PATH_WEIGHT
+        chunks = []
+        for start in range(0, max(len(lines), 1), self.chunk_lines):
+            chunk_text = '\n'.join(lines[start:start + self.chunk_lines])
+            terms = tokenize(chunk_text) + path_terms
+            for match in _SYMBOL_DEFINITIONS.finditer(chunk_text):
+                symbol = next(group for group in match.groups() if group)
+                terms.extend(tokenize(symbol) * (_SYMBOL_WEIGHT - 1))
+            counts = Counter(terms)
+            chunks.append(_Chunk(start, min(start + self.chunk_lines, len(lines)), counts, len(terms)))
+            self._document_frequency.update(counts.keys())
+            self._total_length += len(terms)
+        self._chunk_count += len(chunks)
+        self._files[path] = _IndexedFile(size, mtime_ns, language, lines, chunks)
+
+    def _remove(self, path: str) -> None:
+        indexed = self._files.pop(path)
+        for chunk in indexed.chunks:
+            self._document_frequency.subtract(chunk.terms.keys())
+            self._total_length -= chunk.length
+        self._chunk_count -= len(indexed.chunks)
+        self._document_frequency += Counter()  # Drop the terms no longer present
+
+    def _score_chunks(self, terms: Dict[str, float]) -> Dict[str, List[float]]:
+        """BM25 score of every chunk, per file (files without any matching term are left out)."""
+        if not self._chunk_count:
+            return {}
+        average_length = self._total_length / self._chunk_count
+        weights = {}
+        for term, query_weight in terms.items():
+            frequency = self._document_frequency.get(term, 0)
+            if frequency:
+                weights[term] = query_weight * math.log(1 + (self._chunk_count - frequency + 0.5) / (frequency + 0.5))
+        scores = {}
+        for path, indexed in self._files.items():
+            chunk_scores = []
+            for chunk in indexed.chunks:
+                score = 0.0
+                for term, weight in weights.items():
+                    count = chunk.terms.get(term)
+                    if count:
+                        norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * chunk.length / average_length)
+                        score += weight * count * (_BM25_K1 + 1) / (count + norm)
+                chunk_scores.append(score)
+            if any(chunk_scores):
+                scores[path] = chunk_scores
+        return scores
+
+    def search(self, query: str, max_files: int = ITERATION_CONTEXT_MAX_FILES) -> List[Tuple[str, float, List[float]]]:
+        """
+        Rank the files for a query.
+
+        Returns:
+            list: (path, file score, chunk scores) of the best files, best first. The file
+            score is its best chunk plus a third of the others, so a file matching in
+            several places ranks above one matching once.
+        """
+        self.update()
+        with self._lock:
+            scores = self._score_chunks(query_terms(query))
+        ranked = []
+        for path, chunk_scores in scores.items():
+            best = max(chunk_scores)
+            ranked.append((path, best + (sum(chunk_scores) - best) / 3, chunk_scores))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:max_files]
+
+    def select_context(self, query: str, token_budget: int = ITERATION_CONTEXT_TOKEN_BUDGET,
+                       max_files: int = ITERATION_CONTEXT_MAX_FILES) -> List[ContextSnippet]:
+        """
+        Code to send with a feedback, within token_budget.
+
+        The ranked files are taken whole while they fit; a file too large for what is left
+        of the budget contributes its best chunks instead. When the feedback matches no
+        file, the front-end and entry files are used, smallest first.
+
+        Returns:
+            list: Snippets in ranking order, the ranges of one file in line order
+        """
+        ranked = self.search(query, max_files)
+        if not ranked:
+            with self._lock:
+                fallback = sorted(
+                    (path for path, indexed in self._files.items() if indexed.language in _FALLBACK_LANGUAGES),
+                    key=lambda path: (_FALLBACK_LANGUAGES.index(self._files[path].language),
+                                      self._files[path].size)
+                )
+                ranked = [(path, 0.0, [0.0] * len(self._files[path].chunks)) for path in fallback[:max_files]]
+
+        snippets: List[ContextSnippet] = []
+        remaining = token_budget
+        with self._lock:
+            for path, score, chunk_scores in ranked:
+                indexed = self._files.get(path)
+                if indexed is None or remaining <= 0:
+                    continue
+                total = len(indexed.lines)
+                text = '\n'.join(indexed.lines)
+                cost = estimate_tokens(text)
+                if cost <= remaining:
+                    snippets.append(ContextSnippet(path, text, 1, total, total, score))
+                    remaining -= cost
+                    continue
+                # Best chunks that still fit, then merged into contiguous ranges
+                chosen = []
+                for index in sorted(range(len(indexed.chunks)), key=lambda i: (-chunk_scores[i], i)):
+                    chunk = indexed.chunks[index]
+                    chunk_cost = estimate_tokens('\n'.join(indexed.lines[chunk.start:chunk.end]))
+                    if chunk_cost <= remaining and (chunk_scores[index] > 0 or not chosen):
+                        chosen.append(chunk)
+                        remaining -= chunk_cost
+                for start, end in _merge_ranges(sorted((chunk.start, chunk.end) for chunk in chosen)):
+                    snippets.append(ContextSnippet(path, '\n'.join(indexed.lines[start:end]), start + 1, end, total, score))
+        return snippets
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+_retrieval_indexes: "OrderedDict[str, RetrievalIndex]" = OrderedDict()
+_retrieval_indexes_lock = threading.Lock()
+
+
+def get_retrieval_index(base_dir) -> RetrievalIndex:
+    """Retrieval index of a project, kept across iterations; the least recently used ones are dropped."""
+    project_index = get_project_index(base_dir)
+    with _retrieval_indexes_lock:
+        index = _retrieval_indexes.get(project_index.base_dir)
+        if index is None or index.project_index is not project_index:
+            index = _retrieval_indexes[project_index.base_dir] = RetrievalIndex(project_index)
+            while len(_retrieval_indexes) > PROJECT_INDEX_MAX_PROJECTS:
+                _retrieval_indexes.popitem(last=False)
+        _retrieval_indexes.move_to_end(project_index.base_dir)
+    return index
+
+
+def format_snippets(snippets: List[ContextSnippet]) -> str:
+    """FILE blocks of the snippets; partial ones state which lines they show."""
+    blocks = []
+    for snippet in snippets:
+        header = f"FILE: {snippet.path}"
+        if snippet.partial:
+            header += f" (lines {snippet.start_line}-{snippet.end_line} of {snippet.total_lines}, excerpt)"
+        blocks.append(f"{header}\n```\n{snippet.text}\n```\n")
+    return "\n".join(blocks)
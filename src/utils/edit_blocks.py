@@ -0,0 +1,291 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Modifications ciblées proposées par le LLM, au format SEARCH/REPLACE :
+
+    EDIT: chemin/relatif/du/fichier.ext
+    <<<<<<< SEARCH
+    lignes actuelles du fichier
+    =======
+    nouvelles lignes
+    >>>>>>> REPLACE
+
+Pour une petite modification, le modèle ne renvoie que les lignes touchées au lieu du
+fichier complet. Le texte recherché est localisé exactement, puis sans tenir compte des
+espaces en fin de ligne, puis de l'indentation, puis de façon approchée (lignes
+légèrement différentes) ; un fichier dont une modification ne peut pas être placée
+n'est pas modifié et l'appelant redemande alors le fichier complet.
+"""
+
+import os
+import re
+import difflib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.config.constants import EDIT_FUZZY_MATCH_THRESHOLD
+
+
+_FUZZY_CANDIDATES = 20  # Windows compared in full by the approximate match
+
+
+class EditBlock(NamedTuple):
+    path: str     # Normalized relative path
+    search: str   # Empty for a new file
+    replace: str
+
+
+class EditError(ValueError):
+    """An edit block whose SEARCH text cannot be located in the file."""
+
+
+_EDIT_SECTION = re.compile(
+    r'^[ \t]*EDIT:[ \t]*`*(?P<path>[^`\n]+?)`*[ \t]*\n(?P<body>.*?)(?=^[ \t]*(?:EDIT:|FILE:|--- FILE:|=== FIX_FILE:)|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+_SEARCH_REPLACE = re.compile(
+    r'^[ \t]*<{5,9}[ \t]*SEARCH[^\n]*\n(?P<search>.*?)^[ \t]*={5,9}[ \t]*\n(?P<replace>.*?)^[ \t]*>{5,9}[ \t]*REPLACE[^\n]*$',
+    re.MULTILINE | re.DOTALL
+)
+
+
+def _normalize_path(path: str) -> str:
+    return os.path.normpath(path.strip().strip('"\'')).replace('\\', '/')
+
+
+def parse_search_replace(text: str) -> List[Tuple[str, str]]:
+    """(search, replace) pairs of the SEARCH/REPLACE blocks in text, in order."""
+    return [(match.group('search'), match.group('replace')) for match in _SEARCH_REPLACE.finditer(text)]
+
+
+def parse_edit_blocks(text: str) -> List[EditBlock]:
+    """
+    Edit blocks of a model response, grouped under their EDIT: header.
+
+    Returns:
+        list: Blocks in the order of the response (several per file are applied in order)
+    """
+    blocks = []
+    for section in _EDIT_SECTION.finditer(text or ''):
+        path = _normalize_path(section.group('path'))
+        for search, replace in parse_search_replace(section.group('body')):
+            blocks.append(EditBlock(path, search, replace))
+    return blocks
+
+
+def strip_edit_blocks(text: str) -> str:
+    """The response without its EDIT sections, for the parsers of complete files."""
+    return _EDIT_SECTION.sub('', text or '')
+
+
+def _lines(text: str) -> List[str]:
+    return text.split('\n')
+
+
+def _indent(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _reindent(replace_lines: List[str], search_lines: List[str], matched_lines: List[str]) -> List[str]:
+    """Shift the replacement by the indentation difference between the SEARCH text and the file."""
+    search_first = next((line for line in search_lines if line.strip()), '')
+    matched_first = next((line for line in matched_lines if line.strip()), '')
+    old, new = _indent(search_first), _indent(matched_first)
+    if old == new:
+        return replace_lines
+    result = []
+    for line in replace_lines:
+        if not line.strip():
+            result.append(line)
+        elif line.startswith(old):
+            result.append(new + line[len(old):])
+        else:
+            result.append(line)
+    return result
+
+
+def _find_whole_lines(content: str, text: str) -> Optional[int]:
+    """First offset where text occurs starting at a line start and ending at a line end."""
+    position = content.find(text)
+    while position != -1:
+        end = position + len(text)
+        if (position == 0 or content[position - 1] == '\n') and \
+                (end == len(content) or text.endswith('\n') or content[end] == '\n'):
+            return position
+        position = content.find(text, position + 1)
+    return None
+
+
+def _find_lines(content_lines: List[str], search_lines: List[str], normalize) -> Optional[int]:
+    wanted = [normalize(line) for line in search_lines]
+    first = wanted[0]
+    for start in range(len(content_lines) - len(wanted) + 1):
+        if normalize(content_lines[start]) == first and \
+                all(normalize(content_lines[start + i]) == wanted[i] for i in range(1, len(wanted))):
+            return start
+    return None
+
+
+def _line_ratio(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def _find_fuzzy(content_lines: List[str], search_lines: List[str], threshold: float) -> Optional[Tuple[int, int]]:
+    """
+    Best window (start, length) whose stripped lines resemble the SEARCH lines.
+
+    Windows are first ranked on the similarity of their first and last lines to those
+    of the SEARCH text (cheap: one line each); only the best candidates are compared in full.
+    """
+    wanted_lines = [line.strip() for line in search_lines]
+    wanted = '\n'.join(wanted_lines)
+    stripped = [line.strip() for line in content_lines]
+    first_ratios = [_line_ratio(wanted_lines[0], line) for line in stripped]
+    last_ratios = [_line_ratio(wanted_lines[-1], line) for line in stripped] if len(wanted_lines) > 1 else first_ratios
+
+    size = len(search_lines)
+    candidates = []
+    for length in {size, size - 1, size + 1}:
+        if length < 1:
+            continue
+        for start in range(len(stripped) - length + 1):
+            candidates.append((first_ratios[start] + last_ratios[start + length - 1], start, length))
+    candidates.sort(reverse=True)
+
+    best, best_ratio = None, threshold
+    for _, start, length in candidates[:_FUZZY_CANDIDATES]:
+        matcher = difflib.SequenceMatcher(None, wanted, '\n'.join(stripped[start:start + length]), autojunk=False)
+        if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+            continue
+        ratio = matcher.ratio()
+        if ratio > best_ratio or (ratio == best_ratio and best is not None and start < best[0]):
+            best, best_ratio = (start, length), ratio
+    return best
+
+
+def apply_edit(content: str, search: str, replace: str, threshold: float = EDIT_FUZZY_MATCH_THRESHOLD) -> str:
+    """
+    Replace the SEARCH text of one block in content.
+
+    Raises:
+        EditError: If the SEARCH text cannot be located
+    """
+    if not search.strip():
+        if not content.strip():
+            return replace  # New (or empty) file
+        raise EditError("empty SEARCH block on a non-empty file")
+
+    # 1. Exact text on whole lines (the first occurrence, as a model quoting a repeated snippet means the first one)
+    for candidate in (search, search.strip('\n')):
+        position = _find_whole_lines(content, candidate)
+        if position is not None:
+            new_text = replace if candidate == search else replace.strip('\n')
+            return content[:position] + new_text + content[position + len(candidate):]
+
+    content_lines = _lines(content)
+    search_lines = _lines(search.strip('\n'))
+    replace_lines = _lines(replace.strip('\n')) if replace.strip('\n') else []
+
+    # 2. Same lines up to trailing whitespace, 3. up to indentation
+    for normalize in (str.rstrip, str.strip):
+        start = _find_lines(content_lines, search_lines, normalize)
+        if start is not None:
+            matched = content_lines[start:start + len(search_lines)]
+            new_lines = _reindent(replace_lines, search_lines, matched)
+            return '\n'.join(content_lines[:start] + new_lines + content_lines[start + len(search_lines):])
+
+    # 4. Approximate: a window of about the same number of lines that is similar enough
+    window = _find_fuzzy(content_lines, search_lines, threshold)
+    if window is not None:
+        start, length = window
+        new_lines = _reindent(replace_lines, search_lines, content_lines[start:start + length])
+        return '\n'.join(content_lines[:start] + new_lines + content_lines[start + length:])
+
+    raise EditError(f"SEARCH text not found: {search.strip()[:80]!r}")
+
+
+def apply_edits(content: str, edits: Iterable[Tuple[str, str]]) -> str:
+    """Apply (search, replace) pairs in order. Raises EditError if one of them fails."""
+    for search, replace in edits:
+        content = apply_edit(content, search, replace)
+    return content
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+
+def apply_edit_blocks(base_dir, blocks: Iterable[EditBlock]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Compute the new content of every file targeted by edit blocks (nothing is written).
+
+    Args:
+        base_dir: Project directory
+        blocks (iterable): Edit blocks, applied in order for each file
+
+    Returns:
+        tuple: ({path: new content} for the files whose blocks all applied,
+                {path: reason} for the files left unchanged)
+    """
+    base_dir = os.path.realpath(str(base_dir))
+    by_file: Dict[str, List[EditBlock]] = {}
+    for block in blocks:
+        by_file.setdefault(block.path, []).append(block)
+
+    edited, failed = {}, {}
+    for path, file_blocks in by_file.items():
+        full_path = os.path.realpath(os.path.join(base_dir, path))
+        if not full_path.startswith(base_dir + os.sep):
+            failed[path] = "path outside of the project"
+            continue
+        try:
+            edited[path] = apply_edits(_read(full_path), ((block.search, block.replace) for block in file_blocks))
+        except EditError as e:
+            failed[path] = str(e)
+    return edited, failed
+
+
+def resolve_fix_content(file_path, body: str) -> str:
+    """
+    Content to write for a FIX_FILE section: its SEARCH/REPLACE blocks applied to the
+    current file, or the complete content the section holds.
+
+    Raises:
+        EditError: If the blocks do not apply (the file is then left as is)
+    """
+    edits = parse_search_replace(body)
+    if edits:
+        return apply_edits(_read(str(file_path)), edits)
+    return body.strip()
+
+
+def resolve_file_patch(file_path, patch: Dict) -> str:
+    """
+    New content of a file patch returned by a fixer: {'filename', 'content'} for a full
+    rewrite, or {'filename', 'edits': [{'search', 'replace'}, ...]} for targeted changes.
+
+    Raises:
+        EditError: If the edits do not apply (the file is then left as is)
+    """
+    if patch.get('content') is not None:
+        return patch['content']
+    edits = patch.get('edits') or []
+    if not edits:
+        raise EditError("patch without content nor edits")
+    return apply_edits(_read(str(file_path)), ((edit.get('search', ''), edit.get('replace', '')) for edit in edits))
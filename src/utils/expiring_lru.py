@@ -0,0 +1,121 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Dictionnaire en mémoire avec expiration, ordre LRU et budget en octets.
+Un tas (min-heap) des dates d'expiration évite de parcourir toutes les entrées pour
+trouver celles qui ont expiré, et la taille de chaque entrée est enregistrée à
+l'écriture : les statistiques sont des compteurs, sans re-sérialisation.
+"""
+
+import heapq
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class ExpiringLRUStore:
+    """
+    Key -> value map with a per-entry expiry date and an optional byte budget.
+
+    - Expired entries are found through a min-heap of expiry dates (lazy deletion:
+      heap items of replaced or deleted entries are skipped when they surface).
+    - When the budget is exceeded, the least recently used entries are evicted; the
+      entry being stored is never evicted, so an oversized entry ends up alone.
+    - Every operation is O(log n) amortized. Not thread-safe: callers hold their own lock.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, Hashable]] = []
+        self._counter = 0  # Tie-breaker: keys of different types are never compared
+        self.total_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def put(self, key: Hashable, value: Any, size: int, expires_at: float, now: float) -> None:
+        """Store value (whose size in bytes is size) until expires_at, then enforce the budget."""
+        self.purge_expired(now)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, expires_at)
+        self.total_bytes += size
+        self._counter += 1
+        heapq.heappush(self._expiry_heap, (expires_at, self._counter, key))
+
+        if self.max_bytes is not None:
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                if oldest == key:
+                    break
+                self._remove(oldest)
+                self.evictions += 1
+
+        # Stale heap items pile up when entries are replaced or evicted: rebuild from time to time
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(entry[2], index, entry_key) for index, (entry_key, entry) in enumerate(self._entries.items())]
+            heapq.heapify(self._expiry_heap)
+            self._counter = len(self._expiry_heap)
+
+    def get(self, key: Hashable, now: float) -> Optional[Any]:
+        """Return the value of key and mark it as recently used, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def pop(self, key: Hashable) -> bool:
+        """Delete key. Returns True if it was stored."""
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+
+    def purge_expired(self, now: float) -> int:
+        """Delete the entries expired at now. Returns their number."""
+        purged = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == expires_at:
+                self._remove(key)
+                purged += 1
+        self.expirations += purged
+        return purged
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
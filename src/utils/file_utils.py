@@ -21,6 +21,7 @@ import logging
 import os
 from pathlib import Path
 from src.utils.prompt_loader import get_agent_prompt
+from src.utils.project_index import get_project_index, note_file_written
 
 def parse_structure_and_prompt(response_text):
     """
@@ -158,6 +159,7 @@ def create_project_structure(target_directory, structure_lines):
                     item_path.parent.mkdir(parents=True, exist_ok=True)
                     # Create empty file (or empty it if it exists)
                     item_path.touch(exist_ok=True)
+                    note_file_written(item_path)
                     logging.info(f" ✅ File created/verified: {item_path}")
                     created_paths.append(item_path)
 
@@ -206,6 +208,156 @@ def clean_code_block(code_block):
     return code_block.strip()
 
 
+FILE_MARKER_PATTERN = re.compile(r'---\s*FILE:\s*(.*?)\s*---', re.IGNORECASE)
+GENERATION_INCOMPLETE_MARKER = "GENERATION_INCOMPLETE"
+
+
+def write_code_block(base_path, file_path_str, code_block):
+    """
+    Clean a generated code block and write it to its file under base_path.
+    
+    Args:
+        base_path (Path): Resolved project directory
+        file_path_str (str): File path announced by the '--- FILE: ... ---' marker
+        code_block (str): Raw code block following the marker
+        
+    Returns:
+        Path: Written file path, or None if the path was empty or unsafe
+        
+    Raises:
+        OSError: If the file cannot be written
+    """
+    # Clean and validate path
+    file_path_str = file_path_str.replace('\r', '').strip()
+    if not file_path_str:
+        return None
+
+    relative_path = Path(file_path_str)
+    if ".." in relative_path.parts: # Security: Check for '..'
+        logging.warning(f"⚠️ File path '{file_path_str}' contains '..', ignored for security.")
+        return None
+
+    target_file_path = base_path / relative_path
+
+    # Ensure parent folder exists (created in step 2, but for safety)
+    target_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Clean code block before writing
+    code_block = clean_code_block(code_block)
+
+    # Write code to file
+    with open(target_file_path, 'w', encoding='utf-8') as f:
+        f.write(code_block)
+    note_file_written(target_file_path)
+
+    return target_file_path
+
+
+class IncrementalCodeWriter:
+    """
+    Incremental version of parse_and_write_code for streamed responses.
+    
+    Text is fed chunk by chunk; each file is written as soon as the next
+    '--- FILE: ... ---' marker closes its block, so only the block being
+    received is kept in memory.
+    """
+
+    # Characters re-scanned before the new chunk, for markers split across chunks
+    MARKER_LOOKBEHIND = 512
+
+    def __init__(self, base_path, on_file_written=None):
+        """
+        Args:
+            base_path (str): Base directory path
+            on_file_written (function, optional): Called with the written Path after each file
+        """
+        self.base_path = Path(base_path).resolve()
+        self.on_file_written = on_file_written
+        self.files_written = []
+        self.errors = []
+        self.generation_incomplete = False
+        self._buffer = ""
+        self._current_path = None
+        self._marker_seen = False
+
+    def feed(self, text):
+        """Add streamed text and write every file whose block is now complete."""
+        if not text:
+            return
+        search_from = max(0, len(self._buffer) - self.MARKER_LOOKBEHIND)
+        self._buffer += text
+        while True:
+            match = FILE_MARKER_PATTERN.search(self._buffer, search_from)
+            if not match:
+                break
+            if self._current_path is not None:
+                self._write(self._current_path, self._buffer[:match.start()])
+            self._marker_seen = True
+            self._current_path = match.group(1).strip()
+            self._buffer = self._buffer[match.end():]
+            search_from = 0
+
+    def finish(self, discard_partial=False):
+        """
+        Flush the last block once the stream is over.
+        
+        Args:
+            discard_partial (bool): Drop the last block (stream interrupted mid-file)
+            
+        Returns:
+            tuple: (files_written, errors, generation_incomplete)
+        """
+        remaining = self._buffer.strip()
+        self._buffer = ""
+        if remaining.endswith(GENERATION_INCOMPLETE_MARKER):
+            self.generation_incomplete = True
+            logging.warning("⚠️ AI indicated that code generation is incomplete (likely token limit reached).")
+            remaining = remaining[:-len(GENERATION_INCOMPLETE_MARKER)].strip()
+
+        if discard_partial:
+            self.generation_incomplete = True
+            if self._current_path:
+                logging.warning(f"Stream interrupted while receiving '{self._current_path}', block discarded.")
+        elif self._current_path is not None:
+            self._write(self._current_path, remaining)
+        elif not self._marker_seen and remaining:
+            logging.warning("No '--- FILE: ... ---' markers found in code generation response.")
+            logging.info("Attempting to write entire response to 'generated_code.txt'")
+            output_file = self.base_path / "generated_code.txt"
+            try:
+                output_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(remaining)
+                note_file_written(output_file)
+                self.files_written.append(str(output_file))
+            except Exception as e:
+                self.errors.append(f"❌ Unable to write to '{output_file}': {e}")
+        self._current_path = None
+        return self.files_written, self.errors, self.generation_incomplete
+
+    def _write(self, file_path_str, code_block):
+        if not file_path_str:
+            logging.warning(f"Marker found but empty or invalid file path, block ignored.")
+            return
+        try:
+            target_file_path = write_code_block(self.base_path, file_path_str, code_block.strip())
+        except OSError as e:
+            error_msg = f"❌ Error writing to file '{file_path_str}': {e}"
+            logging.error(error_msg)
+            self.errors.append(error_msg)
+            return
+        except Exception as e:
+            error_msg = f"❌ Unexpected error processing file '{file_path_str}': {e}"
+            logging.error(error_msg)
+            self.errors.append(error_msg)
+            return
+        if target_file_path is None:
+            return
+        self.files_written.append(str(target_file_path))
+        if self.on_file_written:
+            self.on_file_written(target_file_path)
+
+
 def parse_and_write_code(base_path, code_response_text):
     """
     Parse code response and write each block to the corresponding file.
@@ -242,6 +394,7 @@ def parse_and_write_code(base_path, code_response_text):
             output_file.parent.mkdir(parents=True, exist_ok=True)
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(code_response_text)
+            note_file_written(output_file)
             files_written.append(str(output_file))
             logging.info(f" ✅ Raw code written to: {output_file}")
         except Exception as e:
@@ -261,26 +414,9 @@ def parse_and_write_code(base_path, code_response_text):
                 logging.warning(f"Marker found but empty or invalid file path, block ignored.")
                 continue
 
-            # Clean and validate path
-            file_path_str = file_path_str.replace('\r', '').strip()
-            if not file_path_str: continue # Ignore if empty after cleaning
-
-            relative_path = Path(file_path_str)
-            if ".." in relative_path.parts: # Security: Check for '..'
-                 logging.warning(f"⚠️ File path '{file_path_str}' contains '..', ignored for security.")
-                 continue
-
-            target_file_path = base_path / relative_path
-
-            # Ensure parent folder exists (created in step 2, but for safety)
-            target_file_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Clean code block before writing
-            code_block = clean_code_block(code_block)
-
-            # Write code to file
-            with open(target_file_path, 'w', encoding='utf-8') as f:
-                f.write(code_block)
+            target_file_path = write_code_block(base_path, file_path_str, code_block)
+            if target_file_path is None:
+                continue
 
             files_written.append(str(target_file_path))
             # logging.info(f"   Code written to: {target_file_path}") # Can be verbose
@@ -376,42 +512,27 @@ def generate_missing_code(api_key, model, empty_files, reformulated_prompt, stru
         '.rb': [r'^\s*def\s+\w+.*$', r'^\s*class\s+\w+.*$'],
         '.php': [r'^\s*function\s+\w+.*$'],
     }
-    for root, dirs, files in os.walk(target_directory):
-        for fname in files:
-            rel = os.path.relpath(os.path.join(root, fname), target_directory).replace(os.sep, '/')
-            ext = Path(fname).suffix.lower()
-            patterns = signature_patterns.get(ext)
-            if not patterns:
-                continue
-            try:
-                lines = Path(root, fname).read_text(encoding='utf-8', errors='ignore').splitlines()
-                for line in lines:
-                    for pat in patterns:
-                        if re.match(pat, line):
-                            definitions_summary += f"- {line.strip()} in {rel}\n"
-                            break
-            except:
-                continue
-
-    for root, dirs, files in os.walk(target_directory):
-        for fname in files:
-            rel = os.path.relpath(os.path.join(root, fname), target_directory).replace(os.sep, '/')
-            if rel in empty_files:
-                continue
-            filepath = os.path.join(root, fname)
-            try:
-                size = os.path.getsize(filepath)
-                if size == 0:
-                    continue
-                existing_list.append(rel)
-                # For HTML/CSS, include brief preview to preserve style context
-                if rel.lower().endswith(('.html', '.css')):
-                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    snippet = content[:200] + ('...' if len(content) > 200 else '')
-                    detailed_previews += f"FILE: {rel}\n```\n{snippet}\n```\n"
-            except:
-                continue
+    project_index = get_project_index(target_directory)
+    project_files = project_index.files()
+    for entry in project_files:
+        patterns = signature_patterns.get(entry.extension)
+        if not patterns:
+            continue
+        for line in project_index.read_text(entry.path).splitlines():
+            for pat in patterns:
+                if re.match(pat, line):
+                    definitions_summary += f"- {line.strip()} in {entry.path}\n"
+                    break
+
+    for entry in project_files:
+        if entry.path in empty_files or entry.size == 0:
+            continue
+        existing_list.append(entry.path)
+        # For HTML/CSS, include brief preview to preserve style context
+        if entry.extension in ('.html', '.css'):
+            content = project_index.read_text(entry.path)
+            snippet = content[:200] + ('...' if len(content) > 200 else '')
+            detailed_previews += f"FILE: {entry.path}\n```\n{snippet}\n```\n"
     existing_summary += "Existing files:\n" + "\n".join(existing_list) + "\n"
     if definitions_summary:
         existing_summary += "\nExisting definitions (signatures):\n" + definitions_summary
@@ -470,6 +591,7 @@ def generate_missing_code(api_key, model, empty_files, reformulated_prompt, stru
                 # Write code to file
                 with open(target_file_path, 'w', encoding='utf-8') as f:
                     f.write(code_block)
+                note_file_written(target_file_path)
                 
                 files_written.append(str(target_file_path))
                 
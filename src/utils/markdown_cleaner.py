@@ -0,0 +1,224 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Nettoyage des marqueurs Markdown laissés par le LLM dans les fichiers générés.
+Les règles sont compilées une seule fois et regroupées en une dizaine de passes (blocs
+de code, lignes parasites, texte explicatif en fin de fichier, lignes vides) au lieu
+d'une passe par règle, avec le même résultat. Seuls les fichiers indiqués par
+l'appelant sont traités, et les gros lots sont répartis sur un pool de processus.
+"""
+
+import os
+import re
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from src.config.constants import (
+    MARKDOWN_CLEANER_MAX_FILE_SIZE,
+    MARKDOWN_CLEANER_POOL_MIN_FILES,
+    MARKDOWN_CLEANER_POOL_WORKERS
+)
+from src.utils.project_index import note_file_written
+
+logger = logging.getLogger(__name__)
+
+# Known binary formats, never read
+BINARY_EXTENSIONS = {
+    '.exe', '.dll', '.so', '.dylib', '.bin', '.dat',
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg',
+    '.mp3', '.mp4', '.avi', '.mov', '.wav', '.pdf', '.zip',
+    '.tar', '.gz', '.7z', '.rar', '.pyc', '.class', '.o'
+}
+
+# Code fences: opening ```lang lines (with their newline), then closing ``` at line ends
+_FENCE_OPEN = re.compile(r'^```[a-zA-Z0-9_+-]*\n?', re.MULTILINE)
+_FENCE_CLOSE = re.compile(r'\n?```\s*$', re.MULTILINE)
+
+# Whole lines emptied. Within a pass the rules are tried in order at every line start,
+# which gives the same result as applying them one after the other as long as no rule
+# reaches across a line emptied by an earlier one: the rules whose \s can span a
+# newline (markers, headers, bold lines, list items) therefore start a new pass.
+_LINE_PASSES = [
+    [
+        # Leftover fence lines
+        r'```[a-zA-Z0-9_+-]*$',
+        # RepoMix and other end-of-file markers
+        r'(?i:---\s*END\s*OF\s*FILES?\s*---.*)$',
+        r'(?i:--\s*END\s*FILE--.*)$',
+        r'--\s*END--.*$',
+        r'###\s*END.*$',
+    ],
+    [
+        r'(?i:\s*-{3,}\s*END\s*-{3,}.*)$',
+        # Explanations and instructions added by the model
+        r'(?i:\*\*Note:\*\*.*)$',
+        r'(?i:\*\*Setup Instructions.*)$',
+        r'(?i:\*\*.*Instructions.*\*\*.*)$',
+        r'(?i:\*\*End of.*\*\*.*)$',
+    ],
+    [
+        # Markdown headers
+        r'#+\s+.*$',
+    ],
+    [
+        # Bold lines, with the blank lines after them
+        r'\*\*.*\*\*\s*$',
+    ],
+    [
+        # Documentation-like list items
+        r'(?i:-\s+.*download.*clone.*repository.*)$',
+        r'(?i:-\s+.*browser.*chrome.*firefox.*)$',
+    ],
+    [
+        r'(?i:-\s+.*open.*index\.html.*)$',
+    ],
+    [
+        r'\d+\.\s+.*$',
+        # Common instruction phrases
+        r'(?i:.*setup.*run.*instructions.*)$',
+        r'(?i:.*features.*)$',
+        r'(?i:.*usage.*)$',
+        r'(?i:.*development.*)$',
+        r'(?i:.*notes.*)$',
+    ],
+]
+_LINES = [re.compile('^(?:' + '|'.join(rules) + ')', re.MULTILINE) for rules in _LINE_PASSES]
+
+# Explanatory text after the code: everything from the first of these paragraphs is dropped
+_TRAILER_RULES = [
+    r'\*\*.*?\*\*',
+    r'#',
+    r'(?i:\*\*Note:\*\*)',
+    r'(?i:\*\*Setup Instructions)',
+    r'(?i:\*\*End of code)',
+    r'(?i:## Features)',
+    r'(?i:## Setup and Run)',
+    r'(?i:## Usage)',
+    r'(?i:## Notes)',
+    r'(?i:## Development)',
+    r'(?i:- The code is structured)',
+    r'(?i:- Download or clone)',
+    r'(?i:1\. Download)',
+    r'(?i:# To-Do List)',
+]
+_TRAILER = re.compile(r'\n\n(?:' + '|'.join(_TRAILER_RULES) + ').*$', re.DOTALL)
+
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def clean_markdown_text(content: str) -> str:
+    """
+    Remove the Markdown artifacts of a generated file: code fences, end markers,
+    headers and explanatory text, then collapse blank lines and strip.
+
+    Args:
+        content (str): File content
+
+    Returns:
+        str: Cleaned content
+    """
+    if '```' in content:
+        content = _FENCE_OPEN.sub('', content)
+        content = _FENCE_CLOSE.sub('', content)
+    for pattern in _LINES:
+        content = pattern.sub('', content)
+    content = _TRAILER.sub('', content)
+    content = _BLANK_LINES.sub('\n\n', content)
+    return content.strip()
+
+
+def clean_markdown_file(file_path: str) -> Optional[str]:
+    """
+    Clean one file in place.
+
+    Returns:
+        str: 'cleaned' if the file was rewritten, 'emptied' if cleaning would have left
+        it empty (the file is kept as is), None if nothing changed or it was skipped
+    """
+    if os.path.splitext(file_path)[1].lower() in BINARY_EXTENSIONS:
+        return None
+    try:
+        if os.path.getsize(file_path) > MARKDOWN_CLEANER_MAX_FILE_SIZE:
+            return None
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except OSError:
+        return None
+    if len(content.strip()) < 10:
+        return None
+
+    cleaned = clean_markdown_text(content)
+    if cleaned == content:
+        return None
+    if not cleaned:
+        return 'emptied'
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(cleaned)
+    return 'cleaned'
+
+
+def _clean_file_safely(file_path: str) -> Tuple[str, Optional[str]]:
+    try:
+        return file_path, clean_markdown_file(file_path)
+    except Exception as e:
+        return file_path, f"error: {e}"
+
+
+def clean_markdown_files(file_paths: Iterable[str], base_dir: Optional[str] = None) -> int:
+    """
+    Clean a batch of files, in a process pool when the batch is large.
+
+    Args:
+        file_paths (iterable): Files to clean (missing files are ignored)
+        base_dir (str, optional): Project directory: relative paths are resolved against it
+
+    Returns:
+        int: Number of files rewritten
+    """
+    paths: List[str] = []
+    for path in dict.fromkeys(str(path) for path in file_paths):
+        if base_dir and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        if os.path.isfile(path):
+            paths.append(path)
+    if not paths:
+        return 0
+
+    results = None
+    if len(paths) >= MARKDOWN_CLEANER_POOL_MIN_FILES and MARKDOWN_CLEANER_POOL_WORKERS > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=MARKDOWN_CLEANER_POOL_WORKERS) as executor:
+                chunk_size = max(1, len(paths) // (MARKDOWN_CLEANER_POOL_WORKERS * 4))
+                results = list(executor.map(_clean_file_safely, paths, chunksize=chunk_size))
+        except Exception as e:  # No fork/spawn available, broken pool, ...
+            logger.warning(f"Markdown cleanup pool unavailable, cleaning sequentially: {e}")
+            results = None
+    if results is None:
+        results = [_clean_file_safely(path) for path in paths]
+
+    files_cleaned = 0
+    for file_path, status in results:
+        display_path = os.path.relpath(file_path, base_dir) if base_dir else file_path
+        if status == 'cleaned':
+            files_cleaned += 1
+            note_file_written(file_path)
+            logging.info(f"🧹 Cleaned markdown artifacts from: {display_path}")
+        elif status == 'emptied':
+            logging.warning(f"⚠️ File became empty after cleaning: {display_path}")
+        elif status:
+            logging.warning(f"Could not clean file {display_path}: {status[len('error: '):]}")
+    return files_cleaned
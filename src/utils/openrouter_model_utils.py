@@ -18,40 +18,20 @@ Utility functions for checking OpenRouter model capabilities using live API data
 This replaces the hardcoded model_capabilities.py approach with dynamic API-based detection.
 """
 
-import requests
 import logging
 from typing import Optional, Dict, Any
+from src.api.model_catalogue import get_model_catalogue, ModelIndex, DEFAULT_TOOL_FALLBACK
+from src.config.constants import HTTP_CONNECT_TIMEOUT, HTTP_MODELS_READ_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
-# Cache for model data to avoid repeated API calls
-_model_cache = None
-_model_data_by_id = None
+# Longest wait for the very first catalogue fetch (afterwards the shared catalogue answers at once)
+_FIRST_FETCH_WAIT = HTTP_CONNECT_TIMEOUT + HTTP_MODELS_READ_TIMEOUT
 
-def _fetch_model_data():
-    """Fetch model data from OpenRouter API and cache it."""
-    global _model_cache, _model_data_by_id
-    
-    if _model_cache is not None:
-        return _model_cache
-    
-    try:
-        url = "https://openrouter.ai/api/v1/models"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json().get("data", [])
-        _model_cache = data
-        
-        # Create a lookup dictionary by model ID for faster access
-        _model_data_by_id = {model.get("id", ""): model for model in data}
-        
-        logger.info(f"Fetched {len(data)} models from OpenRouter API")
-        return data
-        
-    except Exception as e:
-        logger.warning(f"Failed to fetch model data from OpenRouter API: {e}")
-        return []
+def _get_model_index() -> Optional[ModelIndex]:
+    """Lookup index of the shared model catalogue, or None if it is unavailable."""
+    snapshot = get_model_catalogue().get_snapshot(wait=_FIRST_FETCH_WAIT)
+    return snapshot.index if snapshot is not None else None
 
 def model_supports_tools_api(model_name: str) -> bool:
     """
@@ -63,33 +43,20 @@ def model_supports_tools_api(model_name: str) -> bool:
     Returns:
         bool: True if the model supports tools, False otherwise
     """
-    # Ensure model data is loaded
-    _fetch_model_data()
+    index = _get_model_index()
     
-    if _model_data_by_id is None:
+    if index is None:
         logger.warning("No model data available, falling back to conservative approach")
         return False
     
-    # Direct lookup by model ID
-    model_data = _model_data_by_id.get(model_name)
+    # Exact ID, or a variant of it (":free" suffix, missing provider prefix, case)
+    model_id = index.resolve(model_name)
     
-    if model_data:
-        supported_parameters = model_data.get("supported_parameters", [])
-        has_tools = any("tool" in param for param in supported_parameters)
-        
-        logger.debug(f"Model {model_name}: tools={has_tools}, params={supported_parameters}")
+    if model_id:
+        has_tools = index.supports_tools(model_id)
+        logger.debug(f"Model {model_name} matched {model_id}: tools={has_tools}")
         return has_tools
     
-    # If not found by exact ID, try partial matching (for model variants)
-    model_lower = model_name.lower()
-    for model_id, model_info in _model_data_by_id.items():
-        if model_lower in model_id.lower() or model_id.lower() in model_lower:
-            supported_parameters = model_info.get("supported_parameters", [])
-            has_tools = any("tool" in param for param in supported_parameters)
-            
-            logger.debug(f"Model {model_name} matched {model_id}: tools={has_tools}")
-            return has_tools
-    
     # Model not found - conservative default
     logger.warning(f"Model {model_name} not found in OpenRouter API data, assuming no tool support")
     return False
@@ -104,70 +71,14 @@ def get_fallback_model_for_tools_api(original_model: str) -> str:
     Returns:
         str: A model that supports tools, preferably from the same provider
     """
-    # Ensure model data is loaded
-    _fetch_model_data()
+    index = _get_model_index()
     
-    if _model_data_by_id is None:
+    if index is None:
         # Fallback to a known reliable model
-        return "openai/gpt-4o-mini"
-    
-    original_lower = original_model.lower()
-    provider = original_model.split("/")[0] if "/" in original_model else ""
+        return DEFAULT_TOOL_FALLBACK
     
-    # Look for models from the same provider that support tools
-    provider_models_with_tools = []
-    all_models_with_tools = []
-    
-    for model_id, model_info in _model_data_by_id.items():
-        supported_parameters = model_info.get("supported_parameters", [])
-        has_tools = any("tool" in param for param in supported_parameters)
-        
-        if has_tools:
-            all_models_with_tools.append(model_id)
-            
-            # Check if it's from the same provider
-            if provider and model_id.startswith(provider + "/"):
-                provider_models_with_tools.append(model_id)
-    
-    # Prefer models from the same provider
-    if provider_models_with_tools:
-        # Sort by preference (usually smaller/cheaper models first)
-        if provider.lower() in ["openai"]:
-            # For OpenAI, prefer gpt-4o-mini over gpt-4o for cost
-            for model in ["openai/gpt-4o-mini", "openai/gpt-4o", "openai/gpt-4-turbo"]:
-                if model in provider_models_with_tools:
-                    return model
-        elif provider.lower() in ["anthropic"]:
-            # For Anthropic, prefer haiku for cost
-            for model in ["anthropic/claude-3-haiku", "anthropic/claude-3-5-sonnet", "anthropic/claude-3-opus"]:
-                if model in provider_models_with_tools:
-                    return model
-        elif provider.lower() in ["google"]:
-            # For Google, prefer flash for cost
-            for model in ["google/gemini-flash-1.5", "google/gemini-pro-1.5"]:
-                if model in provider_models_with_tools:
-                    return model
-        
-        # Fallback to first available from same provider
-        return provider_models_with_tools[0]
-    
-    # No models from same provider, use a reliable default
-    reliable_defaults = [
-        "openai/gpt-4o-mini",
-        "anthropic/claude-3-haiku", 
-        "google/gemini-flash-1.5"
-    ]
-    
-    for default_model in reliable_defaults:
-        if default_model in all_models_with_tools:
-            return default_model
-    
-    # Ultimate fallback
-    if all_models_with_tools:
-        return all_models_with_tools[0]
-    
-    # If somehow no models support tools (shouldn't happen), return a known good model
-    return "openai/gpt-4o-mini"
+    # Precomputed per provider when the catalogue is refreshed
+    return index.tool_fallback(original_model)
 
 def get_model_info_api(model_name: str) -> Optional[Dict[str, Any]]:
     """
@@ -179,19 +90,34 @@ def get_model_info_api(model_name: str) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict]: Model information dict or None if not found
     """
-    _fetch_model_data()
+    index = _get_model_index()
     
-    if _model_data_by_id is None:
+    if index is None:
         return None
     
-    return _model_data_by_id.get(model_name)
+    return index.by_id.get(model_name)
+
+def get_model_context_length_api(model_name: str) -> Optional[int]:
+    """Context window of a model in tokens, or None if unknown."""
+    index = _get_model_index()
+    model_id = index.resolve(model_name) if index is not None else None
+    return index.context_length(model_id) if model_id else None
+
+def get_model_pricing_api(model_name: str) -> Optional[Dict[str, float]]:
+    """Prices per token of a model (prompt, completion, ...) as floats, or None if unknown."""
+    index = _get_model_index()
+    model_id = index.resolve(model_name) if index is not None else None
+    return index.pricing(model_id) if model_id else None
+
+def get_model_supported_parameters_api(model_name: str) -> frozenset:
+    """Request parameters supported by a model (tools, response_format, ...), empty if unknown."""
+    index = _get_model_index()
+    model_id = index.resolve(model_name) if index is not None else None
+    return index.supported_parameters.get(model_id, frozenset()) if model_id else frozenset()
 
 def refresh_model_cache():
     """Force refresh of the model cache."""
-    global _model_cache, _model_data_by_id
-    _model_cache = None
-    _model_data_by_id = None
-    _fetch_model_data()
+    get_model_catalogue().refresh()
 
 # For backward compatibility, provide aliases
 model_supports_tools = model_supports_tools_api
@@ -0,0 +1,294 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Index des fichiers d'un projet généré (chemin, taille, date de modification,
+empreinte, langage), partagé par tout le code qui parcourait le dossier.
+Le pipeline signale chaque fichier qu'il écrit : l'index est mis à jour fichier par
+fichier, et un nouveau parcours du disque n'a lieu que si l'index est trop ancien
+(modifications faites hors du pipeline) et qu'aucun watcher (project_watcher.py) ne
+le tient à jour. Seuls les dossiers de dépendances, d'environnements virtuels et .git
+sont ignorés : fichiers cachés (.env, .gitignore, ...) et builds restent visibles, les
+exclusions propres à l'export sont appliquées par zip_utils.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from src.config.constants import (
+    PROJECT_INDEX_IGNORED_DIRS,
+    PROJECT_INDEX_MAX_AGE_SECONDS,
+    PROJECT_INDEX_MAX_PROJECTS
+)
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES_BY_EXTENSION = {
+    '.html': 'html', '.htm': 'html', '.css': 'css', '.scss': 'scss', '.sass': 'sass', '.less': 'less',
+    '.js': 'javascript', '.mjs': 'javascript', '.cjs': 'javascript', '.jsx': 'javascript',
+    '.ts': 'typescript', '.tsx': 'typescript', '.vue': 'vue', '.svelte': 'svelte',
+    '.py': 'python', '.php': 'php', '.rb': 'ruby', '.go': 'go', '.rs': 'rust', '.java': 'java',
+    '.kt': 'kotlin', '.cs': 'csharp', '.c': 'c', '.h': 'c', '.cpp': 'cpp', '.hpp': 'cpp',
+    '.swift': 'swift', '.dart': 'dart', '.sh': 'shell', '.bat': 'batch', '.ps1': 'powershell',
+    '.sql': 'sql', '.json': 'json', '.yaml': 'yaml', '.yml': 'yaml', '.toml': 'toml', '.xml': 'xml',
+    '.md': 'markdown', '.txt': 'text', '.ini': 'ini', '.cfg': 'ini', '.env': 'dotenv'
+}
+_LANGUAGES_BY_NAME = {'Dockerfile': 'dockerfile', 'Makefile': 'makefile', 'Procfile': 'procfile'}
+
+
+def is_ignored_dir(name: str) -> bool:
+    """Directories never indexed: installed dependencies, virtualenvs and .git."""
+    return name in PROJECT_INDEX_IGNORED_DIRS
+
+
+def detect_language(path: str) -> str:
+    name = os.path.basename(path)
+    if name in _LANGUAGES_BY_NAME:
+        return _LANGUAGES_BY_NAME[name]
+    return LANGUAGES_BY_EXTENSION.get(os.path.splitext(name)[1].lower(), 'other')
+
+
+class FileEntry(NamedTuple):
+    path: str                   # Relative path with forward slashes
+    size: int
+    mtime_ns: int
+    language: str
+    sha256: Optional[str] = None  # Filled when the file is read through the index
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.path)[1].lower()
+
+
+class ProjectIndex:
+    """
+    Files of one project, kept in memory and updated incrementally.
+
+    - record_write() / record_delete() apply the changes made by the pipeline.
+    - ensure_fresh() rescans the tree (stat only, unchanged files keep their hash)
+      when the last scan is older than max_age, unless a watcher keeps the index live.
+    Thread-safe: the generation workers and the routes share the same instance.
+    """
+
+    def __init__(self, base_dir: str, max_age: float = PROJECT_INDEX_MAX_AGE_SECONDS):
+        self.base_dir = os.path.realpath(base_dir)
+        self.max_age = max_age
+        self.live = False  # Set while a filesystem watcher pushes the changes
+        self._entries: Dict[str, FileEntry] = {}
+        self._lock = threading.RLock()
+        self._scanned_at: Optional[float] = None
+
+    def relative_path(self, path: str) -> Optional[str]:
+        """Relative path of path inside the project, or None if it is outside or in an ignored directory."""
+        full_path = os.path.realpath(os.path.join(self.base_dir, str(path)))
+        if not full_path.startswith(self.base_dir + os.sep):
+            return None
+        parts = os.path.relpath(full_path, self.base_dir).split(os.sep)
+        if any(is_ignored_dir(part) for part in parts[:-1]):
+            return None
+        return '/'.join(parts)
+
+    def abs_path(self, rel_path: str) -> str:
+        return os.path.join(self.base_dir, *rel_path.split('/'))
+
+    def rescan(self) -> Set[str]:
+        """
+        Walk the project again; entries of unchanged files (same size and mtime) are kept.
+
+        Returns:
+            set: Relative paths added, modified or removed since the previous scan
+        """
+        entries = self._scan_tree('')
+        with self._lock:
+            previous = self._entries
+            changed = {path for path, entry in entries.items() if previous.get(path) is not entry}
+            changed.update(path for path in previous if path not in entries)
+            self._entries = entries
+            self._scanned_at = time.monotonic()
+        return changed
+
+    def _scan_tree(self, rel_root: str) -> Dict[str, FileEntry]:
+        """Entries of the files under rel_root ('' for the whole project)."""
+        entries: Dict[str, FileEntry] = {}
+        stack = [rel_root]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                with os.scandir(os.path.join(self.base_dir, rel_dir)) as iterator:
+                    children = list(iterator)
+            except OSError:
+                continue
+            for child in children:
+                rel_path = f"{rel_dir}/{child.name}" if rel_dir else child.name
+                try:
+                    if child.is_dir():
+                        if not is_ignored_dir(child.name):
+                            stack.append(rel_path)
+                        continue
+                    if not child.is_file():
+                        continue
+                    stat = child.stat()
+                except OSError:
+                    continue
+                entries[rel_path] = self._entry(rel_path, stat)
+        return entries
+
+    def _entry(self, rel_path: str, stat: os.stat_result) -> FileEntry:
+        """Entry for the given stat, reusing the known hash if the file did not change."""
+        previous = self._entries.get(rel_path)
+        if previous is not None and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+            return previous
+        return FileEntry(rel_path, stat.st_size, stat.st_mtime_ns, detect_language(rel_path))
+
+    def ensure_fresh(self, max_age: Optional[float] = None) -> None:
+        """Rescan if the index was never built, or is older than max_age and not kept live."""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            if self._scanned_at is None:
+                pass
+            elif self.live or time.monotonic() - self._scanned_at <= max_age:
+                return
+            self.rescan()
+
+    def record_write(self, path: str) -> None:
+        """Take into account a file written by the pipeline (absolute or relative to the project)."""
+        rel_path = self.relative_path(path)
+        if rel_path is None:
+            return
+        try:
+            stat = os.stat(self.abs_path(rel_path))
+        except OSError:
+            self.record_delete(rel_path)
+            return
+        with self._lock:
+            self._entries[rel_path] = self._entry(rel_path, stat)
+
+    def record_delete(self, path: str) -> None:
+        rel_path = self.relative_path(path)
+        if rel_path is not None:
+            with self._lock:
+                self._entries.pop(rel_path, None)
+
+    def refresh_paths(self, rel_paths: Iterable[str]) -> None:
+        """
+        Re-stat the given paths, reported changed by a watcher: files are updated, new
+        directories are scanned, and whatever no longer exists is removed with its content.
+        """
+        for rel_path in rel_paths:
+            full_path = self.abs_path(rel_path)
+            if os.path.isdir(full_path):
+                if self.relative_path(os.path.join(full_path, 'x')) is None:
+                    continue  # Ignored directory
+                entries = self._scan_tree(rel_path)
+                with self._lock:
+                    prefix = rel_path + '/'
+                    for path in [path for path in self._entries if path.startswith(prefix) and path not in entries]:
+                        del self._entries[path]
+                    self._entries.update(entries)
+            elif os.path.isfile(full_path):
+                self.record_write(rel_path)
+            else:
+                with self._lock:
+                    prefix = rel_path + '/'
+                    for path in [path for path in self._entries if path == rel_path or path.startswith(prefix)]:
+                        del self._entries[path]
+
+    def files(self, extensions: Optional[Iterable[str]] = None, non_empty: bool = False) -> List[FileEntry]:
+        """
+        Indexed files sorted by path.
+
+        Args:
+            extensions (iterable, optional): Keep only these extensions ('.html', ...)
+            non_empty (bool): Skip empty files
+        """
+        self.ensure_fresh()
+        wanted = {ext.lower() for ext in extensions} if extensions is not None else None
+        with self._lock:
+            entries = list(self._entries.values())
+        return sorted(
+            (entry for entry in entries
+             if (wanted is None or entry.extension in wanted) and (not non_empty or entry.size > 0)),
+            key=lambda entry: entry.path
+        )
+
+    def get(self, rel_path: str) -> Optional[FileEntry]:
+        self.ensure_fresh()
+        with self._lock:
+            return self._entries.get(rel_path)
+
+    def read_text(self, rel_path: str) -> str:
+        """Read an indexed file as text and record its hash. Returns '' if it cannot be read."""
+        try:
+            with open(self.abs_path(rel_path), 'rb') as f:
+                data = f.read()
+            stat = os.stat(self.abs_path(rel_path))
+        except OSError:
+            return ''
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            entry = self._entry(rel_path, stat)
+            self._entries[rel_path] = entry._replace(sha256=digest)
+        return data.decode('utf-8', errors='ignore')
+
+    def manifest_hash(self, entries: Optional[Iterable[FileEntry]] = None) -> str:
+        """Fingerprint of the indexed files, or of the given entries (path, size, mtime): changes whenever a file does."""
+        digest = hashlib.sha256()
+        for entry in self.files() if entries is None else entries:
+            digest.update(f"{entry.path}\0{entry.size}\0{entry.mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+
+_indexes: "OrderedDict[str, ProjectIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_project_index(base_dir) -> ProjectIndex:
+    """Index of a project, shared by every caller; the least recently used unwatched ones are dropped."""
+    key = os.path.realpath(str(base_dir))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ProjectIndex(key)
+            while len(_indexes) > PROJECT_INDEX_MAX_PROJECTS:
+                # Watched projects keep their index: the watcher updates that instance
+                victim = next((path for path, candidate in _indexes.items() if not candidate.live), None)
+                if victim is None:
+                    break
+                del _indexes[victim]
+        else:
+            _indexes.move_to_end(key)
+    return index
+
+
+def _indexes_containing(path: str) -> List[ProjectIndex]:
+    full_path = os.path.realpath(str(path))
+    with _indexes_lock:
+        return [index for key, index in _indexes.items() if full_path.startswith(key + os.sep)]
+
+
+def note_file_written(path) -> None:
+    """Update the index of the project containing path after the pipeline wrote it."""
+    for index in _indexes_containing(path):
+        index.record_write(str(path))
+
+
+def note_file_deleted(path) -> None:
+    for index in _indexes_containing(path):
+        index.record_delete(str(path))
@@ -0,0 +1,354 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Surveillance des fichiers d'un projet pendant sa prévisualisation.
+Un thread par projet actif reçoit les événements inotify (Linux) ou, à défaut, compare
+des parcours périodiques du dossier. Les événements sont regroupés (debounce) puis
+appliqués à l'index du projet, qui reste ainsi à jour sans nouveau parcours : la liste
+des fichiers, le contexte d'itération et l'export ZIP deviennent de simples lectures.
+Les abonnés (sessions de prévisualisation) sont prévenus des fichiers modifiés.
+"""
+
+import os
+import sys
+import time
+import ctypes
+import select
+import struct
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.config.constants import PROJECT_WATCH_DEBOUNCE_SECONDS, PROJECT_WATCH_POLL_INTERVAL
+from src.utils.project_index import ProjectIndex, get_project_index, is_ignored_dir
+from src.utils.zip_utils import is_exported
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) flags
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_EXCL_UNLINK = 0x04000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+               | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR | _IN_EXCL_UNLINK)
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+ChangeCallback = Callable[[List[str]], None]
+
+
+def _load_inotify():
+    """libc with the inotify functions, or None when they are not available."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_inotify()
+
+
+class ProjectWatcher:
+    """
+    Keep the index of one project live while it is watched.
+
+    Changes are accumulated until the project has been quiet for `debounce` seconds
+    (at most 2 x debounce after the first change, so a steady writer cannot hold them back),
+    applied to the index, then passed to every listener as a sorted list of relative paths.
+    Listeners run on the watcher thread and must not block.
+    """
+
+    def __init__(self, base_dir: str, debounce: float = PROJECT_WATCH_DEBOUNCE_SECONDS,
+                 poll_interval: float = PROJECT_WATCH_POLL_INTERVAL, use_inotify: bool = True):
+        self.index: ProjectIndex = get_project_index(base_dir)
+        self.base_dir = self.index.base_dir
+        self.debounce = debounce
+        self.max_latency = 2 * debounce
+        self.poll_interval = poll_interval
+        self.listeners: Dict[str, Optional[ChangeCallback]] = {}
+        self.backend = 'inotify' if use_inotify and _libc is not None else 'polling'
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, str] = {}  # Watch descriptor -> relative directory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        if self.backend == 'inotify':
+            try:
+                self._fd = self._inotify_init()
+                self._add_tree('')
+            except OSError as e:  # Watch limit reached, no inotify in this kernel, ...
+                logger.warning(f"inotify unavailable for {self.base_dir}, polling instead: {e}")
+                self._close_inotify()
+                self.backend = 'polling'
+        # The watches exist before this scan: nothing written from now on can be missed
+        self.index.rescan()
+        self.index.live = True
+        self._thread = threading.Thread(target=self._run, name=f"project-watcher:{os.path.basename(self.base_dir)}",
+                                        daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.base_dir} ({self.backend})")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.index.live = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=max(1.0, self.poll_interval + 1))
+        self._close_inotify()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        pending: Set[str] = set()
+        rescan = False
+        last_event = 0.0
+        first_event: Optional[float] = None
+        while not self._stop.is_set():
+            if self.backend == 'polling':
+                if self._stop.wait(self.poll_interval):
+                    break
+                changed = self.index.rescan()
+                if changed:
+                    self._notify(changed)
+                continue
+
+            if pending or rescan:
+                deadline = min(last_event + self.debounce, first_event + self.max_latency)
+                timeout = max(0.0, deadline - time.monotonic())
+            else:
+                timeout = 0.5  # Wake up regularly to check _stop
+            try:
+                ready, _, _ = select.select([self._fd], [], [], timeout)
+                if ready:
+                    relevant, overflow = self._read_events(pending)
+                    rescan |= overflow
+                    # Events on files outside the export (logs written by the running app, ...) must not delay the flush
+                    if relevant or overflow:
+                        last_event = time.monotonic()
+                        if first_event is None:
+                            first_event = last_event
+            except (OSError, ValueError) as e:
+                if self._stop.is_set():
+                    break
+                logger.warning(f"inotify failed for {self.base_dir}, polling instead: {e}")
+                self._close_inotify()
+                self.backend = 'polling'
+                rescan = True
+                last_event = first_event = time.monotonic()
+            if pending or rescan:
+                now = time.monotonic()
+                # Flushed once quiet for `debounce`, and at the latest `max_latency` after the first change
+                if now - last_event >= self.debounce or now - first_event >= self.max_latency:
+                    self._flush(pending, rescan)
+                    pending = set()
+                    rescan = False
+                    first_event = None
+
+    def _flush(self, pending: Set[str], rescan: bool) -> None:
+        try:
+            if rescan:
+                changed = self.index.rescan()
+            else:
+                self.index.refresh_paths(sorted(pending))
+                changed = pending
+        except Exception as e:
+            logger.warning(f"Could not update the index of {self.base_dir}: {e}")
+            return
+        if changed:
+            self._notify(changed)
+
+    def _notify(self, changed: Set[str]) -> None:
+        # Listeners only hear about project sources, not about logs, builds or caches the app writes
+        paths = sorted(path for path in changed if is_exported(path))
+        if not paths:
+            return
+        logger.debug(f"{len(paths)} file(s) changed in {self.base_dir}")
+        for key, callback in list(self.listeners.items()):
+            if callback is None:
+                continue
+            try:
+                callback(paths)
+            except Exception as e:
+                logger.warning(f"Change listener '{key}' failed for {self.base_dir}: {e}")
+
+    # --- inotify backend ---
+
+    @staticmethod
+    def _inotify_init() -> int:
+        fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return fd
+
+    def _close_inotify(self) -> None:
+        fd, self._fd = self._fd, None
+        self._watches.clear()
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _add_tree(self, rel_root: str) -> None:
+        """Watch rel_root and its non-ignored subdirectories."""
+        stack = [rel_root]
+        while stack:
+            rel_dir = stack.pop()
+            full_dir = os.path.join(self.base_dir, rel_dir)
+            wd = _libc.inotify_add_watch(self._fd, os.fsencode(full_dir), _WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                if not os.path.isdir(full_dir):
+                    continue  # Removed in the meantime
+                raise OSError(errno, f"inotify_add_watch({full_dir}): {os.strerror(errno)}")
+            self._watches[wd] = rel_dir
+            try:
+                with os.scandir(full_dir) as iterator:
+                    for child in iterator:
+                        if not is_ignored_dir(child.name) and child.is_dir(follow_symlinks=False):
+                            stack.append(f"{rel_dir}/{child.name}" if rel_dir else child.name)
+            except OSError:
+                continue
+
+    def _remove_tree(self, rel_root: str) -> None:
+        """Stop watching a directory moved out of its place (its new location is watched anew)."""
+        prefix = rel_root + '/'
+        for wd, rel_dir in list(self._watches.items()):
+            if rel_dir == rel_root or rel_dir.startswith(prefix):
+                del self._watches[wd]
+                _libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_events(self, pending: Set[str]) -> Tuple[int, bool]:
+        """
+        Read the queued events into pending.
+
+        Returns:
+            tuple: (number of events added to pending on exported files, True if the kernel
+            queue overflowed and the project must be rescanned)
+        """
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return 0, False
+        relevant = 0
+        overflow = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            rel_dir = self._watches.get(wd)
+            if rel_dir is None or not name:
+                continue  # Events about the watched directory itself are reported by its parent
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if mask & _IN_ISDIR:
+                if is_ignored_dir(name):
+                    continue
+                if mask & _IN_MOVED_FROM:
+                    self._remove_tree(rel_path)
+                elif mask & (_IN_CREATE | _IN_MOVED_TO):
+                    try:
+                        self._add_tree(rel_path)
+                    except OSError as e:
+                        logger.warning(f"Could not watch {rel_path} in {self.base_dir}: {e}")
+                        overflow = True
+            pending.add(rel_path)
+            if is_exported(rel_path):
+                relevant += 1
+
+        if overflow:
+            try:
+                self._add_tree('')  # Directories created while events were dropped
+            except OSError:
+                pass
+        return relevant, overflow
+
+
+_watchers: Dict[str, ProjectWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def watch_project(base_dir, key: str, on_change: Optional[ChangeCallback] = None) -> ProjectWatcher:
+    """
+    Subscribe to the changes of a project, starting its watcher if needed.
+
+    Args:
+        base_dir: Project directory
+        key (str): Listener identifier (preview session, project name); subscribing
+            again with the same key replaces the callback
+        on_change (callable, optional): Called with the changed relative paths
+
+    Returns:
+        ProjectWatcher: The project watcher
+    """
+    path = os.path.realpath(str(base_dir))
+    with _watchers_lock:
+        watcher = _watchers.get(path)
+        if watcher is None:
+            watcher = ProjectWatcher(path)
+            watcher.start()
+            _watchers[path] = watcher
+        watcher.listeners[key] = on_change
+    return watcher
+
+
+def unwatch_project(base_dir, key: str) -> None:
+    """Unsubscribe a listener; the watcher stops with its last listener."""
+    path = os.path.realpath(str(base_dir))
+    with _watchers_lock:
+        watcher = _watchers.get(path)
+        if watcher is None:
+            return
+        watcher.listeners.pop(key, None)
+        if watcher.listeners:
+            return
+        del _watchers[path]
+    watcher.stop()
+    logger.info(f"Stopped watching {path}")
+
+
+def get_project_watcher(base_dir) -> Optional[ProjectWatcher]:
+    with _watchers_lock:
+        return _watchers.get(os.path.realpath(str(base_dir)))
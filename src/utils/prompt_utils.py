@@ -17,7 +17,9 @@
 Utility functions for prompt handling and detection.
 """
 import re
-import asyncio
+
+from src.config.constants import URL_FETCH_MAX_URLS
+from src.utils.url_fetcher import fetch_urls
 
 def prompt_mentions_design(prompt_text):
     """
@@ -79,21 +81,11 @@ async def fetch_url_content(url):
         url (str): URL to fetch
         
     Returns:
-        str: Fetched content or error message
+        str: Readable text of the page (from the URL cache when still valid) or error message
     """
     try:
-        import aiohttp
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    # Truncate content if too large (to avoid token limits)
-                    if len(content) > 15000:
-                        content = content[:15000] + "... [content truncated due to length]"
-                    return content
-                else:
-                    return f"Error fetching URL: HTTP status {response.status}"
+        contents = await fetch_urls([url])
+        return contents.get(url, "Error fetching URL: unsupported URL")
     except Exception as e:
         return f"Error fetching URL: {str(e)}"
 
@@ -107,11 +99,5 @@ async def process_urls(urls):
     Returns:
         dict: Dictionary mapping URLs to their content
     """
-    url_contents = {}
-    
-    # Limit to first 3 URLs to avoid token limits and long processing times
-    for url in urls[:3]:
-        content = await fetch_url_content(url)
-        url_contents[url] = content
-    
-    return url_contents
\ No newline at end of file
+    # Limit to the first URLs to avoid token limits; they are fetched concurrently
+    return await fetch_urls(list(dict.fromkeys(urls))[:URL_FETCH_MAX_URLS])
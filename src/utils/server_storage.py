@@ -15,12 +15,20 @@
 
 """
 Stockage côté serveur pour éviter les problèmes de taille de cookie de session.
+Les données sont conservées dans le task store partagé (SQLite par défaut), ce qui
+les rend accessibles à tous les workers et les fait survivre à un redémarrage.
+Les clés API ne sont jamais écrites dans ce store : elles restent en mémoire du
+processus, associées à l'identifiant de génération.
 """
 import time
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Optional, Tuple
 
-# Stockage global côté serveur (en production, utilisez Redis ou une base de données)
-_server_storage: Dict[str, Dict[str, Any]] = {}
+from src.config.constants import SERVER_STORAGE_MAX_BYTES
+from src.utils.task_store import get_task_store
+
+_api_keys: Dict[str, Tuple[str, float]] = {}  # generation id -> (API key, expiry timestamp)
+_api_keys_lock = threading.Lock()
 
 def store_generation_data(session_id: str, data: Dict[str, Any], ttl_hours: int = 24) -> None:
     """
@@ -31,14 +39,39 @@ def store_generation_data(session_id: str, data: Dict[str, Any], ttl_hours: int
         data: Données à stocker
         ttl_hours: Durée de vie en heures
     """
-    expiry_time = time.time() + (ttl_hours * 3600)
-    _server_storage[session_id] = {
-        'data': data,
-        'expiry': expiry_time
-    }
+    # Le store purge les entrées expirées et applique le budget mémoire à l'écriture
+    data = {key: value for key, value in data.items() if key != 'api_key'}  # Jamais persistée en clair
+    get_task_store().put_data(session_id, data, ttl_hours * 3600)
+
+def store_api_key(session_id: str, api_key: Optional[str], ttl_hours: int = 24) -> None:
+    """
+    Garde l'API key d'une génération en mémoire du processus uniquement.
     
-    # Nettoie les données expirées
-    _cleanup_expired_data()
+    Args:
+        session_id: ID unique de la session
+        api_key: Clé OpenRouter de l'utilisateur
+        ttl_hours: Durée de vie en heures
+    """
+    if not api_key:
+        return
+    now = time.time()
+    with _api_keys_lock:
+        for key in [key for key, (_, expires_at) in _api_keys.items() if expires_at <= now]:
+            del _api_keys[key]
+        _api_keys[session_id] = (api_key, now + ttl_hours * 3600)
+
+def get_api_key(session_id: str) -> Optional[str]:
+    """
+    Récupère l'API key gardée en mémoire pour une génération.
+    
+    Returns:
+        La clé, ou None si inconnue de ce processus ou expirée
+    """
+    with _api_keys_lock:
+        entry = _api_keys.get(session_id)
+    if entry is None or entry[1] <= time.time():
+        return None
+    return entry[0]
 
 def get_generation_data(session_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -50,17 +83,8 @@ def get_generation_data(session_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Les données stockées ou None si non trouvées/expirées
     """
-    _cleanup_expired_data()
-    
-    if session_id in _server_storage:
-        stored_item = _server_storage[session_id]
-        if time.time() < stored_item['expiry']:
-            return stored_item['data']
-        else:
-            # Données expirées, les supprimer
-            del _server_storage[session_id]
-    
-    return None
+    # Les données expirées ne sont jamais renvoyées (filtrées par le store)
+    return get_task_store().get_data(session_id)
 
 def delete_generation_data(session_id: str) -> bool:
     """
@@ -72,21 +96,13 @@ def delete_generation_data(session_id: str) -> bool:
     Returns:
         True si les données ont été supprimées, False si non trouvées
     """
-    if session_id in _server_storage:
-        del _server_storage[session_id]
-        return True
-    return False
+    with _api_keys_lock:
+        _api_keys.pop(session_id, None)
+    return get_task_store().delete_data(session_id)
 
 def _cleanup_expired_data() -> None:
-    """Nettoie les données expirées du stockage."""
-    current_time = time.time()
-    expired_keys = [
-        session_id for session_id, item in _server_storage.items()
-        if current_time >= item['expiry']
-    ]
-    
-    for key in expired_keys:
-        del _server_storage[key]
+    """Nettoie les données expirées du stockage (tas d'expiration ou index sur expires_at)."""
+    get_task_store().purge_expired_data()
 
 def get_storage_stats() -> Dict[str, Any]:
     """
@@ -97,20 +113,12 @@ def get_storage_stats() -> Dict[str, Any]:
     """
     _cleanup_expired_data()
     
-    total_sessions = len(_server_storage)
-    total_size_estimate = 0
-    
-    for item in _server_storage.values():
-        # Estimation grossière de la taille
-        import json
-        try:
-            data_str = json.dumps(item['data'], default=str)
-            total_size_estimate += len(data_str.encode('utf-8'))
-        except:
-            total_size_estimate += 1000  # Estimation par défaut
+    # Compteurs tenus à jour à chaque écriture/suppression
+    total_sessions, total_size_estimate = get_task_store().data_stats()
     
     return {
         'total_sessions': total_sessions,
         'estimated_total_size_bytes': total_size_estimate,
-        'estimated_avg_size_per_session': total_size_estimate // max(total_sessions, 1)
+        'estimated_avg_size_per_session': total_size_estimate // max(total_sessions, 1),
+        'max_total_size_bytes': SERVER_STORAGE_MAX_BYTES
     }
@@ -0,0 +1,482 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Stockage des tâches de génération et des résultats, partagé entre processus.
+Le backend SQLite (mode WAL) permet de lancer plusieurs workers Flask/gunicorn sur
+une même machine et de conserver l'état après un redémarrage ; le backend mémoire
+garde l'ancien comportement (un seul processus).
+Les mises à jour de progression sont écrites par lots ; l'expiration est gérée en base.
+"""
+
+import os
+import json
+import time
+import atexit
+import socket
+import sqlite3
+import logging
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.config.constants import (
+    TASK_STORE_BACKEND,
+    TASK_STORE_BACKEND_ENV,
+    TASK_STORE_PATH,
+    TASK_STORE_FLUSH_INTERVAL,
+    SERVER_STORAGE_MAX_BYTES,
+    GENERATION_TASK_TTL_SECONDS
+)
+from src.utils.expiring_lru import ExpiringLRUStore
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+ACTIVE_STATUSES = ('queued', 'in_progress')
+
+# Identifies the tasks run by this process (used to detect tasks orphaned by a restart)
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class MemoryBackend:
+    """In-process backend: same behaviour as the former module-level dicts."""
+
+    def __init__(self, max_data_bytes: Optional[int] = SERVER_STORAGE_MAX_BYTES):
+        self._tasks: Dict[str, Tuple[str, str, Optional[float]]] = {}
+        self._data = ExpiringLRUStore(max_data_bytes)
+        self._lock = threading.Lock()
+
+    def load_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._tasks.get(task_id)
+        return json.loads(row[0]) if row else None
+
+    def save_tasks(self, rows: Iterable[Tuple[str, str, str, str, Optional[float]]]) -> None:
+        with self._lock:
+            for task_id, state, status, owner, expires_at in rows:
+                self._tasks[task_id] = (state, status, expires_at)
+
+    def delete_task(self, task_id: str) -> None:
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def task_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._tasks)
+
+    def active_tasks(self) -> List[Tuple[str, str]]:
+        return []  # Tasks of a memory store cannot outlive their process
+
+    def purge_expired_tasks(self, now: float) -> List[str]:
+        with self._lock:
+            expired = [task_id for task_id, (_, _, expires_at) in self._tasks.items() if expires_at is not None and expires_at <= now]
+            for task_id in expired:
+                del self._tasks[task_id]
+        return expired
+
+    def put_data(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._data.put(key, value, len(value.encode('utf-8')), expires_at, time.time())
+
+    def get_data(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            return self._data.get(key, now)
+
+    def delete_data(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key)
+
+    def purge_expired_data(self, now: float) -> int:
+        with self._lock:
+            return self._data.purge_expired(now)
+
+    def data_stats(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._data), self._data.total_bytes
+
+
+class SQLiteBackend:
+    """SQLite backend in WAL mode, safe to share between the processes of one machine."""
+
+    def __init__(self, db_path: str, max_data_bytes: Optional[int] = SERVER_STORAGE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_data_bytes = max_data_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " task_id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " status TEXT,"
+            " owner TEXT,"
+            " updated_at REAL NOT NULL,"
+            " expires_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_expires_at ON tasks(expires_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generation_data ("
+            " generation_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(generation_data)")]
+        if "accessed_at" not in columns:  # Stores created before the LRU budget
+            self._conn.execute("ALTER TABLE generation_data ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_data_expires_at ON generation_data(expires_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_data_accessed_at ON generation_data(accessed_at)")
+        # Entry count and total size maintained by triggers: stats never scan the table
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generation_data_stats ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0),"
+            " entries INTEGER NOT NULL,"
+            " bytes INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO generation_data_stats (id, entries, bytes)"
+            " SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM generation_data"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS generation_data_stats_insert AFTER INSERT ON generation_data BEGIN"
+            " UPDATE generation_data_stats SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS generation_data_stats_delete AFTER DELETE ON generation_data BEGIN"
+            " UPDATE generation_data_stats SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS generation_data_stats_update AFTER UPDATE OF size ON generation_data BEGIN"
+            " UPDATE generation_data_stats SET bytes = bytes - OLD.size + NEW.size WHERE id = 0; END"
+        )
+        self._conn.commit()
+
+    def load_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_tasks(self, rows: Iterable[Tuple[str, str, str, str, Optional[float]]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks (task_id, state, status, owner, updated_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(task_id, state, status, owner, now, expires_at) for task_id, state, status, owner, expires_at in rows]
+            )
+            self._conn.commit()
+
+    def delete_task(self, task_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+
+    def task_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT task_id FROM tasks")]
+
+    def active_tasks(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT task_id, owner FROM tasks WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                ACTIVE_STATUSES
+            ).fetchall()
+
+    def purge_expired_tasks(self, now: float) -> List[str]:
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute("SELECT task_id FROM tasks WHERE expires_at <= ?", (now,))]
+            if expired:
+                self._conn.execute("DELETE FROM tasks WHERE expires_at <= ?", (now,))
+                self._conn.commit()
+        return expired
+
+    def put_data(self, key: str, value: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            # Upsert rather than INSERT OR REPLACE: REPLACE deletions do not fire the stats triggers
+            self._conn.execute(
+                "INSERT INTO generation_data (generation_id, data, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(generation_id) DO UPDATE SET data = excluded.data, size = excluded.size,"
+                " expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, value, len(value.encode('utf-8')), expires_at, now)
+            )
+            self._conn.execute("DELETE FROM generation_data WHERE expires_at <= ?", (now,))
+            if self.max_data_bytes is not None:
+                # Evict the least recently used entries (never the one just stored) until within budget
+                while self._conn.execute("SELECT bytes FROM generation_data_stats WHERE id = 0").fetchone()[0] > self.max_data_bytes:
+                    evicted = self._conn.execute(
+                        "DELETE FROM generation_data WHERE generation_id = ("
+                        " SELECT generation_id FROM generation_data WHERE generation_id != ? ORDER BY accessed_at LIMIT 1)",
+                        (key,)
+                    ).rowcount
+                    if not evicted:
+                        break
+            self._conn.commit()
+
+    def get_data(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM generation_data WHERE generation_id = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE generation_data SET accessed_at = ? WHERE generation_id = ?", (now, key))
+                self._conn.commit()
+        return row[0] if row else None
+
+    def delete_data(self, key: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM generation_data WHERE generation_id = ?", (key,)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def purge_expired_data(self, now: float) -> int:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM generation_data WHERE expires_at <= ?", (now,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def data_stats(self) -> Tuple[int, int]:
+        with self._lock:
+            return self._conn.execute("SELECT entries, bytes FROM generation_data_stats WHERE id = 0").fetchone()
+
+
+class TaskRecord(dict):
+    """Task state dict whose modifications are persisted (in batches) by its store."""
+
+    def __init__(self, store: "TaskStore", task_id: str, state: Dict[str, Any]):
+        super().__init__(state)
+        self._store = store
+        self._task_id = task_id
+
+    def _changed(self) -> None:
+        self._store.mark_dirty(self._task_id, self)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self._changed()
+        return value
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+
+class TaskStore(MutableMapping):
+    """
+    Mapping task_id -> task state dict, drop-in replacement for the generation_tasks dict.
+
+    Tasks created by this process stay live in memory and their changes are flushed in
+    batches every TASK_STORE_FLUSH_INTERVAL seconds (immediately on creation and when a
+    task finishes). Tasks of other processes are read from the backend on each access.
+    Finished tasks expire task_ttl seconds after their finished_at time.
+    """
+
+    def __init__(self, backend, task_ttl: float = GENERATION_TASK_TTL_SECONDS, flush_interval: float = TASK_STORE_FLUSH_INTERVAL):
+        self.backend = backend
+        self.task_ttl = task_ttl
+        self.flush_interval = flush_interval
+        self._local: Dict[str, TaskRecord] = {}
+        self._dirty: Dict[str, TaskRecord] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    # -- Mapping interface --
+
+    def __getitem__(self, task_id: str) -> TaskRecord:
+        record = self._local.get(task_id)
+        if record is not None:
+            return record
+        state = self.backend.load_task(task_id)
+        if state is None:
+            raise KeyError(task_id)
+        return TaskRecord(self, task_id, state)
+
+    def __setitem__(self, task_id: str, state: Dict[str, Any]) -> None:
+        record = TaskRecord(self, task_id, state)
+        with self._lock:
+            self._local[task_id] = record
+            self._dirty[task_id] = record
+        self.flush()  # New tasks must be visible to the other workers right away
+
+    def __delitem__(self, task_id: str) -> None:
+        with self._lock:
+            self._local.pop(task_id, None)
+            self._dirty.pop(task_id, None)
+        self.backend.delete_task(task_id)
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._local or self.backend.load_task(task_id) is not None
+
+    def __iter__(self):
+        self.flush()
+        return iter(self.backend.task_ids())
+
+    def __len__(self) -> int:
+        self.flush()
+        return len(self.backend.task_ids())
+
+    # -- Persistence --
+
+    def is_local(self, task_id: str) -> bool:
+        """True if the task is run (or was created) by this process."""
+        return task_id in self._local
+
+    def mark_dirty(self, task_id: str, record: TaskRecord) -> None:
+        """Schedule the persistence of a modified record; finished tasks are written at once."""
+        with self._lock:
+            self._dirty[task_id] = record
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="task-store-flusher", daemon=True)
+                self._flusher.start()
+        if dict.get(record, 'status') in FINISHED_STATUSES:
+            self.flush()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Task store flush failed: {e}")
+
+    def flush(self) -> None:
+        """Write every pending task change in one batch."""
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+        rows = []
+        for task_id, record in dirty.items():
+            state = dict(record)
+            status = state.get('status')
+            expires_at = None
+            if status in FINISHED_STATUSES:
+                expires_at = float(state.get('finished_at') or time.time()) + self.task_ttl
+            rows.append((task_id, _dumps(state), status, PROCESS_OWNER, expires_at))
+        self.backend.save_tasks(rows)
+
+    def purge_expired(self) -> List[str]:
+        """Delete the finished tasks past their expiry (in the backend). Returns their ids."""
+        self.flush()
+        expired = self.backend.purge_expired_tasks(time.time())
+        with self._lock:
+            for task_id in expired:
+                self._local.pop(task_id, None)
+        return expired
+
+    def recover_orphaned_tasks(self) -> int:
+        """
+        Mark as failed the queued/running tasks whose process no longer exists
+        (server restart or crashed worker on this machine). Returns their number.
+        """
+        hostname = socket.gethostname()
+        recovered = 0
+        for task_id, owner in self.backend.active_tasks():
+            host, _, pid = (owner or "").rpartition(":")
+            if host != hostname or not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            state = self.backend.load_task(task_id) or {}
+            state.update({
+                'status': 'failed',
+                'error': "Generation interrupted by a server restart",
+                'finished_at': time.time()
+            })
+            self.backend.save_tasks([(task_id, _dumps(state), 'failed', owner, state['finished_at'] + self.task_ttl)])
+            recovered += 1
+        if recovered:
+            logger.warning(f"{recovered} generation tasks interrupted by a restart were marked as failed")
+        return recovered
+
+    # -- Generation data (server_storage) --
+
+    def put_data(self, key: str, data: Dict[str, Any], ttl_seconds: float) -> None:
+        self.backend.put_data(key, _dumps(data), time.time() + ttl_seconds)
+
+    def get_data(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.backend.get_data(key, time.time())
+        return json.loads(value) if value is not None else None
+
+    def delete_data(self, key: str) -> bool:
+        return self.backend.delete_data(key)
+
+    def purge_expired_data(self) -> int:
+        return self.backend.purge_expired_data(time.time())
+
+    def data_stats(self) -> Tuple[int, int]:
+        """(number of entries, total serialized bytes) of the stored generation data."""
+        return self.backend.data_stats()
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # Exists but belongs to someone else, or cannot be checked (Windows)
+    return True
+
+
+_task_store: Optional[TaskStore] = None
+_task_store_lock = threading.Lock()
+
+
+def get_task_store() -> TaskStore:
+    """
+    Return the process-wide task store, built from TASK_STORE_BACKEND (or the
+    TASK_STORE_BACKEND_ENV env var). Falls back to memory if SQLite is unavailable.
+    """
+    global _task_store
+    if _task_store is None:
+        with _task_store_lock:
+            if _task_store is None:
+                backend_name = os.environ.get(TASK_STORE_BACKEND_ENV, TASK_STORE_BACKEND).lower()
+                backend = MemoryBackend()
+                if backend_name == "sqlite":
+                    try:
+                        backend = SQLiteBackend(TASK_STORE_PATH)
+                    except (OSError, sqlite3.Error) as e:
+                        logger.warning(f"SQLite task store unavailable ({e}), using the in-memory store")
+                _task_store = TaskStore(backend)
+                try:
+                    _task_store.recover_orphaned_tasks()
+                except sqlite3.Error as e:
+                    logger.warning(f"Unable to recover interrupted tasks: {e}")
+    return _task_store
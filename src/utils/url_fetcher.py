@@ -0,0 +1,263 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Récupération des URLs citées dans le prompt.
+Les URLs sont téléchargées en parallèle sur une session aiohttp partagée (connexions
+limitées par hôte), le HTML est réduit à son texte utile (titres, paragraphes, listes)
+et les pages sont mises en cache sur disque puis revalidées avec ETag / Last-Modified.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from src.config.constants import (
+    URL_FETCH_TIMEOUT,
+    URL_FETCH_PER_HOST_LIMIT,
+    URL_FETCH_MAX_BYTES,
+    URL_CONTEXT_MAX_CHARS,
+    URL_CACHE_DIR,
+    URL_CACHE_FRESH_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Elements whose content is never useful as context
+_SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "head", "form", "button", "select"}
+# Page chrome dropped when the page has a <main> or <article>
+_CHROME_TAGS = {"nav", "header", "footer", "aside"}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "br", "hr", "li", "ul", "ol", "table", "tr",
+    "blockquote", "pre", "dd", "dt", "figcaption", "h1", "h2", "h3", "h4", "h5", "h6"
+}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class _TextExtractor(HTMLParser):
+    """Collect the readable text of a page, one line per block element."""
+
+    def __init__(self, skip_chrome: bool):
+        super().__init__(convert_charrefs=True)
+        self.skip_chrome = skip_chrome
+        self.title = ""
+        self.description = ""
+        self.lines: List[str] = []
+        self._current: List[str] = []
+        self._skip_tag: Optional[str] = None  # Only this tag is counted while skipping: end tags
+        self._skip_depth = 0                 # of other elements are often omitted (<li>, <p>)
+        self._in_title = False
+
+    def _end_line(self) -> None:
+        text = " ".join("".join(self._current).split())
+        if text:
+            self.lines.append(text)
+        self._current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attributes = dict(attrs)
+            if (attributes.get("name") or attributes.get("property") or "").lower() in ("description", "og:description"):
+                self.description = self.description or (attributes.get("content") or "").strip()
+            return
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag in _VOID_TAGS:
+            if tag in _BLOCK_TAGS and not self._skip_depth:
+                self._end_line()
+            return
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag in _SKIPPED_TAGS or (self.skip_chrome and tag in _CHROME_TAGS):
+            self._skip_tag = tag
+            self._skip_depth = 1
+            return
+        if tag in _BLOCK_TAGS:
+            self._end_line()
+        if tag == "li":
+            self._current.append("- ")
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._current.append("#" * int(tag[1]) + " ")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag in _VOID_TAGS:
+            return
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+            return
+        if tag in _BLOCK_TAGS:
+            self._end_line()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._end_line()
+
+
+def html_to_text(html: str, max_chars: int = URL_CONTEXT_MAX_CHARS) -> str:
+    """
+    Reduce an HTML page to its readable text: title, description, then the headings,
+    paragraphs and list items of the main content (scripts, styles and page chrome removed).
+
+    Args:
+        html (str): HTML source
+        max_chars (int): Maximum length of the returned text
+
+    Returns:
+        str: Plain text, truncated to max_chars
+    """
+    lowered = html.lower()
+    parser = _TextExtractor(skip_chrome="<main" in lowered or "<article" in lowered)
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:  # Malformed markup: keep what was parsed
+        logger.debug(f"HTML parsing stopped early: {e}")
+
+    parts = []
+    title = " ".join(parser.title.split())
+    if title:
+        parts.append(f"Title: {title}")
+    if parser.description:
+        parts.append(f"Description: {' '.join(parser.description.split())}")
+    seen = set()
+    for line in parser.lines:
+        if line not in seen:  # Repeated menus, buttons, cookie banners...
+            seen.add(line)
+            parts.append(line)
+    text = "\n".join(parts)
+    if len(text) > max_chars:
+        text = text[:max_chars] + "... [content truncated due to length]"
+    return text
+
+
+class UrlContentCache:
+    """
+    Disk cache of fetched pages: one JSON file per URL with the reduced text and the
+    validators (ETag, Last-Modified) used to revalidate it.
+    """
+
+    def __init__(self, cache_dir: str = URL_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if isinstance(entry, dict) and entry.get("url") == url else None
+
+    def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        entry = {"url": url, "text": text, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(url))
+        except OSError as e:
+            logger.debug(f"Could not cache {url}: {e}")
+
+    def touch(self, url: str) -> None:
+        """Mark a revalidated entry as fresh again."""
+        entry = self.get(url)
+        if entry is not None:
+            self.put(url, entry["text"], entry.get("etag"), entry.get("last_modified"))
+
+
+async def _fetch_one(session, url: str, cache: UrlContentCache, max_chars: int) -> str:
+    cached = cache.get(url)
+    if cached is not None and time.time() - cached.get("fetched_at", 0) < URL_CACHE_FRESH_SECONDS:
+        return cached["text"]
+
+    headers = {}
+    if cached is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                cache.touch(url)
+                return cached["text"]
+            if response.status != 200:
+                if cached is not None:
+                    return cached["text"]
+                return f"Error fetching URL: HTTP status {response.status}"
+            body = await response.content.read(URL_FETCH_MAX_BYTES)
+            content = body.decode(response.charset or "utf-8", errors="replace")
+            content_type = response.headers.get("Content-Type", "").lower()
+            if "html" in content_type or content.lstrip()[:15].lower().startswith(("<!doctype html", "<html")):
+                text = html_to_text(content, max_chars)
+            else:
+                text = content[:max_chars] + ("... [content truncated due to length]" if len(content) > max_chars else "")
+            cache.put(url, text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return text
+    except Exception as e:
+        if cached is not None:
+            logger.info(f"Using cached content for {url} after fetch error: {e}")
+            return cached["text"]
+        return f"Error fetching URL: {str(e)}"
+
+
+async def fetch_urls(urls: List[str], max_chars: int = URL_CONTEXT_MAX_CHARS,
+                     cache: Optional[UrlContentCache] = None) -> Dict[str, str]:
+    """
+    Fetch several URLs concurrently over one shared session.
+
+    Args:
+        urls (list): URLs to fetch (duplicates are fetched once)
+        max_chars (int): Maximum length of the text kept per URL
+        cache (UrlContentCache, optional): Page cache (defaults to URL_CACHE_DIR)
+
+    Returns:
+        dict: URL -> reduced text or error message, in the order of urls
+    """
+    import aiohttp
+
+    cache = cache or UrlContentCache()
+    unique_urls = [url for url in dict.fromkeys(urls) if urlsplit(url).scheme in ("http", "https")]
+    if not unique_urls:
+        return {}
+    connector = aiohttp.TCPConnector(limit_per_host=URL_FETCH_PER_HOST_LIMIT)
+    timeout = aiohttp.ClientTimeout(total=URL_FETCH_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        contents = await asyncio.gather(*(_fetch_one(session, url, cache, max_chars) for url in unique_urls))
+    return dict(zip(unique_urls, contents))
@@ -0,0 +1,307 @@
+# Copyright (C) 2025 Perey Alex
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>
+
+"""
+Export ZIP des projets générés, produit en flux.
+L'archive est envoyée par morceaux pendant la compression : la mémoire utilisée ne
+dépend pas de la taille du projet. Les dossiers de dépendances et caches de build
+sont exclus, et les fichiers déjà compressés sont stockés sans recompression.
+Chaque archive envoyée est écrite en même temps sur disque, indexée par l'empreinte
+du manifeste du projet (chemin, taille, date de modification) : un projet inchangé
+est resservi sans être recompressé.
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.config.constants import (
+    ZIP_EXCLUDED_DIRS,
+    ZIP_EXCLUDED_FILE_SUFFIXES,
+    ZIP_STORED_EXTENSIONS,
+    ZIP_CHUNK_SIZE,
+    ZIP_ARTIFACT_CACHE_DIR,
+    ZIP_ARTIFACT_CACHE_MAX_ENTRIES
+)
+from src.utils.project_index import FileEntry, ProjectIndex, get_project_index
+
+logger = logging.getLogger(__name__)
+
+# Above this size a member needs ZIP64 extra fields (sizes are not known up front when streaming)
+_ZIP64_THRESHOLD = 0x7FFFFFFF
+
+
+def is_excluded_dir(name: str) -> bool:
+    """Directories left out of the export: hidden ones, dependencies, virtualenvs and build outputs."""
+    return name.startswith('.') or name in ZIP_EXCLUDED_DIRS
+
+
+def is_excluded_file(name: str) -> bool:
+    return name.startswith('.') or name.endswith(ZIP_EXCLUDED_FILE_SUFFIXES)
+
+
+def is_exported(rel_path: str) -> bool:
+    """Whether a project file (relative path with forward slashes) goes into the export."""
+    parts = rel_path.split('/')
+    return not any(is_excluded_dir(part) for part in parts[:-1]) and not is_excluded_file(parts[-1])
+
+
+def exported_files(index: ProjectIndex) -> List[FileEntry]:
+    """Files of the project index kept by the export exclusion rules, sorted by path."""
+    return [entry for entry in index.files() if is_exported(entry.path)]
+
+
+def iter_project_files(base_dir: str) -> Iterator[Tuple[str, str]]:
+    """
+    Files of a project in a stable order, from the project index (export exclusion rules applied).
+
+    Yields:
+        tuple: (absolute path, archive name with forward slashes)
+    """
+    index = get_project_index(base_dir)
+    for entry in exported_files(index):
+        yield index.abs_path(entry.path), entry.path
+
+
+class _ZipStreamBuffer:
+    """
+    Write-only, non-seekable file object collecting what ZipFile writes.
+    tell() without seek() makes ZipFile use data descriptors (streaming mode).
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(base_dir: str, chunk_size: int = ZIP_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Generate a ZIP archive of base_dir chunk by chunk.
+
+    Args:
+        base_dir (str): Project directory to export
+        chunk_size (int): Size of the reads from the source files
+
+    Yields:
+        bytes: Consecutive pieces of the archive
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for file_path, arcname in iter_project_files(base_dir):
+            try:
+                stat = os.stat(file_path)
+                source = open(file_path, 'rb')
+            except OSError:
+                continue  # Removed or unreadable since the walk
+            with source:
+                zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(max(stat.st_mtime, 315532800))[:6])
+                zinfo.external_attr = (stat.st_mode & 0xFFFF) << 16
+                if os.path.splitext(arcname)[1].lower() in ZIP_STORED_EXTENSIONS:
+                    zinfo.compress_type = zipfile.ZIP_STORED
+                else:
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+                with zipf.open(zinfo, 'w', force_zip64=stat.st_size >= _ZIP64_THRESHOLD) as member:
+                    while True:
+                        data = source.read(chunk_size)
+                        if not data:
+                            break
+                        member.write(data)
+                        pending = buffer.drain()
+                        if pending:
+                            yield pending
+            pending = buffer.drain()
+            if pending:
+                yield pending
+    # Central directory, written when the archive is closed
+    pending = buffer.drain()
+    if pending:
+        yield pending
+
+
+def compute_manifest_hash(base_dir: str) -> str:
+    """
+    Fingerprint of the exported content of a project: archive name, size and mtime of
+    every file, without reading them. Any file added, removed or rewritten changes it.
+    The index is revalidated first (unless a watcher keeps it live): a download must
+    never be served from a manifest that misses a change.
+    """
+    index = get_project_index(base_dir)
+    index.ensure_fresh(max_age=0)
+    return index.manifest_hash(exported_files(index))
+
+
+class ZipArtifactCache:
+    """
+    Prebuilt project archives stored on disk.
+
+    Each project keeps a single artifact, <cache_dir>/<project key>/<manifest hash>.zip:
+    a download whose manifest hash matches is served as is. Otherwise the archive is
+    streamed to the client and written to a temporary file at the same time, which
+    replaces the previous artifact once complete. Writers that rewrite project files
+    (iteration, validation fixers) call invalidate() so a stale archive is never kept,
+    even when a rewrite leaves size and mtime unchanged.
+    """
+
+    def __init__(self, cache_dir: str = ZIP_ARTIFACT_CACHE_DIR, max_entries: int = ZIP_ARTIFACT_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._invalidations: Dict[str, int] = {}  # Project key -> invalidate() calls, checked before storing
+
+    @staticmethod
+    def _project_key(base_dir: str) -> str:
+        return hashlib.sha256(os.path.realpath(base_dir).encode("utf-8")).hexdigest()[:16]
+
+    def lookup(self, base_dir: str) -> Tuple[Optional[str], str]:
+        """
+        Find the archive of base_dir for its current manifest.
+
+        Returns:
+            tuple: (path of the archive, or None if it must be built; manifest hash usable as an ETag)
+        """
+        project_cache_dir = os.path.join(self.cache_dir, self._project_key(base_dir))
+        manifest_hash = compute_manifest_hash(base_dir)
+        artifact_path = os.path.join(project_cache_dir, f"{manifest_hash}.zip")
+        if not os.path.isfile(artifact_path):
+            return None, manifest_hash
+        logger.debug(f"[ZIP] Artifact cache hit for {base_dir}")
+        try:
+            os.utime(project_cache_dir)  # Recency used by the eviction
+        except OSError:
+            pass
+        return artifact_path, manifest_hash
+
+    def stream_and_store(self, base_dir: str, manifest_hash: str, chunk_size: int = ZIP_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Stream the archive of base_dir (as stream_zip) while writing it to a temporary
+        file, renamed into the cache once the archive is complete. Nothing is stored
+        if the client goes away, the project changed meanwhile or the disk write fails.
+
+        Args:
+            base_dir (str): Project directory to export
+            manifest_hash (str): Manifest hash returned by lookup() before streaming
+        """
+        key = self._project_key(base_dir)
+        project_cache_dir = os.path.join(self.cache_dir, key)
+        with self._lock:
+            invalidations = self._invalidations.get(key, 0)
+        try:
+            os.makedirs(project_cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=project_cache_dir, suffix=".tmp")
+            tmp_file = os.fdopen(fd, "wb")
+        except OSError as e:
+            logger.warning(f"[ZIP] Artifact cache unavailable for {base_dir} ({e}), streaming only")
+            yield from stream_zip(base_dir, chunk_size)
+            return
+
+        complete = False
+        try:
+            for chunk in stream_zip(base_dir, chunk_size):
+                if tmp_file is not None:
+                    try:
+                        tmp_file.write(chunk)
+                    except OSError as e:  # Disk full, ...: the download itself goes on
+                        logger.warning(f"[ZIP] Could not write the artifact of {base_dir}: {e}")
+                        tmp_file.close()
+                        tmp_file = None
+                yield chunk
+            complete = tmp_file is not None
+        finally:
+            if tmp_file is not None:
+                tmp_file.close()
+            stored = False
+            if complete:
+                with self._lock:
+                    unchanged = self._invalidations.get(key, 0) == invalidations
+                if unchanged and compute_manifest_hash(base_dir) == manifest_hash:
+                    stored = self._store(base_dir, project_cache_dir, tmp_path,
+                                         os.path.join(project_cache_dir, f"{manifest_hash}.zip"))
+            if not stored:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _store(self, base_dir: str, project_cache_dir: str, tmp_path: str, artifact_path: str) -> bool:
+        try:
+            os.replace(tmp_path, artifact_path)
+        except OSError as e:  # Cache directory invalidated meanwhile, ...
+            logger.debug(f"[ZIP] Artifact of {base_dir} not stored: {e}")
+            return False
+        # Only the artifact of the current manifest is useful
+        for name in os.listdir(project_cache_dir):
+            path = os.path.join(project_cache_dir, name)
+            if path != artifact_path and name.endswith(".zip"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Still being sent (Windows), removed on the next build
+        logger.info(f"[ZIP] Artifact built for {base_dir}: {os.path.getsize(artifact_path)} bytes")
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        """Remove the least recently downloaded projects beyond max_entries."""
+        try:
+            entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+        except OSError:
+            return
+        entries = [path for path in entries if os.path.isdir(path)]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda path: os.path.getmtime(path))
+        for path in entries[:len(entries) - self.max_entries]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def invalidate(self, base_dir: str) -> None:
+        """Drop the archive of a project whose files were rewritten."""
+        key = self._project_key(base_dir)
+        with self._lock:
+            self._invalidations[key] = self._invalidations.get(key, 0) + 1  # Archives being streamed are not stored
+        project_cache_dir = os.path.join(self.cache_dir, key)
+        if os.path.isdir(project_cache_dir):
+            shutil.rmtree(project_cache_dir, ignore_errors=True)
+            logger.debug(f"[ZIP] Artifact invalidated for {base_dir}")
+
+
+zip_artifact_cache = ZipArtifactCache()
+
+
+def invalidate_zip_artifacts(base_dir) -> None:
+    """Shortcut used by the code paths that rewrite the files of a project."""
+    if base_dir:
+        zip_artifact_cache.invalidate(str(base_dir))
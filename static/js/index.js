@@ -296,7 +296,7 @@ document.addEventListener("DOMContentLoaded", function () {
           // Check response
           if (data.status === "success") {
             // Start progress tracking
-            pollGenerationProgress();
+            followGenerationProgress();
           } else if (data.status === "error") {
             // Display errors
             clearInterval(tipInterval);
@@ -360,67 +360,90 @@ document.addEventListener("DOMContentLoaded", function () {
         return `<i class="${icon} me-2"></i>${stepMessage}`;
       }
 
-      // Function to poll the server for generation progress
-      function pollGenerationProgress() {
-        let pollInterval = setInterval(() => {
-          fetch(window.URL_GENERATION_PROGRESS)
-            .then((response) => response.json())
-            .then((data) => {
-              // Update progress bar
-              const progress = data.progress || 0;
-              progressBar.style.width = `${progress}%`;              // Update current step
-              if (data.current_step) {
-                currentStep.innerHTML = addIconToStep(data.current_step);
-                // Only show MCP message if it's not the generic tools enabled message
-                if (
-                  (data.current_step.includes("Outils MCP activés") ||
-                  data.current_step.includes("MCP tools enabled")) &&
-                  !data.current_step.startsWith("Define project structure") &&
-                  !data.current_step.startsWith("Generating documentation") &&
-                  !data.current_step.startsWith("Generating frontend") &&
-                  !data.current_step.startsWith("Generating backend")
-                ) {
-                  mcpMessage = data.current_step;
-                  mcpBox.textContent = mcpMessage;
-                  mcpBox.classList.remove("d-none");
-                } else if (
-                  data.current_step.includes("MCP tools enabled")
-                ) {
-                  // Hide the green box for the generic tools enabled message
-                  mcpBox.classList.add("d-none");
-                }
-              }
-              // Afficher le message MCP si déjà détecté
-              if (mcpMessage) {
-                mcpBox.textContent = mcpMessage;
-                mcpBox.classList.remove("d-none");
-              }              // If generation is complete
-              if (data.status === "completed") {
-                clearInterval(pollInterval);
-                clearInterval(tipInterval);
-                currentStep.innerHTML = addIconToStep("Generation complete!");
-                mcpBox.classList.add("d-none"); // Masquer à la fin
-                // Redirect to results page
+      // Function to update the modal from a progress event
+      function showGenerationProgress(data) {
+        // Update progress bar
+        const progress = data.progress || 0;
+        progressBar.style.width = `${progress}%`;
+        // Update current step
+        if (data.current_step) {
+          currentStep.innerHTML = addIconToStep(data.current_step);
+          // Only show MCP message if it's not the generic tools enabled message
+          if (
+            (data.current_step.includes("Outils MCP activés") ||
+            data.current_step.includes("MCP tools enabled")) &&
+            !data.current_step.startsWith("Define project structure") &&
+            !data.current_step.startsWith("Generating documentation") &&
+            !data.current_step.startsWith("Generating frontend") &&
+            !data.current_step.startsWith("Generating backend")
+          ) {
+            mcpMessage = data.current_step;
+            mcpBox.textContent = mcpMessage;
+            mcpBox.classList.remove("d-none");
+          } else if (
+            data.current_step.includes("MCP tools enabled")
+          ) {
+            // Hide the green box for the generic tools enabled message
+            mcpBox.classList.add("d-none");
+          }
+        }
+        // Afficher le message MCP si déjà détecté
+        if (mcpMessage) {
+          mcpBox.textContent = mcpMessage;
+          mcpBox.classList.remove("d-none");
+        }
+      }
+
+      function showGenerationFailure(data) {
+        clearInterval(tipInterval);
+        loadingModal.hide();
+        mcpBox.classList.add("d-none");
+        alert(
+          "Error during generation: " + (data.error || "Unknown error")
+        );
+      }
+
+      // Function to follow generation progress pushed by the server (Server-Sent Events).
+      // The browser reconnects by itself with Last-Event-ID if the stream drops.
+      function followGenerationProgress() {
+        const events = new EventSource(window.URL_GENERATION_EVENTS);
+        events.addEventListener("progress", (event) => {
+          const data = JSON.parse(event.data);
+          showGenerationProgress(data);
+
+          // If generation is complete
+          if (data.status === "completed") {
+            events.close();
+            clearInterval(tipInterval);
+            currentStep.innerHTML = addIconToStep("Generation complete!");
+            mcpBox.classList.add("d-none"); // Masquer à la fin
+            // One last progress request stores the result in the session, then redirect
+            fetch(window.URL_GENERATION_PROGRESS)
+              .then((response) => response.json())
+              .then((result) => {
                 setTimeout(() => {
-                  window.location.href = data.redirect_url || window.URL_GENERATION_RESULT;
+                  window.location.href = result.redirect_url || window.URL_GENERATION_RESULT;
                 }, 1500);
-              }
-
-              // If generation failed
-              if (data.status === "failed") {
-                clearInterval(pollInterval);
-                clearInterval(tipInterval);
-                loadingModal.hide();
-                mcpBox.classList.add("d-none");
-                alert(
-                  "Error during generation: " + (data.error || "Unknown error")
-                );
-              }
-            })
-            .catch((error) => {
-              console.error("Error checking progress:", error);
-            });
-        }, 1500); // Check progress every 1.5 seconds
+              })
+              .catch((error) => {
+                console.error("Error finalizing generation:", error);
+                window.location.href = window.URL_GENERATION_RESULT;
+              });
+          }
+
+          // If generation failed or was cancelled
+          if (data.status === "failed" || data.status === "cancelled") {
+            events.close();
+            showGenerationFailure(data);
+          }
+        });
+        events.onerror = () => {
+          if (events.readyState === EventSource.CLOSED) {
+            showGenerationFailure({ error: "Lost connection to the server." });
+          } else {
+            console.error("Progress stream interrupted, reconnecting...");
+          }
+        };
       }
     });
 
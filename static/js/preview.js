@@ -325,7 +325,7 @@ document.addEventListener("DOMContentLoaded", function () {
       .then((res) => res.json())
       .then((data) => {
         if (data.status === "success") {
-          pollIteration();
+          followIteration();
         } else {
           iterationStatus.textContent =
             data.message || "Error starting iteration";
@@ -337,31 +337,33 @@ document.addEventListener("DOMContentLoaded", function () {
         iterateBtn.disabled = false;
       });
   }
-  function pollIteration() {
-    const interval = setInterval(() => {
-      fetch(window.URL_GENERATION_PROGRESS)
-        .then((res) => res.json())
-        .then((data) => {
-          iterationStatus.textContent = `Progress: ${data.progress}% - ${data.current_step}`;
-          if (data.status === "completed" || data.status === "failed") {
-            clearInterval(interval);
-            if (data.status === "completed") {
-              iterationStatus.textContent = "Iteration completed.";
-              // restart preview to apply changes without changing port
-              restartApp();
-            } else {
-              iterationStatus.textContent =
-                "Iteration failed: " + (data.error || "Unknown error");
-            }
-            iterateBtn.disabled = false;
-          }
-        })
-        .catch((err) => {
-          clearInterval(interval);
-          iterationStatus.textContent = "Error during polling: " + err;
-          iterateBtn.disabled = false;
-        });
-    }, 2000);
+  function followIteration() {
+    // Progress is pushed by the server (Server-Sent Events); the browser resumes with Last-Event-ID
+    const events = new EventSource(window.URL_GENERATION_EVENTS);
+    events.addEventListener("progress", (event) => {
+      const data = JSON.parse(event.data);
+      iterationStatus.textContent = `Progress: ${data.progress}% - ${data.current_step}`;
+      if (data.status === "completed" || data.status === "failed" || data.status === "cancelled") {
+        events.close();
+        if (data.status === "completed") {
+          iterationStatus.textContent = "Iteration completed.";
+          // One last progress request stores the iteration result in the session
+          fetch(window.URL_GENERATION_PROGRESS).catch((err) => console.error(err));
+          // restart preview to apply changes without changing port
+          restartApp();
+        } else {
+          iterationStatus.textContent =
+            "Iteration failed: " + (data.error || "Unknown error");
+        }
+        iterateBtn.disabled = false;
+      }
+    });
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED) {
+        iterationStatus.textContent = "Error while following the iteration progress.";
+        iterateBtn.disabled = false;
+      }
+    };
   }
   iterateBtn.addEventListener("click", startIteration);
 
@@ -0,0 +1,16 @@
+from src.utils.edit_blocks import apply_edit
+
+
+def test_exact_match_respects_line_boundaries():
+    content = "max = 1\nx = 1\n"
+    assert apply_edit(content, "x = 1\n", "x = 2\n") == "max = 1\nx = 2\n"
+
+
+def test_exact_match_does_not_stop_mid_line():
+    content = "x = 10\nx = 1\n"
+    assert apply_edit(content, "x = 1", "x = 2") == "x = 10\nx = 2\n"
+
+
+def test_indentation_insensitive_match_reindents_replacement():
+    content = "def a():\n    x = 1\n    return x\n"
+    assert apply_edit(content, "x = 1\nreturn x", "x = 5\nreturn x * 2") == "def a():\n    x = 5\n    return x * 2\n"
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+pytest.importorskip("httpx")
+
+from flask import Flask
+
+import src.mcp.clients
+import src.generation.generation_flow as generation_flow
+import src.generation.steps.generate_backend_step as generate_backend_module
+import src.preview.handler.generate_start_scripts as start_scripts_module
+import src.preview.steps.improve_readme as improve_readme_module
+import src.mcp.simple_validation_system as validation_module
+
+
+class FakeMCPClient:
+    queries = []
+
+    def __init__(self, api_key, model):
+        pass
+
+    def fork(self):
+        return self
+
+    async def process_query(self, query, additional_context=None):
+        FakeMCPClient.queries.append(query)
+        return {"text": f"result for {query}", "tool_calls": []}
+
+
+def test_generate_application_with_mcp_tools(tmp_path, monkeypatch):
+    FakeMCPClient.queries = []
+    monkeypatch.setattr(src.mcp.clients, "SimpleMCPClient", FakeMCPClient)
+    monkeypatch.setattr(generation_flow, "reformulate_prompt", lambda *args, **kwargs: "A Flask hello world")
+    monkeypatch.setattr(generation_flow, "analyze_user_needs", lambda prompt: ["backend"])
+    monkeypatch.setattr(generation_flow, "define_project_structure", lambda *args, **kwargs: ["app.py"])
+    tool_call = {"function": {"name": "Web Search", "arguments": '{"query": "flask"}'}}
+    monkeypatch.setattr(generate_backend_module, "generate_backend_step", lambda *args, **kwargs: {
+        "choices": [{"message": {"content": "--- FILE: app.py ---\nprint('hello')\n", "tool_calls": [tool_call]}}]
+    })
+    monkeypatch.setattr(start_scripts_module, "generate_start_scripts", lambda *args, **kwargs: True)
+    monkeypatch.setattr(improve_readme_module, "improve_readme_for_preview", lambda *args, **kwargs: False)
+    monkeypatch.setattr(validation_module, "validate_and_fix_with_repomix", lambda *args, **kwargs: (True, "ok"))
+
+    with Flask(__name__).app_context():
+        assert generation_flow.generate_application("key", "model", "hello world app", str(tmp_path), use_mcp_tools=True)
+
+    assert (tmp_path / "app.py").read_text().strip() == "print('hello')"
+    # The context query before reformulation and the tool call of the code response
+    assert any(query.startswith("Find the most relevant") for query in FakeMCPClient.queries)
+    assert any(query.startswith("Execute Web Search") for query in FakeMCPClient.queries)